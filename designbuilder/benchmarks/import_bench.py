@@ -0,0 +1,118 @@
+"""
+CLI Import-Time Benchmark
+
+Measures how long the CLI takes to start: the import of designbuilder.cli
+and complete runs of the lightweight commands, each in a fresh
+interpreter. It also reports the slowest imports and fails if a heavy
+module (the orchestrator, an LLM SDK, a document parser) is loaded by
+the CLI import or by a command that does not need it, or if the import
+exceeds its time budget. Exits non-zero on a regression, so it can gate CI.
+
+Usage:
+    python -m designbuilder.benchmarks.import_bench --runs 10 --max-import-ms 150
+"""
+import json
+import statistics
+import subprocess
+import sys
+import time
+import typer
+from typing import Optional
+
+# Modules the CLI must not load unless a command needs them
+HEAVY_MODULES = (
+    "asyncio", "yaml", "rich", "pypdf", "docx", "openai", "google.generativeai",
+    "designbuilder.core.orchestrator", "designbuilder.coding_agents.python_agent",
+    "designbuilder.llm_backends.router", "designbuilder.core.ingest",
+)
+
+# Commands run end to end, and the heavy modules each one may load
+COMMANDS = {
+    "agents-status": (["agents-status"], ("rich",)),
+    "agent-logs": (["agent-logs", "import-bench-no-such-agent", "--tail", "1"], ()),
+}
+
+app = typer.Typer()
+
+def loaded_modules(statement: str) -> list[str]:
+    """Returns the modules loaded by a statement in a fresh interpreter."""
+    code = f"import json, sys\n{statement}\nprint(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+def heavy_modules(modules: list[str], allowed: tuple = ()) -> list[str]:
+    """Returns the heavy modules among `modules`, except the allowed ones."""
+    return sorted(name for name in modules if name in HEAVY_MODULES and name not in allowed)
+
+def import_profile(module: str) -> dict:
+    """
+    Returns the cumulative import time in microseconds of `module` and each
+    module it loads, from `python -X importtime`. Modules loaded at
+    interpreter start-up (e.g. by site) are left out.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        top_level = not name[1:].startswith(" ")
+        profile[name.strip()] = int(cumulative)
+        if top_level and name.strip() != module:
+            profile = {}  # a module imported before `module`, with everything it loaded
+    return profile
+
+def time_command(args: list[str], runs: int) -> float:
+    """Returns the median wall time in milliseconds of running a command in a fresh interpreter."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+@app.command()
+def main(
+    runs: int = typer.Option(10, "--runs", min=1, help="Runs per measurement; the median is reported"),
+    max_import_ms: Optional[float] = typer.Option(None, "--max-import-ms", help="Fail if importing the CLI takes longer (median)"),
+    top: int = typer.Option(10, "--top", min=0, help="Number of slowest imports to show"),
+):
+    """
+    Benchmark CLI start-up time and check that heavy modules are loaded lazily.
+    """
+    failures = []
+    baseline = time_command([sys.executable, "-c", "pass"], runs)
+    import_ms = time_command([sys.executable, "-c", "import designbuilder.cli"], runs) - baseline
+    typer.echo(f"Interpreter start-up: {baseline:.0f} ms (subtracted from the numbers below)")
+    typer.echo(f"import designbuilder.cli: {import_ms:.0f} ms")
+    if max_import_ms is not None and import_ms > max_import_ms:
+        failures.append(f"importing the CLI took {import_ms:.0f} ms (budget {max_import_ms:.0f} ms)")
+
+    loaded = heavy_modules(loaded_modules("import designbuilder.cli"))
+    if loaded:
+        failures.append(f"importing the CLI loads {', '.join(loaded)}")
+
+    for name, (args, allowed) in COMMANDS.items():
+        command_ms = time_command([sys.executable, "-m", "designbuilder.cli", *args], runs) - baseline
+        typer.echo(f"designbuilder {name}: {command_ms:.0f} ms")
+        statement = ("from typer.testing import CliRunner\nfrom designbuilder.cli import app\n"
+                     f"CliRunner().invoke(app, {args!r})")
+        loaded = heavy_modules(loaded_modules(statement), allowed)
+        if loaded:
+            failures.append(f"designbuilder {name} loads {', '.join(loaded)}")
+
+    if top:
+        profile = import_profile("designbuilder.cli")
+        total = profile.get("designbuilder.cli", 0)
+        typer.echo(f"Slowest imports (cumulative, of {total / 1000:.0f} ms):")
+        for name, micros in sorted(profile.items(), key=lambda item: -item[1])[1:top + 1]:
+            typer.echo(f"  {micros / 1000:6.1f} ms  {name}")
+
+    for failure in failures:
+        typer.echo(f"REGRESSION: {failure}", err=True)
+    if failures:
+        raise typer.Exit(1)
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,249 @@
+"""
+Orchestrator Benchmark
+
+Runs complete builds of synthetic designs against the fake LLM backend,
+without network access, and reports throughput, agent completion times,
+peak memory and event-loop lag. Each design size runs in a fresh
+process so its peak RSS is not inflated by the sizes before it.
+
+With --workers N the build is enqueued to a job queue and run by N
+worker processes, to measure how throughput scales with workers.
+
+Usage:
+    python -m designbuilder.benchmarks.orchestrator_bench --sizes 10,100,1000
+    python -m designbuilder.benchmarks.orchestrator_bench --sizes 100 --workers 4 --max-agents 8
+"""
+import asyncio
+import json
+import os
+import random
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import typer
+from typing import Optional
+from rich.console import Console
+from rich.table import Table
+from designbuilder.core import telemetry
+from designbuilder.core.job_queue import JobQueue
+from designbuilder.core.orchestrator import Orchestrator
+from designbuilder.core.status_manager import StatusManager
+from designbuilder.llm_backends.fake import FakeBackend, fake_router
+
+LAG_INTERVAL = 0.01  # seconds between event-loop lag samples
+
+app = typer.Typer()
+
+def synthetic_components(count: int, max_dependencies: int = 2, seed: int = 0) -> list[dict]:
+    """
+    Builds `count` planned components. Each depends on up to
+    `max_dependencies` of the components before it, so the design is a DAG.
+    """
+    rng = random.Random(seed)
+    components = []
+    for i in range(count):
+        name = f"Component {i + 1}"
+        dependencies = sorted({f"Component {rng.randint(1, i)}" for _ in range(rng.randint(0, max_dependencies))}) if i else []
+        components.append({
+            "name": name,
+            "description": f"Synthetic component {i + 1}.",
+            "language": "Python",
+            "plan": {
+                "purpose": f"Checksum values for {name}.",
+                "sub_tasks": ["checksum", "describe"],
+                "dependencies": dependencies,
+                "edge_cases": ["empty input"],
+                "complexity": rng.choice(["Low", "Medium", "High"]),
+            },
+        })
+    return components
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+async def _monitor_lag(samples: list[float]):
+    """Records how late each periodic wake-up of the event loop is."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LAG_INTERVAL
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(0.0, loop.time() - expected))
+
+def run_worker(queue_path: str, stats_path: str, latency: str, failure_rate: float, rate_limit_rate: float,
+               bug_rate: float, max_agents: int = None, max_tests: int = None, max_llm_calls: int = None,
+               direct: bool = False, seed: int = 0):
+    """
+    Builds queued jobs against the fake backend until interrupted, then
+    writes the worker's LLM call counts to `stats_path`.
+    """
+    from designbuilder.core.worker import Worker
+    backend = FakeBackend(latency=latency, failure_rate=failure_rate, rate_limit_rate=rate_limit_rate,
+                          bug_rate=bug_rate, seed=seed)
+    worker = Worker(JobQueue(queue_path), max_agents=max_agents, max_tests=max_tests, max_llm_calls=max_llm_calls,
+                    llm_backend=backend if direct else fake_router(backend), poll_interval=0.1)
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        with open(stats_path, "w") as f:
+            json.dump({"llm_calls": backend.calls, "llm_failures": backend.failures}, f)
+
+async def run_benchmark(count: int, latency: str = "lognormal:0.05,0.5", failure_rate: float = 0.0,
+                        rate_limit_rate: float = 0.0, bug_rate: float = 0.1, max_agents: int = None,
+                        max_tests: int = None, max_llm_calls: int = None, direct: bool = False,
+                        seed: int = 0, workers: int = 0, max_dependencies: int = 2) -> dict:
+    """
+    Builds `count` synthetic components in a temporary directory and returns the measurements.
+
+    Args:
+        direct: Call the fake backend directly instead of through the router, rate limiter and resilience layer
+        workers: Enqueue the build for this many worker processes, each with the given limits
+        max_dependencies: Most prerequisites per component; 0 builds every component independently
+    """
+    backend = FakeBackend(latency=latency, failure_rate=failure_rate, rate_limit_rate=rate_limit_rate,
+                          bug_rate=bug_rate, seed=seed)
+    with tempfile.TemporaryDirectory(prefix="designbuilder-bench-") as root:
+        job_queue = JobQueue(os.path.join(root, "jobs.db")) if workers else None
+        worker_processes = []
+        for index in range(workers):
+            command = [sys.executable, "-m", "designbuilder.benchmarks.orchestrator_bench", "--worker-queue",
+                       job_queue.path, "--json", os.path.join(root, f"worker-{index}.json"), "--latency", latency, "--failure-rate", str(failure_rate),
+                       "--rate-limit-rate", str(rate_limit_rate), "--bug-rate", str(bug_rate),
+                       "--seed", str(seed + index)]
+            for flag, value in (("--max-agents", max_agents), ("--max-tests", max_tests),
+                                ("--max-llm-calls", max_llm_calls)):
+                if value:
+                    command += [flag, str(value)]
+            if direct:
+                command.append("--direct")
+            worker_processes.append(subprocess.Popen(command, stdout=subprocess.DEVNULL,
+                                                     env={**os.environ, "DESIGNBUILDER_VERBOSITY": "quiet"}))
+        orchestrator = Orchestrator(
+            [], max_agents=max_agents, max_tests=max_tests, max_llm_calls=max_llm_calls, use_llm_cache=False,
+            force=True, components=synthetic_components(count, max_dependencies, seed=seed),
+            llm_backend=backend if direct else fake_router(backend),
+            status_manager=StatusManager(path=os.path.join(root, "status.db")),
+            output_dir=os.path.join(root, "output"), log_dir=os.path.join(root, "logs"),
+            run_dir=os.path.join(root, "runs"), job_queue=job_queue,
+        )
+        lag = []
+        monitor = asyncio.create_task(_monitor_lag(lag))
+        started = time.perf_counter()
+        try:
+            await orchestrator.run()
+        finally:
+            elapsed = time.perf_counter() - started
+            monitor.cancel()
+            # Workers write their LLM call counts when interrupted
+            for process in worker_processes:
+                process.send_signal(signal.SIGINT)
+            for process in worker_processes:
+                process.wait()
+        worker_stats = []
+        for index in range(workers):
+            with open(os.path.join(root, f"worker-{index}.json")) as f:
+                worker_stats.append(json.load(f))
+        events = telemetry.load_run(telemetry.resolve_run(run_dir=os.path.join(root, "runs")))
+
+    agents = [e for e in events if e.get("type") == "span" and e["name"] == "agent"]
+    durations = [e["duration"] for e in agents]
+    completed = sum(1 for e in agents if e.get("status") == "completed")
+    summary = telemetry.run_summary(events)
+    return {
+        "components": count,
+        "workers": workers,
+        "completed": completed,
+        "seconds": elapsed,
+        "throughput": completed / elapsed if elapsed else 0.0,
+        "agent_p50": percentile(durations, 0.50),
+        "agent_p99": percentile(durations, 0.99),
+        "debug_attempts": sum(e.get("debug_attempts", 0) for e in agents),
+        "llm_calls": backend.calls + sum(stats["llm_calls"] for stats in worker_stats),
+        "llm_failures": backend.failures + sum(stats["llm_failures"] for stats in worker_stats),
+        "llm_waits": dict(summary["waits"]),
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "worker_peak_rss_mib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        "lag_p99_ms": percentile(lag, 0.99) * 1000,
+        "lag_max_ms": max(lag, default=0.0) * 1000,
+    }
+
+def _print_results(results: list[dict]):
+    table = Table(title="Orchestrator benchmark")
+    for column in ("Components", "Workers", "Completed", "Wall (s)", "Components/s", "Agent p50 (s)", "Agent p99 (s)",
+                   "Debug attempts", "LLM calls", "Peak RSS (MiB)", "Worker RSS (MiB)", "Loop lag p99 / max (ms)"):
+        table.add_column(column, justify="right")
+    for r in results:
+        table.add_row(str(r["components"]), str(r["workers"] or "-"), str(r["completed"]), f"{r['seconds']:.1f}",
+                      f"{r['throughput']:.1f}",
+                      f"{r['agent_p50']:.2f}", f"{r['agent_p99']:.2f}", str(r["debug_attempts"]),
+                      f"{r['llm_calls']} ({r['llm_failures']} failed)", f"{r['peak_rss_mib']:.0f}",
+                      f"{r['worker_peak_rss_mib']:.0f}", f"{r['lag_p99_ms']:.1f} / {r['lag_max_ms']:.1f}")
+    Console().print(table)
+
+@app.command()
+def main(
+    sizes: str = typer.Option("10,100,1000", "--sizes", help="Comma-separated numbers of synthetic components"),
+    latency: str = typer.Option("lognormal:0.05,0.5", "--latency", help="LLM latency: fixed:S, uniform:A,B, lognormal:MEDIAN,SIGMA or exponential:MEAN"),
+    failure_rate: float = typer.Option(0.0, "--failure-rate", help="Probability of a transient LLM error per call"),
+    rate_limit_rate: float = typer.Option(0.0, "--rate-limit-rate", help="Probability of a rate-limit error per call"),
+    bug_rate: float = typer.Option(0.1, "--bug-rate", help="Probability that an implementation needs a debug attempt"),
+    max_agents: Optional[int] = typer.Option(None, "--max-agents", min=1),
+    max_tests: Optional[int] = typer.Option(None, "--max-tests", min=1),
+    max_llm_calls: Optional[int] = typer.Option(None, "--max-llm-calls", min=1),
+    direct: bool = typer.Option(False, "--direct", help="Skip the router, rate limiter and resilience layer"),
+    seed: int = typer.Option(0, "--seed"),
+    json_path: Optional[str] = typer.Option(None, "--json", help="Also write the results to this JSON file"),
+    in_process: bool = typer.Option(False, "--in-process", help="Run every size in this process"),
+    max_dependencies: int = typer.Option(2, "--max-dependencies", min=0, help="Most prerequisites per synthetic component; 0 makes every component independent"),
+    workers: int = typer.Option(0, "--workers", min=0, help="Enqueue each build for this many worker processes; --max-* limits apply per worker"),
+    worker_queue: Optional[str] = typer.Option(None, "--worker-queue", hidden=True, help="Run as a benchmark worker on this queue"),
+):
+    """
+    Benchmark full builds of synthetic designs against the fake LLM backend.
+    """
+    if worker_queue:
+        run_worker(worker_queue, json_path, latency, failure_rate, rate_limit_rate, bug_rate,
+                   max_agents, max_tests, max_llm_calls, direct, seed)
+        return
+    options = dict(latency=latency, failure_rate=failure_rate, rate_limit_rate=rate_limit_rate, bug_rate=bug_rate,
+                   max_agents=max_agents, max_tests=max_tests, max_llm_calls=max_llm_calls, direct=direct, seed=seed,
+                   workers=workers, max_dependencies=max_dependencies)
+    results = []
+    for count in [int(size) for size in sizes.split(",") if size.strip()]:
+        if in_process:
+            results.append(asyncio.run(run_benchmark(count, **options)))
+            continue
+        # A fresh process per size, so each peak RSS is measured on its own
+        with tempfile.NamedTemporaryFile(suffix=".json") as result_file:
+            command = [sys.executable, "-m", "designbuilder.benchmarks.orchestrator_bench", "--sizes", str(count),
+                       "--in-process", "--json", result_file.name, "--latency", latency,
+                       "--failure-rate", str(failure_rate), "--rate-limit-rate", str(rate_limit_rate),
+                       "--bug-rate", str(bug_rate), "--seed", str(seed), "--workers", str(workers),
+                       "--max-dependencies", str(max_dependencies)]
+            for flag, value in (("--max-agents", max_agents), ("--max-tests", max_tests),
+                                ("--max-llm-calls", max_llm_calls)):
+                if value:
+                    command += [flag, str(value)]
+            if direct:
+                command.append("--direct")
+            print(f"Benchmarking {count} components...")
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL,
+                           env={**os.environ, "DESIGNBUILDER_VERBOSITY": "quiet"})
+            with open(result_file.name) as f:
+                results.extend(json.load(f))
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    _print_results(results)
+
+if __name__ == "__main__":
+    app()
@@ -6,49 +6,186 @@ This module provides the command-line interface for DesignBuilder,
 allowing users to build, monitor, and debug software components
 from design documents.
 """
-import asyncio
 import typer
 import os
-import glob
+from datetime import datetime
 from typing import List, Optional
 from pathlib import Path
-from designbuilder.core.orchestrator import Orchestrator
 from designbuilder.core.status_manager import StatusManager
-from rich.console import Console
-from rich.table import Table
+from designbuilder.core.log_writer import LOG_DIR, LogWriter, QUIET, VERBOSE
+
+# Commands import what they need themselves: `agents-status` and `agent-logs`
+# are run in tight loops by monitoring scripts, and must not pay for loading
+# the orchestrator, the LLM SDKs or the document parsers.
 
 app = typer.Typer()
+cache_app = typer.Typer(help="Inspect and prune the plan and LLM response caches.")
+app.add_typer(cache_app, name="cache")
 
 # Global orchestrator instance (not ideal, but simplifies CLI access for now)
-orchestrator_instance: Optional[Orchestrator] = None
-
-async def _run_build(design_docs: List[str]):
+orchestrator_instance: Optional["Orchestrator"] = None
+
+async def _run_build(design_docs: List[str], max_agents: Optional[int] = None,
+                     max_tests: Optional[int] = None, max_llm_calls: Optional[int] = None,
+                     use_llm_cache: bool = True, force: bool = False, debug_token_budget: Optional[int] = None,
+                     metrics_textfile: Optional[str] = None, record_transcript: Optional[str] = None,
+                     job_queue=None):
+    from designbuilder.core.orchestrator import Orchestrator
     global orchestrator_instance
     print(f"Building from design documents: {design_docs}")
-    orchestrator_instance = Orchestrator(design_docs)
+    orchestrator_instance = Orchestrator(
+        design_docs,
+        max_agents=max_agents,
+        max_tests=max_tests,
+        max_llm_calls=max_llm_calls,
+        use_llm_cache=use_llm_cache,
+        force=force,
+        debug_token_budget=debug_token_budget,
+        metrics_textfile=metrics_textfile,
+        record_transcript=record_transcript,
+        job_queue=job_queue
+    )
     await orchestrator_instance.run()
     print("Build process completed.")
 
 @app.command()
-def build(design_docs: List[str]):
+def build(
+    design_docs: List[str],
+    max_agents: Optional[int] = typer.Option(None, "--max-agents", min=1, help="Maximum number of agents running at once (default: 4 x CPU count)"),
+    max_tests: Optional[int] = typer.Option(None, "--max-tests", min=1, help="Maximum number of concurrent test runs (default: CPU count)"),
+    max_llm_calls: Optional[int] = typer.Option(None, "--max-llm-calls", min=1, help="Maximum number of concurrent LLM calls (default: --max-agents)"),
+    no_llm_cache: bool = typer.Option(False, "--no-llm-cache", help="Send every prompt to the LLM instead of reusing cached responses"),
+    force: bool = typer.Option(False, "--force", help="Rebuild every component, even if unchanged since the last build"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Also print generated code and full test output"),
+    quiet: bool = typer.Option(False, "--quiet", "-q", help="Only print messages that need attention"),
+    hedge: bool = typer.Option(False, "--hedge", help="Send a duplicate LLM request when a call is slower than the recent p95"),
+    debug_token_budget: Optional[int] = typer.Option(None, "--debug-token-budget", min=200, help="Token budget for the failure context of each debug prompt (default: 4000)"),
+    full_file_edits: bool = typer.Option(False, "--full-file-edits", help="Have debug and guidance prompts regenerate the whole file instead of returning edits"),
+    speculative: int = typer.Option(1, "--speculative", min=1, help="Number of candidate fixes generated and tested in parallel per debug attempt (default: 1)"),
+    metrics_textfile: Optional[str] = typer.Option(None, "--metrics-textfile", help="Also write build metrics to this Prometheus textfile"),
+    record: Optional[str] = typer.Option(None, "--record", help="Record every LLM call of the build to this transcript file"),
+    replay: Optional[str] = typer.Option(None, "--replay", help="Answer LLM calls from this recorded transcript instead of calling the LLM"),
+    replay_speed: float = typer.Option(1.0, "--replay-speed", min=0, help="Replay at this multiple of the recorded speed; 0 skips the recorded latency (default: 1)"),
+    queue: bool = typer.Option(False, "--queue", help="Enqueue components for `designbuilder worker` processes instead of building them in this process"),
+    workers: int = typer.Option(0, "--workers", min=0, help="Start this many local worker processes for the build (implies --queue)"),
+    queue_file: Optional[str] = typer.Option(None, "--queue-file", help="Job queue database (default: designbuilder/cache/jobs.db)"),
+    shared_queue: bool = typer.Option(False, "--shared-queue", help="The queue is on a network filesystem used by workers on other hosts"),
+):
     """
     Parse design documents, spawn coding agents, and build components.
     """
-    asyncio.run(_run_build(design_docs))
+    import asyncio
+    from designbuilder.coding_agents.python_agent import PythonAgent
+    from designbuilder.llm_backends.resilient import ResilientBackend
+    from designbuilder.llm_backends.transcript import ReplayBackend
+    if verbose or quiet:
+        LogWriter.default().verbosity = VERBOSE if verbose else QUIET
+    ResilientBackend.default_hedging = hedge
+    PythonAgent.default_edit_mode = "full" if full_file_edits else "patch"
+    PythonAgent.default_speculative_candidates = speculative
+    if record and replay:
+        raise typer.BadParameter("--record and --replay cannot be used together.")
+    if replay and not os.path.exists(replay):
+        raise typer.BadParameter(f"Transcript not found: {replay}", param_hint="--replay")
+    ReplayBackend.default_path = replay
+    ReplayBackend.default_speed = replay_speed
+    job_queue = None
+    local_workers = []
+    if queue or workers or shared_queue or queue_file:
+        from designbuilder.core.job_queue import JobQueue
+        from designbuilder.core.worker import spawn_local_workers
+        job_queue = JobQueue(queue_file, shared=shared_queue)
+        # Local workers get the same LLM settings as this build
+        worker_args = (["--hedge"] if hedge else []) + (["--verbose"] if verbose else ["--quiet"] if quiet else [])
+        if replay:
+            worker_args += ["--replay", replay, "--replay-speed", str(replay_speed)]
+        local_workers = spawn_local_workers(workers, job_queue, max_agents, max_tests, max_llm_calls, worker_args,
+                                            record_transcript=record)
+    try:
+        asyncio.run(_run_build(design_docs, max_agents, max_tests, max_llm_calls, not no_llm_cache, force,
+                               debug_token_budget, metrics_textfile, record, job_queue))
+    finally:
+        if local_workers:
+            from designbuilder.core.worker import stop_local_workers, worker_transcript_path
+            stop_local_workers(local_workers)
+            if record:
+                _merge_worker_transcripts(record, [worker_transcript_path(record, i) for i in range(workers)])
+
+def _merge_worker_transcripts(record: str, parts: list[str]):
+    """Merges the transcripts recorded by local workers into the build's transcript."""
+    from designbuilder.llm_backends.transcript import merge_transcripts
+    parts = [part for part in parts if os.path.exists(part)]
+    if not parts or not os.path.exists(record):
+        return
+    merged = merge_transcripts(record, parts)
+    print(f"Merged {merged} LLM call(s) recorded by {len(parts)} worker(s) into {record}.")
+
+@app.command()
+def worker(
+    max_agents: Optional[int] = typer.Option(None, "--max-agents", min=1, help="Maximum number of components built at once by this worker (default: 4 x CPU count)"),
+    max_tests: Optional[int] = typer.Option(None, "--max-tests", min=1, help="Maximum number of concurrent test runs (default: CPU count)"),
+    max_llm_calls: Optional[int] = typer.Option(None, "--max-llm-calls", min=1, help="Maximum number of concurrent LLM calls (default: --max-agents)"),
+    queue_file: Optional[str] = typer.Option(None, "--queue-file", help="Job queue database (default: designbuilder/cache/jobs.db)"),
+    shared_queue: bool = typer.Option(False, "--shared-queue", help="The queue is on a network filesystem shared with other hosts"),
+    idle_timeout: Optional[float] = typer.Option(None, "--idle-timeout", min=0, help="Exit after this many seconds without a job"),
+    max_jobs: Optional[int] = typer.Option(None, "--max-jobs", min=1, help="Exit after building this many components"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Also print generated code and full test output"),
+    quiet: bool = typer.Option(False, "--quiet", "-q", help="Only print messages that need attention"),
+    hedge: bool = typer.Option(False, "--hedge", help="Send a duplicate LLM request when a call is slower than the recent p95"),
+    rate_limit_share: float = typer.Option(1.0, "--rate-limit-share", min=0.001, max=1.0, help="Fraction of each provider's requests and tokens per minute this worker may use (default: 1)"),
+    record: Optional[str] = typer.Option(None, "--record", help="Record every LLM call of this worker to this transcript file"),
+    replay: Optional[str] = typer.Option(None, "--replay", help="Answer LLM calls from this recorded transcript instead of calling the LLM"),
+    replay_speed: float = typer.Option(1.0, "--replay-speed", min=0, help="Replay at this multiple of the recorded speed; 0 skips the recorded latency (default: 1)"),
+):
+    """
+    Build components enqueued by `designbuilder build --queue`, until interrupted.
+    """
+    import asyncio
+    from designbuilder.core.job_queue import JobQueue
+    from designbuilder.core.worker import Worker
+    from designbuilder.llm_backends.rate_limiter import RateLimiter
+    from designbuilder.llm_backends.resilient import ResilientBackend
+    from designbuilder.llm_backends.transcript import ReplayBackend
+    if verbose or quiet:
+        LogWriter.default().verbosity = VERBOSE if verbose else QUIET
+    ResilientBackend.default_hedging = hedge
+    RateLimiter.default_share = rate_limit_share
+    if record and replay:
+        raise typer.BadParameter("--record and --replay cannot be used together.")
+    if replay and not os.path.exists(replay):
+        raise typer.BadParameter(f"Transcript not found: {replay}", param_hint="--replay")
+    ReplayBackend.default_path = replay
+    ReplayBackend.default_speed = replay_speed
+    build_worker = Worker(JobQueue(queue_file, shared=shared_queue), max_agents=max_agents, max_tests=max_tests,
+                          max_llm_calls=max_llm_calls)
+    recorder = None
+    if record:
+        from designbuilder.llm_backends.transcript import TranscriptRecorder
+        recorder = TranscriptRecorder.start(record)
+    try:
+        asyncio.run(build_worker.run(idle_timeout=idle_timeout, max_jobs=max_jobs))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if recorder is not None:
+            recorder.finish()
 
 @app.command()
-def agents_status():
+def agents_status(
+    watch: bool = typer.Option(False, "--watch", "-w", help="Keep the table up to date as agents change status"),
+    interval: float = typer.Option(1.0, "--interval", min=0.1, help="Seconds between redraws of elapsed times in watch mode")
+):
     """
     View the progress and test results of all running agents.
     """
+    from rich.console import Console
     console = Console()
-    table = Table(title="Agent Status")
-    table.add_column("Agent Name", style="cyan", no_wrap=True)
-    table.add_column("Component Name", style="blue", no_wrap=True)
-    table.add_column("Status", style="magenta")
-    table.add_column("Underlying LLM", style="green")
 
     status_manager = StatusManager()
+    if watch:
+        _watch_agents_status(console, status_manager, interval)
+        return
+
     status_data = status_manager.get_all_status()
 
     if not status_data:
@@ -62,35 +199,91 @@ def agents_status():
         agent_instances = orchestrator_instance.agent_map
 
     for agent_name, agent_state in status_data.items():
-        # Get component name and LLM from status data first, then from agent instance if available
-        component_name = agent_state.get("name", agent_name)
-        llm_backend = agent_state.get("llm_backend", "Unknown")
-        
         # If agent instance is available, use it to get real-time info
         if agent_name in agent_instances:
             agent = agent_instances[agent_name]
-            component_name = agent.component.get('name', component_name)
-            llm_backend = agent.get_llm_backend_name()
-        
-        status = agent_state.get("status", "unknown")
-        
-        # Display the agent name (could be agent-1, agent-2, etc. or legacy component name)
-        display_agent_name = agent_name
-        table.add_row(display_agent_name, component_name, status, llm_backend)
+            agent_state["name"] = agent.component.get('name', agent_state.get("name", agent_name))
+            agent_state["llm_backend"] = agent.get_llm_backend_name()
+
+    console.print(_agents_status_table(status_data))
+
+def _format_elapsed(agent_state: dict, now: float) -> str:
+    started = agent_state.get("started_at")
+    if not started:
+        return "-"
+    seconds = int((agent_state.get("finished_at") or now) - started)
+    return f"{seconds // 60}:{seconds % 60:02d}" if seconds < 3600 else f"{seconds // 3600}h{seconds // 60 % 60:02d}m"
+
+def _agents_status_table(status_data: dict, now: float = None):
+    """
+    Builds the agent status table, with build throughput in its caption.
+    """
+    from rich.table import Table
+    now = now or datetime.now().timestamp()
+    table = Table(title="Agent Status")
+    table.add_column("Agent Name", style="cyan", no_wrap=True)
+    table.add_column("Component Name", style="blue", no_wrap=True)
+    table.add_column("Status", style="magenta")
+    table.add_column("Elapsed", justify="right")
+    table.add_column("Debug Attempts", justify="right")
+    table.add_column("Underlying LLM", style="green")
 
-    console.print(table)
+    for agent_name, agent_state in status_data.items():
+        # The agent name could be agent-1, agent-2, etc. or a legacy component name
+        table.add_row(agent_name, agent_state.get("name", agent_name), agent_state.get("status", "unknown"),
+                      _format_elapsed(agent_state, now), str(agent_state.get("debug_attempts", 0)),
+                      agent_state.get("llm_backend", "Unknown"))
+
+    # Throughput counts components built in this run, not reused ones
+    started = [state["started_at"] for state in status_data.values() if state.get("started_at")]
+    finished = [state for state in status_data.values()
+                if state.get("status") == "completed" and state.get("finished_at")]
+    completed = sum(1 for state in status_data.values() if state.get("status") == "completed")
+    caption = f"{completed}/{len(status_data)} completed"
+    if started:
+        minutes = max(now - min(started), 1.0) / 60
+        caption += f", {len(finished) / minutes:.1f} components/min over {_format_elapsed({'started_at': min(started)}, now)}"
+    table.caption = caption
+    return table
+
+def _watch_agents_status(console, status_manager: StatusManager, interval: float):
+    """
+    Redraws the status table whenever the status store changes, until interrupted.
+    """
+    from rich.live import Live
+    status_data = {}
+    try:
+        with Live(console=console, auto_refresh=False) as live:
+            for records, reset in status_manager.watch(timeout=interval):
+                if reset:
+                    status_data = records
+                else:
+                    status_data.update(records)
+                if status_data:
+                    live.update(_agents_status_table(status_data), refresh=True)
+                else:
+                    live.update("Waiting for a build to start...", refresh=True)
+    except KeyboardInterrupt:
+        pass
 
 @app.command()
-def agent_logs(agent_name: str, tail: Optional[int] = typer.Option(None, "--tail", "-t", help="Show last N lines")):
+def agent_logs(
+    agent_name: str,
+    tail: Optional[int] = typer.Option(None, "--tail", "-t", help="Show last N lines"),
+    follow: bool = typer.Option(False, "--follow", "-f", help="Keep printing new lines of the most recent log as they are written"),
+    latest: bool = typer.Option(False, "--latest", "-l", help="Only show the most recent log")
+):
     """
     View the logs for a specific agent.
 
     Args:
-        agent_name: Name of the agent to view logs for
+        agent_name: Name of the agent (e.g. agent-1) or component to view logs for
         tail: Number of last lines to show (optional)
+        follow: Stream new lines of the most recent log until interrupted
+        latest: Only show the most recent log
     """
-    # Find log files for the specified agent
-    log_files = _find_agent_log_files(agent_name)
+    # Find log files for the specified agent, most recent first
+    log_files = _find_agent_log_files(agent_name, limit=1 if latest or follow else None)
 
     if not log_files:
         typer.echo(f"No logs found for agent: {agent_name}", err=True)
@@ -98,43 +291,33 @@ def agent_logs(agent_name: str, tail: Optional[int] = typer.Option(None, "--tail
         _list_available_agents()
         raise typer.Exit(1)
 
+    if follow:
+        _follow_log_file(log_files[0], 10 if tail is None else tail)
+        return
+
     # Display logs for all matching files
-    for log_file in sorted(log_files, reverse=True):  # Most recent first
+    for log_file in log_files:
         _display_log_file(log_file, tail)
 
-def _find_agent_log_files(agent_name: str) -> List[str]:
+def _find_agent_log_files(agent_name: str, limit: Optional[int] = None) -> List[str]:
     """
     Find log files for a specific agent.
 
     Args:
-        agent_name: Name of the agent to search for
+        agent_name: Name of the agent or component to search for
+        limit: Maximum number of log files to return
 
     Returns:
-        List of log file paths matching the agent name
+        List of log file paths for the agent, most recent first
     """
-    # Sanitize agent name similar to how it's done in CodingAgent
-    sanitized_name = "".join(c for c in agent_name if c.isalnum() or c in (' ', '_')).rstrip()
-    sanitized_name = sanitized_name.replace(' ', '_')
-
-    # Define log directory (same as in CodingAgent)
-    log_dir = "/home/karthik/repos/DesignBuilder/logs"
-
-    if not os.path.exists(log_dir):
-        return []
-
-    # Search for log files matching the agent name pattern
-    # Pattern: {sanitized_name}_YYYYMMDD-HHMMSS.log
-    pattern = f"{log_dir}/{sanitized_name}_*.log"
-    log_files = glob.glob(pattern)
-
-    # Also search for exact matches (in case the agent name is already sanitized)
-    exact_pattern = f"{log_dir}/{agent_name}_*.log"
-    exact_files = glob.glob(exact_pattern)
+    from designbuilder.core.log_index import LogIndex
+    return LogIndex.for_dir(LOG_DIR).find(agent_name, limit)
 
-    # Combine and deduplicate
-    all_files = list(set(log_files + exact_files))
-
-    return all_files
+def _print_log_header(log_file: str):
+    file_name = Path(log_file).name
+    typer.echo(f"\n{'='*60}")
+    typer.echo(f"Log file: {file_name}")
+    typer.echo(f"{'='*60}")
 
 def _display_log_file(log_file: str, tail: Optional[int] = None):
     """
@@ -144,56 +327,50 @@ def _display_log_file(log_file: str, tail: Optional[int] = None):
         log_file: Path to the log file
         tail: Number of last lines to show (None for all lines)
     """
+    from designbuilder.core.log_index import tail as tail_lines
     try:
-        with open(log_file, 'r') as f:
-            lines = f.readlines()
-
-        # Show file header
-        file_name = Path(log_file).name
-        typer.echo(f"\n{'='*60}")
-        typer.echo(f"Log file: {file_name}")
-        typer.echo(f"{'='*60}")
-
-        # Display lines (last N if tail is specified)
-        if tail and len(lines) > tail:
-            lines = lines[-tail:]
+        if tail is not None:
+            # Only the last blocks of the file are read
+            lines = tail_lines(log_file, tail)
+            _print_log_header(log_file)
             typer.echo(f"... showing last {tail} lines ...")
+            for line in lines:
+                typer.echo(line)
+            return
 
-        for line in lines:
-            typer.echo(line.rstrip())
+        with open(log_file, 'r', errors='replace') as f:
+            _print_log_header(log_file)
+            for line in f:
+                typer.echo(line.rstrip())
 
     except Exception as e:
         typer.echo(f"Error reading log file {log_file}: {e}", err=True)
 
-def _list_available_agents():
+def _follow_log_file(log_file: str, tail: int):
     """
-    List all available agents based on log files in the logs directory.
+    Print the last lines of a log file, then new lines as they are written, until interrupted.
     """
-    log_dir = "/home/karthik/repos/DesignBuilder/logs"
+    from designbuilder.core.log_index import follow
+    _print_log_header(log_file)
+    try:
+        for line in follow(log_file, tail):
+            typer.echo(line)
+    except KeyboardInterrupt:
+        pass
 
-    if not os.path.exists(log_dir):
+def _list_available_agents():
+    """
+    List all agents and components that have logs.
+    """
+    from designbuilder.core.log_index import LogIndex
+    if not os.path.exists(LOG_DIR):
         typer.echo("No logs directory found.", err=True)
         return
 
-    log_files = glob.glob(f"{log_dir}/*.log")
-
-    if not log_files:
-        typer.echo("No log files found.", err=True)
-        return
-
-    # Extract agent names from log files
-    agents = set()
-    for log_file in log_files:
-        file_name = Path(log_file).stem  # Remove .log extension
-        # Remove timestamp part (everything after the last _)
-        parts = file_name.split('_')
-        if len(parts) >= 2:
-            # Remove the last part (timestamp) and rejoin
-            agent_name = '_'.join(parts[:-1])
-            agents.add(agent_name)
+    agents = LogIndex.for_dir(LOG_DIR).names()
 
     if agents:
-        for agent in sorted(agents):
+        for agent in agents:
             typer.echo(f"  - {agent}", err=True)
     else:
         typer.echo("No agents found.", err=True)
@@ -289,6 +466,7 @@ def _guided_retry_mode(agent_name: str, status_manager: StatusManager):
     # Use orchestrator to restart the cycle with guidance
     global orchestrator_instance
     if orchestrator_instance:
+        import asyncio
         try:
             success = asyncio.run(orchestrator_instance.restart_agent_cycle(agent_name, guidance))
             if success:
@@ -302,5 +480,128 @@ def _guided_retry_mode(agent_name: str, status_manager: StatusManager):
     else:
         typer.echo("No orchestrator instance available. Please run 'build' first.", err=True)
 
+def _format_timestamp(timestamp: Optional[float]) -> str:
+    if timestamp is None:
+        return "-"
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+@cache_app.command("stats")
+def cache_stats():
+    """
+    Show plan cache and LLM response cache statistics.
+    """
+    from designbuilder.core.cache_manager import CacheManager
+    from designbuilder.llm_backends.cached import LLMResponseCache
+    plan_stats = CacheManager.stats()
+    typer.echo("Plan cache:")
+    typer.echo(f"  Entries: {plan_stats['entries']} ({plan_stats['bytes']} bytes)")
+    typer.echo(f"  Oldest:  {_format_timestamp(plan_stats['oldest'])}")
+    typer.echo(f"  Newest:  {_format_timestamp(plan_stats['newest'])}")
+    for model, count in sorted(plan_stats["by_model"].items()):
+        typer.echo(f"  Model {model}: {count}")
+    for prompt_version, count in sorted(plan_stats["by_prompt_version"].items()):
+        typer.echo(f"  Prompt version {prompt_version}: {count}")
+
+    llm_stats = LLMResponseCache.default().stats()
+    typer.echo("LLM response cache:")
+    typer.echo(f"  Entries: {llm_stats['entries']} ({llm_stats['bytes']} bytes)")
+
+@cache_app.command("prune")
+def cache_prune(
+    older_than: Optional[float] = typer.Option(None, "--older-than", help="Remove plans older than N days"),
+    model: Optional[str] = typer.Option(None, "--model", help="Remove plans generated by this model"),
+    prompt_version: Optional[str] = typer.Option(None, "--prompt-version", help="Remove plans generated with this prompt version"),
+):
+    """
+    Remove plan cache entries matching all of the given criteria.
+    """
+    if older_than is None and model is None and prompt_version is None:
+        typer.echo("Specify at least one of --older-than, --model or --prompt-version.", err=True)
+        raise typer.Exit(1)
+
+    from designbuilder.core.cache_manager import CacheManager
+    max_age_seconds = older_than * 24 * 60 * 60 if older_than is not None else None
+    deleted = CacheManager.prune(max_age_seconds=max_age_seconds, model=model, prompt_version=prompt_version)
+    typer.echo(f"Removed {deleted} plan cache entries.")
+
+def _seconds(value: float) -> str:
+    return f"{value:.1f}s" if value is not None else "-"
+
+@app.command()
+def profile(
+    run: Optional[str] = typer.Argument(None, help="Run id or run file (default: the latest run)"),
+    top: int = typer.Option(10, "--top", "-n", min=1, help="Number of slowest calls to show"),
+):
+    """
+    Show where the time of a build run went: critical path, per-agent breakdown and slowest calls.
+    """
+    from rich.console import Console
+    from rich.table import Table
+    from designbuilder.core import telemetry
+    try:
+        path = telemetry.resolve_run(run)
+    except FileNotFoundError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(1)
+    events = telemetry.load_run(path)
+    summary = telemetry.run_summary(events)
+    console = Console()
+
+    calls = summary["llm_calls"]
+    lookups = summary["cache_hits"] + summary["cache_misses"]
+    console.print(f"Run {summary['run_id'] or Path(path).stem}: {_seconds(summary['duration'])} wall clock")
+    console.print(f"LLM: {calls} calls ({summary['llm_errors']} failed), {_seconds(summary['llm_seconds'])} total, "
+                  f"~{summary['prompt_tokens']} tokens in / ~{summary['output_tokens']} out")
+    if lookups:
+        console.print(f"Cache: {summary['cache_hits']}/{lookups} hits")
+    if summary["waits"]:
+        console.print("Waiting: " + ", ".join(f"{resource} {_seconds(seconds)}"
+                                              for resource, seconds in sorted(summary["waits"].items())))
+
+    path_table = Table(title="Critical path")
+    path_table.add_column("Step", style="cyan")
+    path_table.add_column("Start", justify="right")
+    path_table.add_column("Duration", justify="right", style="magenta")
+    path_table.add_column("Status")
+    for step in telemetry.critical_path(events):
+        name = step.get("agent") if step["name"] == "agent" else step["name"]
+        path_table.add_row(name, _seconds(step["start"]), _seconds(step["duration"]), step.get("status", ""))
+    console.print(path_table)
+
+    breakdown = telemetry.agent_breakdown(events)
+    phases = sorted({phase for entry in breakdown.values() for phase in entry["phases"]})
+    agent_table = Table(title="Agents")
+    agent_table.add_column("Agent", style="cyan")
+    agent_table.add_column("Total", justify="right", style="magenta")
+    for phase in phases:
+        agent_table.add_column(phase, justify="right")
+    agent_table.add_column("LLM calls", justify="right")
+    agent_table.add_column("LLM time", justify="right", style="green")
+    agent_table.add_column("Waiting", justify="right")
+    agent_table.add_column("Debug attempts", justify="right")
+    for agent, entry in sorted(breakdown.items(), key=lambda item: item[1]["total"], reverse=True):
+        agent_table.add_row(agent, _seconds(entry["total"]),
+                            *(_seconds(entry["phases"].get(phase, 0.0)) for phase in phases),
+                            str(entry["llm_calls"]), _seconds(entry["llm_seconds"]),
+                            _seconds(entry["wait_seconds"]), str(entry["debug_attempts"]))
+    console.print(agent_table)
+
+    slow_table = Table(title=f"Slowest calls (top {top})")
+    slow_table.add_column("Call", style="cyan")
+    slow_table.add_column("Agent")
+    slow_table.add_column("Duration", justify="right", style="magenta")
+    slow_table.add_column("Details")
+    for call in telemetry.slowest(events, top):
+        if call["type"] == "llm":
+            label = f"LLM {call['kind']} ({call['model']})"
+            details = f"~{call['prompt_tokens']} tokens in / ~{call['output_tokens']} out"
+            if call.get("error"):
+                details += f", {call['error']}"
+        else:
+            label = f"pytest ({call.get('runner', '')})"
+            details = f"{call.get('passed', 0)} passed, {call.get('failed', 0)} failed"
+        slow_table.add_row(label, call.get("agent") or "-", _seconds(call["duration"]), details)
+    console.print(slow_table)
+
 if __name__ == "__main__":
     app()
@@ -4,9 +4,12 @@ Base Coding Agent Interface
 Defines the abstract interface for all coding agents, ensuring
 they follow the implement -> test -> debug loop.
 """
-import os
+import time
 from abc import ABC, abstractmethod
 from datetime import datetime
+from designbuilder.core import telemetry
+from designbuilder.core.log_index import LogIndex, log_prefix
+from designbuilder.core.log_writer import LOG_DIR, LogWriter, NORMAL, QUIET
 
 class CodingAgent(ABC):
     """
@@ -14,32 +17,42 @@ class CodingAgent(ABC):
     """
     MAX_DEBUG_ATTEMPTS = 10
 
-    def __init__(self, component: dict, status_manager=None, agent_name=None):
+    def __init__(self, component: dict, status_manager=None, agent_name=None, log_dir: str = None):
         self.component = component
         self.status_manager = status_manager
         self.agent_name = agent_name
         self.debug_attempts = 0
         self._status = "initialized"
         self.changes_summary = []
+        self.fingerprint = None  # Hash of the inputs this component is built from
+        self.reused = False  # True when an unchanged, completed build is reused
+        self.started_at = None   # Wall-clock times of this run, shown by `agents-status --watch`
+        self.finished_at = None
 
         # Sanitize component name for filename
-        sanitized_name = "".join(c for c in self.component['name'] if c.isalnum() or c in (' ', '_')).rstrip()
-        sanitized_name = sanitized_name.replace(' ', '_')
+        sanitized_name = log_prefix(self.component['name'])
 
         # Create timestamp
         timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
 
-        # Define log directory and file
-        log_dir = "/home/karthik/repos/DesignBuilder/logs"
+        # Define log file; the log writer creates the directory on first write
+        log_dir = log_dir or LOG_DIR
         self.log_file = f"{log_dir}/{sanitized_name}_{timestamp}.log"
-
-        # Create log directory if it doesn't exist
-        os.makedirs(log_dir, exist_ok=True)
+        self.log_writer = LogWriter.default()
+        # Register the log so `designbuilder agent-logs` finds it without scanning the directory
+        LogIndex.for_dir(log_dir).add(self.log_file, agent_name, self.component['name'])
 
     def _save_status(self):
         if self.status_manager and self.agent_name:
-            self.status_manager.set_agent_status(self.agent_name, self.status)
-            print(f"Agent {self.component['name']} status updated to: {self.status}")
+            if self.status in ("completed", "paused_for_guidance"):
+                self.finished_at = time.time()
+            self.status_manager.set_agent_status(self.agent_name, {
+                "status": self.status,
+                "debug_attempts": self.debug_attempts,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            })
+            self.log_writer.echo(f"Agent {self.component['name']} status updated to: {self.status}")
 
     @property
     def status(self):
@@ -94,9 +107,12 @@ class CodingAgent(ABC):
         """
         Execute the full implement -> test -> debug loop.
         """
+        self.started_at = time.time()
+        self.finished_at = None
         self.status = "setting up scripts"
         self._save_status()
-        await self.setup_scripts()
+        with telemetry.span("setup", phase=True):
+            await self.setup_scripts()
 
         # self.status = "planning"
         # self._save_status()
@@ -104,20 +120,23 @@ class CodingAgent(ABC):
 
         self.status = "implementing"
         self._save_status()
-        await self.implement()
+        with telemetry.span("implement", phase=True):
+            await self.implement()
 
         self.status = "writing tests"
         self._save_status()
-        await self.write_tests()
+        with telemetry.span("write_tests", phase=True):
+            await self.write_tests()
 
 
         self.status = "testing"
         self._save_status()
-        test_result, test_summary = await self.test()
+        with telemetry.span("test", phase=True):
+            test_result, test_summary = await self.test()
         while test_result != "PASSED":
             if self.debug_attempts >= self.MAX_DEBUG_ATTEMPTS:
                 self._log(f"Max debug attempts ({self.MAX_DEBUG_ATTEMPTS}) reached for {self.component['name']}. Manual intervention required.")
-                print(f"[ATTENTION] Max debug attempts reached for {self.component['name']}. Please review logs and code for manual debugging.")
+                self.log_writer.echo(f"[ATTENTION] Max debug attempts reached for {self.component['name']}. Please review logs and code for manual debugging.", QUIET)
                 self.status = "paused_for_guidance"
                 self._save_status()
                 break
@@ -126,21 +145,45 @@ class CodingAgent(ABC):
             self._log(f"Debug attempt {self.debug_attempts}/{self.MAX_DEBUG_ATTEMPTS} for {self.component['name']}.")
             self.status = "debugging"
             self._save_status()
-            await self.debug(test_summary)
-            self.status = "testing" # After debug, re-test
-            self._save_status()
-            test_result, test_summary = await self.test()
+            test_result, test_summary = await self.debug_and_test(test_summary)
 
         if self.status != "paused_for_guidance":
+            await self.publish()
             self.status = "completed"
             self._save_status()
 
-    def _log(self, message: str):
-        """Log a message to the agent's log file."""
-        # In a real implementation, this would be a more robust logger.
-        with open(self.log_file, "a") as f:
-            f.write(f"{message}\n")
-        print(f"[{self.component['name']}] {message}")
+    async def publish(self):
+        """
+        Makes the finished component visible to other agents. Agents that
+        work in a private workspace override this to merge it.
+        """
+        pass
+
+    async def debug_and_test(self, test_summary: str) -> tuple[str, str]:
+        """
+        Makes one debug attempt and re-tests. Agents may override this to
+        try several fixes at once.
+        """
+        with telemetry.span("debug", phase=True, attempt=self.debug_attempts):
+            await self.debug(test_summary)
+        self.status = "testing" # After debug, re-test
+        self._save_status()
+        with telemetry.span("test", phase=True):
+            return await self.test()
+
+    def _log(self, message: str, level: int = NORMAL):
+        """
+        Log a message to the agent's log file without blocking the event loop.
+        The message is echoed to stdout if `level` is within the configured verbosity.
+        """
+        self.log_writer.write(self.log_file, message, echo=f"[{self.component['name']}] {message}", level=level)
+
+    def has_existing_output(self) -> bool:
+        """
+        Returns True if the output of a previous build is present on disk.
+        Should be implemented by concrete agents.
+        """
+        return False
 
     def get_changes_summary(self) -> str:
         """
@@ -0,0 +1,272 @@
+"""
+Failure Context
+
+Turns structured test results into a compact debugging context: the
+failing test names, assertion diffs, trimmed tracebacks and only the
+regions of the implementation the failures point at, within a token
+budget. Also merges the corrected definitions the LLM returns back into
+the implementation.
+"""
+import ast
+import os
+import re
+import textwrap
+import xml.etree.ElementTree as ET
+from designbuilder.llm_backends.rate_limiter import estimate_tokens
+
+DEBUG_TOKEN_BUDGET = 4000       # default budget for the failure context of one debug prompt
+MAX_DIFF_LINES = 20             # "E" lines kept per failure
+MAX_FRAMES = 4                  # traceback frames kept per failure (innermost last)
+
+_LOCATION = re.compile(r"^(?P<path>[^\s:][^:]*\.py):(?P<lineno>\d+):", re.MULTILINE)
+_IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+_FRAME_SEPARATOR = re.compile(r"^(?:_ )+_?\s*$|^_{3,}.*_{3,}$", re.MULTILINE)
+
+def parse_junit_xml(path: str) -> tuple[int, int, list[dict]]:
+    """
+    Reads a pytest --junitxml report.
+
+    Returns:
+        The number of passed and failed tests, and a failure dict
+        (nodeid, when, message, longrepr) for each failure or error
+    """
+    root = ET.parse(path).getroot()
+    passed = failed = 0
+    failures = []
+    for case in root.iter("testcase"):
+        problem = next((child for child in case if child.tag in ("failure", "error")), None)
+        if problem is None:
+            if not any(child.tag == "skipped" for child in case):
+                passed += 1
+            continue
+        failed += 1
+        module = case.get("classname", "").replace(".", "/")
+        failures.append({
+            "nodeid": f"{module}.py::{case.get('name', '')}" if module else case.get("name", ""),
+            "when": "call" if problem.tag == "failure" else "setup",
+            "message": (problem.get("message") or "").splitlines()[0] if problem.get("message") else "",
+            "longrepr": problem.text or "",
+        })
+    return passed, failed, failures
+
+def trim_traceback(longrepr: str, max_frames: int = MAX_FRAMES, max_diff_lines: int = MAX_DIFF_LINES) -> str:
+    """
+    Keeps the essentials of a pytest long traceback: for each of the last
+    `max_frames` frames, the failing line (">"), the error and assertion
+    diff lines ("E") and the file location. Surrounding source is dropped;
+    the relevant code is sent separately.
+    """
+    frames = [frame for frame in _FRAME_SEPARATOR.split(longrepr) if frame.strip()]
+    kept = []
+    for frame in frames[-max_frames:]:
+        lines = []
+        diff_lines = 0
+        for line in frame.splitlines():
+            stripped = line.strip()
+            if stripped.startswith(">"):
+                lines.append(stripped)
+            elif stripped.startswith("E "):
+                diff_lines += 1
+                if diff_lines <= max_diff_lines:
+                    lines.append(stripped)
+                elif diff_lines == max_diff_lines + 1:
+                    lines.append("E   ... (diff truncated)")
+            elif _LOCATION.match(stripped):
+                lines.append(stripped)
+        if lines:
+            kept.append("\n".join(lines))
+    return "\n  ...\n".join(kept) if kept else "\n".join(longrepr.strip().splitlines()[-10:])
+
+def _definitions(tree: ast.AST) -> list:
+    """Every function, method and class definition in a module, outermost first."""
+    return [node for node in ast.walk(tree)
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+
+def _start_line(node) -> int:
+    """The first line of a statement, including any decorators."""
+    return min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+
+def outline(implementation: str) -> str:
+    """Returns the class and function signatures of a module, with line numbers."""
+    lines = implementation.splitlines()
+    try:
+        tree = ast.parse(implementation)
+    except SyntaxError:
+        return ""
+    entries = sorted((node.lineno, lines[node.lineno - 1].rstrip()) for node in _definitions(tree))
+    return "\n".join(f"{lineno:>4}: {text}" for lineno, text in entries)
+
+def relevant_regions(failures: list[dict], implementation: str, implementation_path: str) -> list[tuple[str, int, int]]:
+    """
+    Returns (name, first line, last line) of the implementation definitions
+    the failures point at, most relevant first: definitions containing a
+    traceback location in the implementation file, then definitions whose
+    names appear in the failure output.
+    """
+    try:
+        tree = ast.parse(implementation)
+    except SyntaxError:
+        return []
+    definitions = _definitions(tree)
+    basename = os.path.basename(implementation_path)
+    regions = []
+
+    def add(node):
+        region = (node.name, _start_line(node), node.end_lineno)
+        # Skip regions already covered by an enclosing region
+        if not any(start <= region[1] and region[2] <= end for _, start, end in regions):
+            regions[:] = [r for r in regions if not (region[1] <= r[1] and r[2] <= region[2])]
+            regions.append(region)
+
+    text = "\n".join(f"{f.get('message', '')}\n{f.get('longrepr', '')}" for f in failures)
+    for match in _LOCATION.finditer(text):
+        if os.path.basename(match.group("path")) != basename:
+            continue
+        lineno = int(match.group("lineno"))
+        enclosing = [node for node in definitions if _start_line(node) <= lineno <= node.end_lineno]
+        # The innermost function is the most specific region; fall back to the class
+        functions = [node for node in enclosing if not isinstance(node, ast.ClassDef)]
+        if functions or enclosing:
+            add(max(functions or enclosing, key=_start_line))
+
+    names = set(_IDENTIFIER.findall(text))
+    for node in definitions:
+        if node.name in names and not isinstance(node, ast.ClassDef):
+            add(node)
+    return regions
+
+def build_failure_context(failures: list[dict], implementation: str, implementation_path: str,
+                          token_budget: int = DEBUG_TOKEN_BUDGET) -> str:
+    """
+    Builds the debugging context for failed tests within `token_budget`
+    tokens. Failures come first, then the relevant code regions, then an
+    outline of the module; whatever does not fit is left out.
+    """
+    lines = implementation.splitlines()
+    parts = []
+
+    def fits(text: str) -> bool:
+        if estimate_tokens("\n\n".join(parts + [text])) > token_budget:
+            return False
+        parts.append(text)
+        return True
+
+    fits(f"{len(failures)} test(s) failed.")
+    for failure in failures:
+        name = failure["nodeid"].split("::")[-1] or failure["nodeid"]
+        header = f"FAILED {name} ({failure.get('when', 'call')})"
+        if failure.get("message"):
+            header += f": {failure['message'].splitlines()[0]}"
+        entry = f"{header}\n{trim_traceback(failure.get('longrepr', ''))}"
+        if not fits(entry):
+            if not fits(header):
+                break
+
+    for name, start, end in relevant_regions(failures, implementation, implementation_path):
+        region = "\n".join(f"{lineno:>4}: {lines[lineno - 1]}" for lineno in range(start, end + 1))
+        fits(f"Code of `{name}` (lines {start}-{end}):\n{region}")
+
+    module_outline = outline(implementation)
+    if module_outline:
+        fits(f"Module outline:\n{module_outline}")
+    return "\n\n".join(parts)
+
+def _replace_lines(lines: list[str], start: int, end: int, new_text: str, indent: str = ""):
+    """Replaces 1-based lines start..end with new_text, re-indented to `indent`."""
+    new_lines = [indent + line if line.strip() else line for line in textwrap.dedent(new_text).splitlines()]
+    lines[start - 1:end] = new_lines
+
+def _segment(source_lines: list[str], node) -> str:
+    return "\n".join(source_lines[_start_line(node) - 1:node.end_lineno])
+
+def merge_definitions(implementation: str, replacement: str) -> str:
+    """
+    Merges corrected definitions into an implementation.
+
+    Top-level functions and classes replace the definitions of the same
+    name; a class that leaves out some of the original's methods only
+    replaces the methods it contains. Methods returned on their own replace
+    the method of the same name. New imports are added at the top and new
+    definitions appended.
+
+    Raises:
+        SyntaxError: If the replacement or the merged result is not valid Python
+        ValueError: If a method cannot be matched to exactly one class
+    """
+    original = ast.parse(implementation)
+    patch = ast.parse(replacement)
+    source_lines = implementation.splitlines()
+    patch_lines = replacement.splitlines()
+    top_level = {node.name: node for node in original.body
+                 if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))}
+    edits = []     # (start, end, text, indent), applied bottom-up
+    appended = []
+    imports = []
+
+    def methods_of(cls):
+        return {node.name: node for node in cls.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))}
+
+    for node in patch.body:
+        text = _segment(patch_lines, node)
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if text.strip() not in implementation:
+                imports.append(text)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name in top_level:
+            target = top_level[node.name]
+            if isinstance(node, ast.ClassDef) and isinstance(target, ast.ClassDef) \
+                    and not set(methods_of(target)) <= set(methods_of(node)):
+                # A partial class: merge its methods one by one
+                target_methods = methods_of(target)
+                indent = " " * (target.body[0].col_offset if target.body else target.col_offset + 4)
+                for method in methods_of(node).values():
+                    method_text = _segment(patch_lines, method)
+                    if method.name in target_methods:
+                        existing = target_methods[method.name]
+                        edits.append((_start_line(existing), existing.end_lineno, method_text, indent))
+                    else:
+                        edits.append((target.end_lineno + 1, target.end_lineno, "\n" + method_text, indent))
+            else:
+                edits.append((_start_line(target), target.end_lineno, text, " " * target.col_offset))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            owners = [cls for cls in original.body if isinstance(cls, ast.ClassDef) and node.name in methods_of(cls)]
+            if len(owners) > 1:
+                raise ValueError(f"Method '{node.name}' matches more than one class")
+            if owners:
+                existing = methods_of(owners[0])[node.name]
+                edits.append((_start_line(existing), existing.end_lineno, text, " " * existing.col_offset))
+            else:
+                appended.append(text)
+        else:
+            appended.append(text)
+
+    merged = list(source_lines)
+    for start, end, text, indent in sorted(edits, key=lambda edit: (edit[0], edit[1]), reverse=True):
+        _replace_lines(merged, start, end, text, indent)
+    if imports:
+        # After the module docstring and __future__ imports, which must come first
+        position = 0
+        for node in original.body:
+            is_docstring = node is original.body[0] and isinstance(node, ast.Expr) \
+                and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+            if is_docstring or (isinstance(node, ast.ImportFrom) and node.module == "__future__"):
+                position = node.end_lineno
+            else:
+                break
+        merged[position:position] = imports
+    if appended:
+        merged += [""] + ["\n\n".join(appended)]
+    result = "\n".join(merged) + "\n"
+    ast.parse(result)
+    return result
+
+def _top_level_names(tree: ast.Module) -> set[str]:
+    return {node.name for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))}
+
+def is_full_replacement(implementation: str, replacement: str) -> bool:
+    """Returns True if the replacement redefines every top-level definition of the implementation."""
+    try:
+        original = _top_level_names(ast.parse(implementation))
+        patch = _top_level_names(ast.parse(replacement))
+    except SyntaxError:
+        return False
+    return bool(original) and original <= patch
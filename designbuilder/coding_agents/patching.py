@@ -0,0 +1,180 @@
+"""
+Patching
+
+Applies the edits an LLM returns instead of a whole file: search/replace
+blocks or unified diffs. All edits of a response are applied in memory
+and the result is validated before anything is written, so a response
+either applies completely or not at all.
+"""
+import ast
+import difflib
+import re
+
+_SEARCH_REPLACE = re.compile(
+    r"^[ \t]*<{5,}[ \t]*SEARCH[ \t]*\n(.*?)^[ \t]*={5,}[ \t]*\n(.*?)^[ \t]*>{5,}[ \t]*REPLACE[ \t]*$",
+    re.MULTILINE | re.DOTALL
+)
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+# Line numbers copied from the numbered code regions of a focused debug prompt ("  12: ")
+_LINE_NUMBER = re.compile(r"^ *(\d+): ?")
+
+class PatchError(ValueError):
+    """Raised when edits cannot be parsed or applied, or leave invalid code."""
+
+def _strip_line_numbers(lines: list[str], consecutive: bool = True) -> list[str]:
+    """
+    Returns `lines` without the line numbers copied from a numbered prompt
+    region, or None unless every line is numbered (consecutively, if
+    `consecutive`).
+    """
+    numbers = [_LINE_NUMBER.match(line) for line in lines if line.strip()]
+    if not numbers or not all(numbers):
+        return None
+    first = int(numbers[0].group(1))
+    if consecutive and [int(number.group(1)) for number in numbers] != list(range(first, first + len(numbers))):
+        return None
+    return [_LINE_NUMBER.sub("", line, count=1) for line in lines]
+
+def _find_block(lines: list[str], block: list[str], hint: int = 0) -> list[int]:
+    """
+    Returns the positions where `block` occurs in `lines`, ignoring trailing
+    whitespace, nearest to `hint` first.
+    """
+    if not block:
+        return []
+    stripped = [line.rstrip() for line in lines]
+    wanted = [line.rstrip() for line in block]
+    positions = [i for i in range(len(lines) - len(block) + 1) if stripped[i:i + len(block)] == wanted]
+    return sorted(positions, key=lambda i: abs(i - hint))
+
+def apply_search_replace(source: str, blocks: list[tuple[str, str]]) -> str:
+    """
+    Applies (search, replace) blocks in order. Each search text must match
+    exactly one place in the code.
+
+    Raises:
+        PatchError: If a search text is empty, missing or ambiguous
+    """
+    lines = source.splitlines()
+    for number, (search, replace) in enumerate(blocks, 1):
+        search_lines = search.splitlines()
+        replace_lines = replace.splitlines()
+        while search_lines and not search_lines[-1].strip():
+            search_lines.pop()
+        if not any(line.strip() for line in search_lines):
+            raise PatchError(f"Edit {number} has an empty SEARCH section")
+        positions = _find_block(lines, search_lines)
+        unnumbered = None if positions else _strip_line_numbers(search_lines)
+        if unnumbered:
+            # Line numbers copied from the prompt; the new lines may be numbered too
+            search_lines = unnumbered
+            replace_lines = _strip_line_numbers(replace_lines, consecutive=False) or replace_lines
+            positions = _find_block(lines, search_lines)
+        if not positions:
+            raise PatchError(f"The SEARCH text of edit {number} was not found")
+        if len(positions) > 1:
+            raise PatchError(f"The SEARCH text of edit {number} matches {len(positions)} places")
+        start = positions[0]
+        lines[start:start + len(search_lines)] = replace_lines
+    return "\n".join(lines) + "\n"
+
+def _parse_hunks(diff: str) -> list[tuple[int, list[str], list[str]]]:
+    """Returns (old start line, old lines, new lines) for each hunk of a unified diff."""
+    hunks = []
+    current = None
+    for line in diff.splitlines():
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+        elif current is None or line.startswith(("--- ", "+++ ")):
+            continue
+        elif line.startswith("\\"):  # "\ No newline at end of file"
+            continue
+        elif line.startswith("-"):
+            current[1].append(line[1:])
+        elif line.startswith("+"):
+            current[2].append(line[1:])
+        else:
+            # Context; some models drop the leading space of blank context lines
+            text = line[1:] if line.startswith(" ") else line
+            current[1].append(text)
+            current[2].append(text)
+    return hunks
+
+def apply_unified_diff(source: str, diff: str) -> str:
+    """
+    Applies the hunks of a unified diff. A hunk whose line numbers are off
+    is applied where its context matches nearest to the stated position.
+
+    Raises:
+        PatchError: If the diff has no hunks or a hunk's context is not found
+    """
+    hunks = _parse_hunks(diff)
+    if not hunks:
+        raise PatchError("The diff has no hunks")
+    lines = source.splitlines()
+    offset = 0
+    for number, (old_start, old_lines, new_lines) in enumerate(hunks, 1):
+        if not old_lines:
+            # A pure insertion; old_start is the line it goes after
+            start = min(max(old_start + offset, 0), len(lines))
+        else:
+            positions = _find_block(lines, old_lines, hint=old_start - 1 + offset)
+            if not positions:
+                raise PatchError(f"The context of hunk {number} was not found")
+            start = positions[0]
+        lines[start:start + len(old_lines)] = new_lines
+        offset += len(new_lines) - len(old_lines)
+    return "\n".join(lines) + "\n"
+
+def parse_edits(response: str) -> tuple[str, list]:
+    """
+    Detects the edit format of a response.
+
+    Returns:
+        ("search_replace", [(search, replace), ...]) or ("diff", diff text)
+
+    Raises:
+        PatchError: If the response holds no edits
+    """
+    blocks = [(search, replace) for search, replace in _SEARCH_REPLACE.findall(response)]
+    if blocks:
+        return "search_replace", blocks
+    if re.search(r"^@@ -\d+", response, re.MULTILINE):
+        return "diff", response
+    raise PatchError("The response contains no SEARCH/REPLACE blocks or diff hunks")
+
+def count_changed_lines(old: str, new: str) -> tuple[int, int]:
+    """Returns the number of lines added and removed between two versions of a file."""
+    added = removed = 0
+    for line in difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm="", n=0):
+        if line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            removed += 1
+    return added, removed
+
+def apply_edits(source: str, response: str) -> tuple[str, int]:
+    """
+    Applies every edit in a response to the source, all or nothing.
+
+    Returns:
+        The patched code and the number of edits applied
+
+    Raises:
+        PatchError: If the edits cannot be applied, change nothing, or leave
+            code that does not parse
+    """
+    kind, edits = parse_edits(response)
+    if kind == "search_replace":
+        patched, count = apply_search_replace(source, edits), len(edits)
+    else:
+        patched, count = apply_unified_diff(source, edits), len(_parse_hunks(edits))
+    if patched.strip() == source.strip():
+        raise PatchError("The edits do not change the code")
+    try:
+        ast.parse(patched)
+    except SyntaxError as e:
+        raise PatchError(f"The patched code has a syntax error at line {e.lineno}: {e.msg}") from e
+    return patched, count
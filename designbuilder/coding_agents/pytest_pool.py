@@ -0,0 +1,144 @@
+"""
+Pytest Worker Pool
+
+Keeps a pool of warm pytest worker processes, one per core by default,
+and hands test jobs to them over a local pipe. See pytest_worker.py for
+the worker side of the protocol.
+"""
+import asyncio
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pytest_worker.py")
+STREAM_LIMIT = 16 * 1024 * 1024  # a result line carries the full pytest output
+
+@dataclass
+class TestRunResult:
+    """The structured outcome of one pytest run."""
+    returncode: int
+    output: str
+    passed: int = 0
+    failed: int = 0
+    failures: list = field(default_factory=list)
+    timed_out: bool = False
+
+    __test__ = False  # not a pytest test class
+
+class _PytestWorker:
+    def __init__(self, process):
+        self.process = process
+        self.jobs = 0
+
+    @classmethod
+    async def spawn(cls) -> "_PytestWorker":
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=STREAM_LIMIT
+        )
+        return cls(process)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def run(self, job: dict) -> dict:
+        self.jobs += 1
+        self.process.stdin.write((json.dumps(job) + "\n").encode())
+        await self.process.stdin.drain()
+        line = await self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("pytest worker exited unexpectedly")
+        return json.loads(line)
+
+    async def kill(self):
+        if self.alive:
+            self.process.kill()
+        await self.process.wait()
+
+    async def close(self):
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                await self.kill()
+
+class PytestWorkerPool:
+    """
+    A pool of long-lived pytest workers.
+    """
+    def __init__(self, size: int = None, max_jobs_per_worker: int = 100):
+        self.size = size or os.cpu_count() or 1
+        # Workers are recycled periodically so leaked state from generated code cannot pile up
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._idle = asyncio.Queue()
+        self._spawned = 0
+        self.closed = False
+
+    async def start(self):
+        """Spawns every worker up front so the first test runs are warm too."""
+        missing = self.size - self._spawned
+        self._spawned += missing
+        workers = await asyncio.gather(*(_PytestWorker.spawn() for _ in range(missing)))
+        for worker in workers:
+            self._idle.put_nowait(worker)
+
+    async def _acquire(self) -> _PytestWorker:
+        if self._idle.empty() and self._spawned < self.size:
+            self._spawned += 1
+            try:
+                return await _PytestWorker.spawn()
+            except Exception:
+                self._spawned -= 1
+                raise
+        return await self._idle.get()
+
+    async def _release(self, worker: _PytestWorker):
+        if self.closed or not worker.alive or worker.jobs >= self.max_jobs_per_worker:
+            self._spawned -= 1
+            await worker.close()
+        else:
+            self._idle.put_nowait(worker)
+
+    async def run(self, test_file: str, cwd: str, pythonpath: list[str], timeout: float = None) -> TestRunResult:
+        """
+        Runs pytest on a test file in a warm worker.
+
+        Args:
+            test_file: The test file to run
+            cwd: Working directory for the run
+            pythonpath: Directories to put in front of sys.path for the run
+            timeout: Seconds to wait before killing the worker (None waits forever)
+        """
+        if self.closed:
+            raise RuntimeError("PytestWorkerPool is closed")
+        job = {"test_file": test_file, "cwd": cwd, "pythonpath": pythonpath}
+        worker = await self._acquire()
+        try:
+            result = await asyncio.wait_for(worker.run(job), timeout=timeout)
+        except asyncio.TimeoutError:
+            await worker.kill()
+            return TestRunResult(returncode=1, output=f"Test run timed out after {timeout} seconds.", timed_out=True)
+        except asyncio.CancelledError:
+            await worker.kill()
+            raise
+        except Exception as e:
+            # Generated code can take the whole worker down (e.g. os._exit or a segfault)
+            await worker.kill()
+            return TestRunResult(returncode=1, output=f"Test worker crashed: {e}")
+        finally:
+            await self._release(worker)
+        return TestRunResult(**result)
+
+    async def close(self):
+        """Stops every idle worker; busy workers stop when their job finishes."""
+        self.closed = True
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            self._spawned -= 1
+            await worker.close()
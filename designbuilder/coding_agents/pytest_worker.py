@@ -0,0 +1,116 @@
+"""
+Pytest Worker
+
+A long-lived process that runs pytest jobs in-process, so each test run
+skips interpreter startup, plugin discovery and pytest's own imports.
+
+Jobs arrive as JSON lines on stdin and results are written as JSON lines
+on the original stdout. Pytest's own output is captured and returned in
+the result. This script is started by PytestWorkerPool and does not
+import designbuilder.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+def _crash_message(report) -> str:
+    """Returns the one-line failure message (e.g. "assert 1 == 2") of a report, if pytest has one."""
+    crash = getattr(report.longrepr, "reprcrash", None)
+    return getattr(crash, "message", "") or ""
+
+class ResultCollector:
+    """A pytest plugin that records the outcome of every test."""
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+        self.failures = []
+
+    def pytest_runtest_logreport(self, report):
+        if report.passed and report.when == "call":
+            self.passed += 1
+        elif report.failed:
+            self.failed += 1
+            self.failures.append({
+                "nodeid": report.nodeid,
+                "when": report.when,
+                "message": _crash_message(report),
+                "longrepr": report.longreprtext,
+            })
+
+    def pytest_collectreport(self, report):
+        if report.failed:
+            self.failed += 1
+            self.failures.append({
+                "nodeid": report.nodeid,
+                "when": "collect",
+                "message": _crash_message(report),
+                "longrepr": report.longreprtext,
+            })
+
+def _purge_modules(roots: list[str]):
+    """Drops every imported module loaded from under one of the given directories."""
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None)
+        if module_file and any(os.path.abspath(module_file).startswith(root + os.sep) for root in roots):
+            del sys.modules[name]
+
+def run_job(job: dict) -> dict:
+    """Runs pytest on one test file in a fresh module namespace."""
+    roots = [os.path.abspath(path) for path in job.get("pythonpath", [])]
+    cwd = os.path.abspath(job.get("cwd") or os.getcwd())
+    saved_path = list(sys.path)
+    saved_cwd = os.getcwd()
+    saved_environ = dict(os.environ)
+
+    # Generated modules from an earlier job must not leak into this one
+    _purge_modules(roots + [cwd])
+    sys.path[:0] = roots
+    os.chdir(cwd)
+
+    collector = ResultCollector()
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            returncode = int(pytest.main(
+                [job["test_file"], "-v", "-p", "no:cacheprovider"],
+                plugins=[collector]
+            ))
+    except BaseException as e:  # pytest.main should not raise, but never kill the worker
+        returncode = 3
+        output.write(f"\nWorker error: {e!r}\n")
+    finally:
+        os.chdir(saved_cwd)
+        sys.path[:] = saved_path
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        _purge_modules(roots + [cwd])
+
+    return {
+        "returncode": returncode,
+        "output": output.getvalue(),
+        "passed": collector.passed,
+        "failed": collector.failed,
+        "failures": collector.failures,
+    }
+
+def main():
+    # Keep the protocol channel private; anything else printed to fd 1
+    # (e.g. by C extensions) is discarded instead of corrupting it.
+    channel = os.fdopen(os.dup(1), "w")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    sys.stdout = io.TextIOWrapper(os.fdopen(1, "wb"), write_through=True)
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        result = run_job(json.loads(line))
+        channel.write(json.dumps(result) + "\n")
+        channel.flush()
+
+if __name__ == "__main__":
+    main()
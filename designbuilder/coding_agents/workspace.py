@@ -0,0 +1,107 @@
+"""
+Agent Workspaces
+
+Each agent writes and tests its component in a private directory under
+`<output>/.workspaces/<module>/`, so agents running in parallel never
+import each other's half-written modules. The workspace's `classes/`
+directory also holds the finished modules of the shared output tree, as
+a snapshot of hard links (or copies where hard links are not possible)
+taken when the agent starts: its dependencies have completed by
+then, and a module published later replaces the shared file rather than
+changing the snapshot. Once the component's tests pass, its
+implementation and tests are merged into the shared `classes/` and
+`tests/` directories.
+
+The import path of a workspace is fixed by its layout, so setting up a
+test run does not scan the output tree.
+"""
+import os
+import shutil
+import threading
+
+WORKSPACES_DIR = ".workspaces"
+_IGNORED = shutil.ignore_patterns("__pycache__", ".pytest_cache", "*.pyc")
+
+def _link(source: str, target: str):
+    """
+    Hard links `target` to `source`, or copies it where hard links are not
+    possible. Never a symlink: it would follow the shared file when it is replaced.
+    """
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+def _publish(source: str, target: str):
+    """Copies a file into place atomically, so readers see either the old or the new version."""
+    temp_path = os.path.join(os.path.dirname(target),
+                             f".{os.path.basename(target)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    shutil.copyfile(source, temp_path)
+    os.replace(temp_path, target)
+
+class AgentWorkspace:
+    """
+    The private directory tree of one component:
+
+        classes/<module>.py       the implementation being built
+        classes/*.py              links to the finished modules of the shared output tree
+        tests/test_<module>.py    its tests
+    """
+    def __init__(self, output_dir: str, module_name: str):
+        self.output_dir = output_dir
+        self.module_name = module_name
+        self.root = os.path.join(output_dir, WORKSPACES_DIR, module_name)
+        self.class_file = os.path.join(self.root, "classes", f"{module_name}.py")
+        self.test_file = os.path.join(self.root, "tests", f"test_{module_name}.py")
+        self.output_class_file = os.path.join(output_dir, "classes", f"{module_name}.py")
+        self.output_test_file = os.path.join(output_dir, "tests", f"test_{module_name}.py")
+
+    @staticmethod
+    def pythonpath(root: str) -> list[str]:
+        """The import path of a test run in the workspace (or a copy of it) at `root`."""
+        return [root, os.path.join(root, "classes"), os.path.join(root, "tests")]
+
+    def test_file_in(self, root: str) -> str:
+        """The component's test file in the workspace (or a copy of it) at `root`."""
+        return os.path.join(root, "tests", os.path.basename(self.test_file))
+
+    def create(self):
+        """
+        Creates the workspace, replacing the dependency snapshot of any
+        previous run with the modules finished so far.
+        """
+        classes_dir = os.path.dirname(self.class_file)
+        os.makedirs(classes_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(self.test_file), exist_ok=True)
+        own_module = os.path.basename(self.class_file)
+        for entry in os.scandir(classes_dir):
+            if entry.name != own_module:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+        shared_classes = os.path.dirname(self.output_class_file)
+        if not os.path.isdir(shared_classes):
+            return
+        for entry in os.scandir(shared_classes):
+            if entry.name.endswith(".py") and entry.name != own_module and entry.is_file():
+                _link(entry.path, os.path.join(classes_dir, entry.name))
+
+    def copy_to(self, scratch: str, code: str):
+        """
+        Copies the workspace to a scratch directory (linking rather than
+        copying files), with `code` as the component's implementation.
+        """
+        shutil.copytree(self.root, scratch, ignore=_IGNORED, copy_function=_link)
+        class_file = os.path.join(scratch, "classes", os.path.basename(self.class_file))
+        os.remove(class_file)  # a link to the workspace's file
+        with open(class_file, "w") as f:
+            f.write(code)
+
+    def merge(self):
+        """Publishes the implementation and tests to the shared output tree."""
+        os.makedirs(os.path.dirname(self.output_class_file), exist_ok=True)
+        os.makedirs(os.path.dirname(self.output_test_file), exist_ok=True)
+        # The module last, so it is never published without its tests
+        _publish(self.test_file, self.output_test_file)
+        _publish(self.class_file, self.output_class_file)
@@ -1,8 +1,16 @@
-import yaml, time, os, hashlib, json
+import yaml, time, os, hashlib, json, sqlite3
 
-CACHE_FILE = "/home/karthik/repos/DesignBuilder/designbuilder/cache/plan_cache.json"
+CACHE_FILE = "/home/karthik/repos/DesignBuilder/designbuilder/cache/plan_cache.json"  # legacy, migrated on first use
+CACHE_DB_FILE = "/home/karthik/repos/DesignBuilder/designbuilder/cache/plan_cache.db"
+MAX_AGE_SECONDS = 90 * 24 * 60 * 60  # plans written more than 90 days ago are evicted automatically
 
 class CacheManager:
+    """
+    An indexed plan store backed by SQLite in WAL mode. Every write is a
+    single transaction, so concurrent builds can share the cache safely,
+    and lookups by document hash use the primary key index.
+    """
+    _conn = None
 
     @staticmethod
     def _hash_doc(doc_text):
@@ -10,10 +18,152 @@ class CacheManager:
         return hashlib.sha256(key).hexdigest()
 
     @staticmethod
-    def _load_cache():
-        return json.load(open(CACHE_FILE)) if os.path.exists(CACHE_FILE) else {}
+    def _component_inputs(component):
+        """
+        The design inputs of a component: the hashes of the document sections
+        it was extracted from or, for components without sections (e.g. given
+        directly), its description and plan. Plans are regenerated for every
+        component whenever any document changes, so they are not used when
+        the sections are known.
+        """
+        sources = component.get("sources") or ([component["source"]] if component.get("source") else [])
+        section_hashes = [source.get("section_hash") for source in sources if isinstance(source, dict)]
+        if section_hashes and all(section_hashes):
+            return {"sections": sorted(section_hashes)}
+        return {"description": component.get("description"), "plan": component.get("plan")}
 
     @staticmethod
-    def _save_cache(cache):
-        json.dump(cache, open(CACHE_FILE, "w"), indent=2)
+    def _hash_component(component, model, prompt_version, upstream_fingerprints=()):
+        """
+        Fingerprints a component's name, design inputs, prompt version and
+        model, plus the fingerprints of the components it depends on.
+        """
+        key = json.dumps({
+            "name": component.get("name"),
+            "inputs": CacheManager._component_inputs(component),
+            "model": model,
+            "prompt_version": prompt_version,
+            "upstream": list(upstream_fingerprints),
+        }, sort_keys=True, default=str).encode()
+        return hashlib.sha256(key).hexdigest()
+
+    @classmethod
+    def _connect(cls):
+        if cls._conn is None:
+            os.makedirs(os.path.dirname(CACHE_DB_FILE), exist_ok=True)
+            conn = sqlite3.connect(CACHE_DB_FILE, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS plans ("
+                    " doc_hash TEXT PRIMARY KEY, plan TEXT NOT NULL, timestamp REAL NOT NULL,"
+                    " model TEXT, prompt_version TEXT)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS plans_timestamp ON plans (timestamp)")
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            cls._conn = conn
+            cls._migrate_legacy_cache()
+        return cls._conn
+
+    @classmethod
+    def _migrate_legacy_cache(cls):
+        """Imports entries from the old single-file JSON cache once."""
+        conn = cls._conn
+        with conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_migrated'").fetchone():
+                return
+            if os.path.exists(CACHE_FILE):
+                try:
+                    with open(CACHE_FILE) as f:
+                        legacy = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"Warning: could not migrate legacy plan cache {CACHE_FILE}: {e}")
+                    legacy = {}
+                conn.executemany(
+                    "INSERT OR IGNORE INTO plans (doc_hash, plan, timestamp, model, prompt_version)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [(doc_hash, json.dumps(entry.get("plan")), entry.get("timestamp", time.time()),
+                      entry.get("model"), entry.get("prompt_version"))
+                     for doc_hash, entry in legacy.items()]
+                )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_json_migrated', '1')")
+
+    @classmethod
+    def get_plan(cls, doc_hash):
+        """
+        Returns the cache entry for a document hash, or None if it is not cached.
+        """
+        row = cls._connect().execute(
+            "SELECT plan, timestamp, model, prompt_version FROM plans WHERE doc_hash = ?", (doc_hash,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"plan": json.loads(row[0]), "timestamp": row[1], "model": row[2], "prompt_version": row[3]}
+
+    @classmethod
+    def put_plan(cls, doc_hash, plan, model, prompt_version):
+        """
+        Stores a plan atomically and evicts entries older than MAX_AGE_SECONDS.
+        """
+        now = time.time()
+        conn = cls._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO plans (doc_hash, plan, timestamp, model, prompt_version)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (doc_hash, json.dumps(plan), now, model, prompt_version)
+            )
+            conn.execute("DELETE FROM plans WHERE timestamp < ?", (now - MAX_AGE_SECONDS,))
+
+    @classmethod
+    def stats(cls):
+        """
+        Returns entry counts, size and age range of the plan cache.
+        """
+        conn = cls._connect()
+        entries, size, oldest, newest = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(plan)), 0), MIN(timestamp), MAX(timestamp) FROM plans"
+        ).fetchone()
+        by_model = dict(conn.execute("SELECT COALESCE(model, 'unknown'), COUNT(*) FROM plans GROUP BY model"))
+        by_prompt_version = dict(conn.execute(
+            "SELECT COALESCE(prompt_version, 'unknown'), COUNT(*) FROM plans GROUP BY prompt_version"
+        ))
+        return {
+            "entries": entries,
+            "bytes": size,
+            "oldest": oldest,
+            "newest": newest,
+            "by_model": by_model,
+            "by_prompt_version": by_prompt_version,
+        }
+
+    @classmethod
+    def prune(cls, max_age_seconds=None, model=None, prompt_version=None):
+        """
+        Deletes entries matching all of the given criteria.
+
+        Args:
+            max_age_seconds: Delete entries older than this
+            model: Delete entries generated by this model
+            prompt_version: Delete entries generated with this prompt version
+
+        Returns:
+            The number of deleted entries
+        """
+        clauses, params = [], []
+        if max_age_seconds is not None:
+            clauses.append("timestamp < ?")
+            params.append(time.time() - max_age_seconds)
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        if prompt_version is not None:
+            clauses.append("prompt_version = ?")
+            params.append(prompt_version)
+        if not clauses:
+            raise ValueError("At least one prune criterion is required.")
 
+        conn = cls._connect()
+        with conn:
+            deleted = conn.execute(f"DELETE FROM plans WHERE {' AND '.join(clauses)}", params).rowcount
+        return deleted
@@ -0,0 +1,150 @@
+"""
+Dependency Graph
+
+Builds a DAG of components from the `dependencies` listed in their plans,
+so the orchestrator can build prerequisites before their dependents.
+"""
+import re
+
+# Relative cost of a component, used to weight the critical path.
+COMPLEXITY_WEIGHT = {"low": 1, "medium": 2, "high": 3}
+DEFAULT_WEIGHT = 2
+
+def _tokens(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+class DependencyGraph:
+    """
+    A directed graph of component names. An edge A -> B means B depends on A.
+    """
+    def __init__(self, components: list[dict]):
+        self.nodes = [component['name'] for component in components]
+        self.dependencies = {name: set() for name in self.nodes}  # prerequisites of a node
+        self.dependents = {name: set() for name in self.nodes}    # nodes waiting on a node
+        self.weights = {}
+
+        for component in components:
+            name = component['name']
+            plan = component.get('plan')
+            plan = plan if isinstance(plan, dict) else {}
+            complexity = str(plan.get('complexity', '')).strip().lower()
+            self.weights[name] = COMPLEXITY_WEIGHT.get(complexity, DEFAULT_WEIGHT)
+
+            for dependency in plan.get('dependencies') or []:
+                prerequisite = self._resolve(dependency)
+                if prerequisite and prerequisite != name:
+                    self.add_edge(prerequisite, name)
+
+    def _resolve(self, dependency) -> str:
+        """
+        Maps a free-form dependency (e.g. "Router (for dispatching requests)")
+        to a component name. External modules and libraries resolve to None.
+        """
+        dependency_tokens = _tokens(dependency)
+        best = None
+        for name in self.nodes:
+            name_tokens = _tokens(name)
+            if not name_tokens:
+                continue
+            width = len(name_tokens)
+            for i in range(len(dependency_tokens) - width + 1):
+                if dependency_tokens[i:i + width] == name_tokens:
+                    # Prefer the longest match ("Request Handler" over "Handler")
+                    if best is None or width > len(_tokens(best)):
+                        best = name
+                    break
+        return best
+
+    def add_edge(self, prerequisite: str, dependent: str):
+        self.dependencies[dependent].add(prerequisite)
+        self.dependents[prerequisite].add(dependent)
+
+    def remove_edge(self, prerequisite: str, dependent: str):
+        self.dependencies[dependent].discard(prerequisite)
+        self.dependents[prerequisite].discard(dependent)
+
+    def find_cycle(self) -> list[str]:
+        """
+        Returns a cycle as a list of names [A, B, ..., A], or None if the graph is acyclic.
+        """
+        WHITE, GREY, BLACK = 0, 1, 2
+        color = {name: WHITE for name in self.nodes}
+        for root in self.nodes:
+            if color[root] != WHITE:
+                continue
+            stack = [(root, iter(sorted(self.dependents[root])))]
+            path = [root]
+            color[root] = GREY
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    path.pop()
+                    color[node] = BLACK
+                elif color[child] == GREY:
+                    return path[path.index(child):] + [child]
+                elif color[child] == WHITE:
+                    color[child] = GREY
+                    path.append(child)
+                    stack.append((child, iter(sorted(self.dependents[child]))))
+        return None
+
+    def break_cycles(self) -> list[tuple[str, str]]:
+        """
+        Removes the closing edge of every cycle until the graph is acyclic.
+
+        Returns:
+            The removed (prerequisite, dependent) edges
+        """
+        removed = []
+        cycle = self.find_cycle()
+        while cycle:
+            prerequisite, dependent = cycle[-2], cycle[-1]
+            self.remove_edge(prerequisite, dependent)
+            removed.append((prerequisite, dependent))
+            cycle = self.find_cycle()
+        return removed
+
+    def waves(self) -> list[list[str]]:
+        """
+        Groups nodes into topological waves; every node's prerequisites are in earlier waves.
+        """
+        remaining = {name: len(self.dependencies[name]) for name in self.nodes}
+        wave = [name for name in self.nodes if remaining[name] == 0]
+        waves = []
+        while wave:
+            waves.append(wave)
+            next_wave = set()
+            for name in wave:
+                for dependent in self.dependents[name]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        next_wave.add(dependent)
+            wave = [name for name in self.nodes if name in next_wave]
+        if sum(len(w) for w in waves) != len(self.nodes):
+            raise ValueError(f"Dependency cycle detected: {' -> '.join(self.find_cycle())}")
+        return waves
+
+    def critical_path_lengths(self) -> dict:
+        """
+        Returns, for each node, the weighted length of the longest chain
+        starting at that node and running through its dependents.
+        """
+        lengths = {}
+        for wave in reversed(self.waves()):
+            for name in wave:
+                tail = max((lengths[d] for d in self.dependents[name]), default=0)
+                lengths[name] = self.weights[name] + tail
+        return lengths
+
+    def descendants(self, name: str) -> set:
+        """Returns every node that transitively depends on `name`."""
+        seen = set()
+        stack = list(self.dependents[name])
+        while stack:
+            node = stack.pop()
+            if node not in seen:
+                seen.add(node)
+                stack.extend(self.dependents[node])
+        return seen
@@ -0,0 +1,134 @@
+"""
+File Watching
+
+Blocks until a file changes. On Linux the file's directory is watched
+with inotify (through ctypes, so there is no extra dependency), which
+also notices the file being created again after a log rotation; other
+platforms, or a host out of inotify watches, fall back to polling.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+POLL_INTERVAL = 0.25  # seconds between checks when polling
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+def _load_libc():
+    if not hasattr(os, "uname") or os.uname().sysname != "Linux":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+class FileWatcher:
+    """
+    Waits for a file to be written, created, moved or deleted.
+
+    Use as a context manager, or call close() when done.
+    """
+    _libc = None
+    _libc_loaded = False
+
+    def __init__(self, path: str, poll_interval: float = POLL_INTERVAL, use_inotify: bool = True):
+        self.path = os.path.abspath(path)
+        self.name = os.fsencode(os.path.basename(self.path))
+        self.poll_interval = poll_interval
+        self._fd = self._inotify(os.path.dirname(self.path)) if use_inotify else None
+        self._last_stat = self._stat()
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd is not None
+
+    def _inotify(self, directory: str):
+        """Returns an inotify descriptor watching `directory`, or None to poll instead."""
+        if not FileWatcher._libc_loaded:
+            FileWatcher._libc = _load_libc()
+            FileWatcher._libc_loaded = True
+        libc = FileWatcher._libc
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _matching_event(self, data: bytes) -> bool:
+        """True if any event in a batch read from the inotify descriptor concerns the watched file."""
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name == self.name:
+                return True
+        return False
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Blocks until the file changes or `timeout` seconds pass.
+
+        Returns:
+            True if the file changed, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if self._fd is not None:
+                ready, _, _ = select.select([self._fd], [], [], remaining)
+                if ready:
+                    try:
+                        data = os.read(self._fd, 64 * 1024)
+                    except BlockingIOError:
+                        data = b""
+                    if self._matching_event(data):
+                        return True
+            else:
+                time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+                current = self._stat()
+                if current != self._last_stat:
+                    self._last_stat = current
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "FileWatcher":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
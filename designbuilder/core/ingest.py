@@ -0,0 +1,198 @@
+"""
+Document Ingestion
+
+Extracts text from design documents in a process pool: documents are
+read in parallel and large PDFs are split into page ranges. Extracted
+text is cached on disk, keyed on path, size, mtime and content hash, so
+unchanged documents are never parsed twice.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from designbuilder.core import telemetry
+
+TEXT_CACHE_FILE = "/home/karthik/repos/DesignBuilder/designbuilder/cache/text_cache.db"
+PAGES_PER_TASK = 20          # PDF pages extracted by one worker task
+TEXT_EXTENSIONS = (".md", ".mdx")
+POOL_EXTENSIONS = (".pdf", ".docx")  # CPU-bound formats extracted in worker processes
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _page_ranges(page_count: int, pages_per_task: int = PAGES_PER_TASK) -> list[tuple[int, int]]:
+    """Splits [0, page_count) into consecutive ranges of at most `pages_per_task` pages."""
+    return [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+# Worker-process functions (module level so they can be pickled). The
+# document libraries are imported on first use, in the workers that need them.
+
+def _pdf_page_count(path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+def _extract_pdf_pages(path: str, start: int, end: int) -> str:
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return "".join(reader.pages[i].extract_text() or "" for i in range(start, end))
+
+def _extract_docx(path: str) -> str:
+    import docx
+    return "".join(f"{paragraph.text}\n" for paragraph in docx.Document(path).paragraphs)
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+class TextCache:
+    """
+    An SQLite store of extracted document text.
+
+    A document whose path, size and mtime are unchanged is served without
+    being read. Otherwise its content hash is checked, so a touched or
+    copied document is still not re-parsed.
+    """
+    def __init__(self, path: str = TEXT_CACHE_FILE):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+                " content_hash TEXT NOT NULL, text TEXT NOT NULL, extracted_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS documents_content_hash ON documents (content_hash)")
+            self._conn.commit()
+        return self._conn
+
+    def lookup(self, path: str) -> tuple:
+        """
+        Returns (text, content_hash, stat) for a document. text is None on a
+        miss; content_hash is None if the stat check alone was enough.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT text FROM documents WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        if row:
+            self.hits += 1
+            telemetry.record_cache("text", True)
+            return row[0], None, stat
+
+        content_hash = _hash_file(path)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT text FROM documents WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+            if row:
+                self._store(conn, path, stat, content_hash, row[0])
+        if row:
+            self.hits += 1
+            telemetry.record_cache("text", True)
+            return row[0], content_hash, stat
+        self.misses += 1
+        telemetry.record_cache("text", False)
+        return None, content_hash, stat
+
+    def put(self, path: str, stat: os.stat_result, content_hash: str, text: str):
+        """Stores extracted text under the size and mtime the document had when it was hashed."""
+        path = os.path.abspath(path)
+        with self._lock:
+            self._store(self._connection(), path, stat, content_hash, text)
+
+    def _store(self, conn: sqlite3.Connection, path: str, stat: os.stat_result, content_hash: str, text: str):
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (path, size, mtime_ns, content_hash, text, extracted_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, content_hash, text, time.time())
+        )
+        conn.commit()
+
+async def _extract(path: str, pool: ProcessPoolExecutor) -> str:
+    """Extracts a document's text, splitting large PDFs across the pool."""
+    loop = asyncio.get_running_loop()
+    _, extension = os.path.splitext(path)
+    if extension == ".pdf":
+        page_count = await loop.run_in_executor(pool, _pdf_page_count, path)
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(pool, _extract_pdf_pages, path, start, end)
+            for start, end in _page_ranges(page_count)
+        ))
+        return "".join(parts)
+    if extension == ".docx":
+        return await loop.run_in_executor(pool, _extract_docx, path)
+    if extension not in TEXT_EXTENSIONS:
+        print(f"Warning: Unsupported file type: {extension}. Reading as plain text.")
+    return await asyncio.to_thread(_read_text, path)
+
+async def read_documents(paths: list[str], cache: TextCache = None, max_workers: int = None) -> list[str]:
+    """
+    Returns the extracted text of each document, in order.
+
+    Cached documents are returned without being parsed; the rest are
+    extracted concurrently, with PDFs and DOCX files in worker processes.
+    A document that cannot be read yields an empty string.
+    """
+    with telemetry.span("ingest", documents=len(paths)):
+        return await _read_documents(paths, cache or TextCache(), max_workers)
+
+async def _read_documents(paths: list[str], cache: TextCache, max_workers: int) -> list[str]:
+    started = time.monotonic()
+    texts = [""] * len(paths)
+    misses = []
+    cached = 0
+    lookups = await asyncio.gather(*(asyncio.to_thread(cache.lookup, path) for path in paths),
+                                   return_exceptions=True)
+    for i, (path, lookup) in enumerate(zip(paths, lookups)):
+        if isinstance(lookup, BaseException):
+            print(f"Error reading {path}: {lookup}")
+            continue
+        text, content_hash, stat = lookup
+        if text is None:
+            misses.append((i, path, content_hash, stat))
+        else:
+            texts[i] = text
+            cached += 1
+
+    if misses:
+        needs_pool = any(os.path.splitext(path)[1] in POOL_EXTENSIONS for _, path, _, _ in misses)
+        pool = ProcessPoolExecutor(max_workers=max_workers) if needs_pool else None
+        try:
+            results = await asyncio.gather(*(_extract(path, pool) for _, path, _, _ in misses),
+                                           return_exceptions=True)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        for (i, path, content_hash, stat), result in zip(misses, results):
+            if isinstance(result, BaseException):
+                print(f"Error reading {path}: {result}")
+                continue
+            texts[i] = result
+            await asyncio.to_thread(cache.put, path, stat, content_hash, result)
+
+    print(f"Ingested {len(paths)} document(s) in {time.monotonic() - started:.2f}s "
+          f"({cached} from the text cache).")
+    return texts
+
+async def read_document(path: str, cache: TextCache = None) -> str:
+    """Returns the extracted text of one document."""
+    return (await read_documents([path], cache))[0]
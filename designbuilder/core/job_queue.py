@@ -0,0 +1,247 @@
+"""
+Job Queue
+
+A durable queue of component build jobs in an SQLite database, shared by
+the orchestrator that enqueues them and the `designbuilder worker`
+processes that run them. Workers claim a job by taking a lease on it and
+renew the lease while the agent runs; a job whose worker died is handed
+to another worker once its lease expires.
+
+Every write bumps a version number stored with the jobs it touched, so
+the orchestrator reads only the jobs that changed since its last look.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from designbuilder.core.status_manager import next_version
+
+QUEUE_FILE = "/home/karthik/repos/DesignBuilder/designbuilder/cache/jobs.db"
+JOB_RETENTION = 7 * 24 * 60 * 60 # finished jobs are purged after a week
+LEASE_SECONDS = 60.0            # a running job is handed to another worker if not renewed within this
+MAX_ATTEMPTS = 3                # leases a job may lose before it is failed
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+@dataclass
+class Job:
+    """A component build job."""
+    id: int
+    build_id: str
+    agent_name: str
+    component: dict = None  # only loaded for a claimed job
+    options: dict = field(default_factory=dict)
+    status: str = PENDING
+    worker: str = None
+    attempts: int = 0
+    progress: dict = field(default_factory=dict)  # the agent's latest status record
+    result: dict = None
+
+def default_worker_id() -> str:
+    """Identifies a worker process across hosts."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class JobQueue:
+    """
+    Enqueues, leases and completes component jobs.
+
+    The database is in WAL mode by default. WAL needs shared memory, so
+    workers on other hosts must use a queue opened with `shared=True` on a
+    network filesystem with working file locks, which uses a rollback journal.
+    """
+    def __init__(self, path: str = None, shared: bool = False):
+        self.path = path or QUEUE_FILE
+        self.shared = shared
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute(f"PRAGMA journal_mode={'DELETE' if shared else 'WAL'}")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, build_id TEXT NOT NULL, agent_name TEXT NOT NULL,"
+                " component TEXT NOT NULL, options TEXT NOT NULL, priority INTEGER NOT NULL,"
+                " status TEXT NOT NULL, worker TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0,"
+                " progress TEXT NOT NULL DEFAULT '{}', result TEXT, version INTEGER NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_build_version ON jobs (build_id, version)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    @property
+    def watch_path(self) -> str:
+        """The file that changes on every write, for a FileWatcher."""
+        return self.path if self.shared else self.path + "-wal"
+
+    def enqueue(self, build_id: str, agent_name: str, component: dict, options: dict = None,
+                priority: int = 0) -> int:
+        """
+        Adds a job for a component and returns its id.
+
+        Args:
+            build_id: The build the job belongs to
+            agent_name: The agent that builds the component, e.g. agent-3
+            component: The planned component
+            options: PythonAgent settings for the worker (output_dir, log_dir, use_llm_cache, ...)
+            priority: Lower values are claimed first
+        """
+        with self._lock, self._conn:
+            version = next_version(self._conn)
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (build_id, agent_name, component, options, priority, status, version, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (build_id, agent_name, json.dumps(component), json.dumps(options or {}), priority, PENDING,
+                 version, time.time())
+            )
+        return cursor.lastrowid
+
+    def claim(self, worker: str, lease_seconds: float = LEASE_SECONDS) -> Job:
+        """
+        Leases the next pending job (or one whose lease expired) to a worker.
+
+        Returns:
+            The job, or None if there is nothing to run
+        """
+        while True:
+            now = time.time()
+            with self._lock:
+                # A cheap read first, so idle workers polling the queue never take the write lock
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? OR (status = ? AND lease_expires < ?)"
+                    " ORDER BY status = ?, priority, id LIMIT 1",
+                    (PENDING, RUNNING, now, RUNNING)
+                ).fetchone()
+                if row is None:
+                    return None
+                with self._conn:
+                    current = self._conn.execute("SELECT status, attempts FROM jobs WHERE id = ?", (row[0],)).fetchone()
+                    if current[0] == RUNNING and current[1] >= MAX_ATTEMPTS:
+                        version = next_version(self._conn)
+                        self._conn.execute(
+                            "UPDATE jobs SET status = ?, result = ?, version = ?, lease_expires = NULL"
+                            " WHERE id = ? AND status = ? AND lease_expires < ?",
+                            (FAILED, json.dumps({"status": "failed", "error": f"Lost its worker {current[1]} times."}),
+                             version, row[0], RUNNING, now)
+                        )
+                        continue
+                    version = next_version(self._conn)
+                    claimed = self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1,"
+                        " version = ? WHERE id = ? AND (status = ? OR (status = ? AND lease_expires < ?))",
+                        (RUNNING, worker, now + lease_seconds, version, row[0], PENDING, RUNNING, now)
+                    ).rowcount
+                if claimed:
+                    return self.get(row[0])
+            # Another worker claimed it first; try the next one
+
+    def get(self, job_id: int) -> Job:
+        """Returns a job, including its component and options."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, build_id, agent_name, component, options, status, worker, attempts, progress, result"
+                " FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(row[0], row[1], row[2], json.loads(row[3]), json.loads(row[4]), row[5], row[6], row[7],
+                   json.loads(row[8]), json.loads(row[9]) if row[9] else None)
+
+    def renew(self, job_ids: list[int], worker: str, lease_seconds: float = LEASE_SECONDS) -> list[int]:
+        """
+        Extends the leases a worker holds. Returns the ids of the jobs the
+        worker no longer holds (e.g. cancelled, or re-leased after a stall).
+        """
+        if not job_ids:
+            return []
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = ?",
+                [(time.time() + lease_seconds, job_id, worker, RUNNING) for job_id in job_ids]
+            )
+            held = {row[0] for row in self._conn.execute(
+                f"SELECT id FROM jobs WHERE worker = ? AND status = ? AND id IN ({','.join('?' * len(job_ids))})",
+                (worker, RUNNING, *job_ids)
+            )}
+        return [job_id for job_id in job_ids if job_id not in held]
+
+    def report(self, job_id: int, worker: str, progress: dict):
+        """Merges an agent status update into a running job's progress."""
+        self.report_many(worker, {job_id: progress})
+
+    def report_many(self, worker: str, progress: dict[int, dict]):
+        """Merges the status updates of several running jobs (by job id) in one transaction."""
+        with self._lock, self._conn:
+            version = next_version(self._conn)
+            self._conn.executemany(
+                "UPDATE jobs SET progress = json_patch(progress, ?), version = ? WHERE id = ? AND worker = ? AND status = ?",
+                [(json.dumps(fields), version, job_id, worker, RUNNING) for job_id, fields in progress.items()]
+            )
+
+    def finish(self, job_id: int, worker: str, result: dict, failed: bool = False) -> bool:
+        """
+        Completes a job with its result. Returns False if the worker no longer held the job.
+        """
+        with self._lock, self._conn:
+            version = next_version(self._conn)
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, lease_expires = NULL, version = ?"
+                " WHERE id = ? AND worker = ? AND status = ?",
+                (FAILED if failed else DONE, json.dumps(result), version, job_id, worker, RUNNING)
+            ).rowcount == 1
+
+    def release(self, job_id: int, worker: str) -> bool:
+        """Returns a job a worker is stopping without finishing to the queue, for another worker."""
+        with self._lock, self._conn:
+            version = next_version(self._conn)
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, attempts = attempts - 1,"
+                " version = ? WHERE id = ? AND worker = ? AND status = ?",
+                (PENDING, version, job_id, worker, RUNNING)
+            ).rowcount == 1
+
+    def cancel(self, build_id: str) -> int:
+        """Cancels every unfinished job of a build; returns how many were cancelled."""
+        with self._lock, self._conn:
+            version = next_version(self._conn)
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, lease_expires = NULL, version = ? WHERE build_id = ? AND status IN (?, ?)",
+                (CANCELLED, version, build_id, PENDING, RUNNING)
+            ).rowcount
+
+    def changes_since(self, build_id: str, version: int) -> tuple[int, list[Job]]:
+        """
+        Returns the current version and a build's jobs written after `version`
+        (without their components).
+        """
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            rows = self._conn.execute(
+                "SELECT id, build_id, agent_name, status, worker, attempts, progress, result FROM jobs"
+                " WHERE build_id = ? AND version > ? ORDER BY id", (build_id, version)
+            ).fetchall()
+        jobs = [Job(r[0], r[1], r[2], status=r[3], worker=r[4], attempts=r[5], progress=json.loads(r[6]),
+                    result=json.loads(r[7]) if r[7] else None) for r in rows]
+        return int(row[0]) if row else 0, jobs
+
+    def purge(self, older_than: float) -> int:
+        """Deletes finished jobs created more than `older_than` seconds ago."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED))}) AND created_at < ?",
+                (*FINISHED, time.time() - older_than)
+            ).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
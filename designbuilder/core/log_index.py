@@ -0,0 +1,206 @@
+"""
+Log Index
+
+Finds and reads agent logs without scanning the log directory. Each agent
+registers its log file in a small SQLite index (in WAL mode) under the log
+directory, keyed on its agent name (`agent-N`) and component, so a lookup
+is a single indexed query even with thousands of historical runs. Logs
+written before the index existed are added the first time a lookup misses.
+
+Also provides a reverse tail that reads only the last blocks of a log, and
+a follow mode that streams lines as they are written.
+"""
+import os
+import sqlite3
+import threading
+import time
+from .file_watch import FileWatcher
+from .log_writer import LOG_DIR
+
+INDEX_FILE_NAME = "log_index.db"
+TAIL_BLOCK_SIZE = 64 * 1024
+
+def log_prefix(name: str) -> str:
+    """The file name prefix of a component's (or agent's) logs: the name with unsafe characters removed."""
+    sanitized = "".join(c for c in name if c.isalnum() or c in (' ', '_')).rstrip()
+    return sanitized.replace(' ', '_')
+
+def _prefix_of(file_name: str) -> str:
+    """The prefix of a `<prefix>_<YYYYMMDD-HHMMSS>.log` file name."""
+    return file_name[:-len(".log")].rsplit("_", 1)[0]
+
+class LogIndex:
+    """
+    Maps agent names and components to their log files.
+    """
+    _registry = {}  # log directory -> index
+    _registry_lock = threading.Lock()
+
+    def __init__(self, log_dir: str = LOG_DIR):
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, INDEX_FILE_NAME)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_dir(cls, log_dir: str = None) -> "LogIndex":
+        """Returns the process-wide index of a log directory."""
+        log_dir = log_dir or LOG_DIR
+        with cls._registry_lock:
+            if log_dir not in cls._registry:
+                cls._registry[log_dir] = cls(log_dir)
+            return cls._registry[log_dir]
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS logs ("
+                " file TEXT PRIMARY KEY, agent_name TEXT, component TEXT, prefix TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS logs_agent_name ON logs (agent_name, created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS logs_prefix ON logs (prefix, created_at)")
+            self._conn.commit()
+        return self._conn
+
+    def add(self, log_file: str, agent_name: str = None, component: str = None):
+        """Registers an agent's log file. The file itself may not have been written yet."""
+        file_name = os.path.basename(log_file)
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO logs (file, agent_name, component, prefix, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (file_name, agent_name, component, _prefix_of(file_name), time.time())
+                )
+                conn.commit()
+        except (OSError, sqlite3.Error) as e:
+            # The log is still found by the directory scan on a lookup miss
+            print(f"[LogIndex] Failed to register {log_file}: {e}")
+
+    def refresh(self) -> int:
+        """
+        Adds log files that are not in the index yet (e.g. from before the
+        index existed) and drops entries whose files are gone.
+
+        Returns:
+            The number of files added
+        """
+        try:
+            on_disk = {entry.name: entry for entry in os.scandir(self.log_dir)
+                       if entry.name.endswith(".log") and entry.is_file()}
+        except FileNotFoundError:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            indexed = {row[0] for row in conn.execute("SELECT file FROM logs")}
+            # Registered logs may not be written yet; only drop old entries
+            stale_before = time.time() - 24 * 60 * 60
+            conn.executemany(
+                "DELETE FROM logs WHERE file = ? AND created_at < ?",
+                [(name, stale_before) for name in indexed - on_disk.keys()]
+            )
+            new = [(name, _prefix_of(name), on_disk[name].stat().st_mtime) for name in on_disk.keys() - indexed]
+            conn.executemany("INSERT OR IGNORE INTO logs (file, prefix, created_at) VALUES (?, ?, ?)", new)
+            conn.commit()
+        return len(new)
+
+    def _query(self, name: str, limit: int = None) -> list[str]:
+        sql = ("SELECT file FROM logs WHERE agent_name = ? OR prefix = ? OR prefix = ?"
+               " ORDER BY created_at DESC")
+        parameters = [name, log_prefix(name), name]
+        if limit:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        with self._lock:
+            rows = self._connection().execute(sql, parameters).fetchall()
+        return [os.path.join(self.log_dir, row[0]) for row in rows]
+
+    def find(self, name: str, limit: int = None) -> list[str]:
+        """
+        Returns the log files of an agent name or component, most recent
+        first. The log directory is only scanned if the index has none.
+        """
+        files = [path for path in self._query(name, limit) if os.path.exists(path)]
+        if not files and self.refresh():
+            files = [path for path in self._query(name, limit) if os.path.exists(path)]
+        return files
+
+    def names(self) -> list[str]:
+        """Returns every agent name and component prefix that has a log."""
+        self.refresh()
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT DISTINCT agent_name FROM logs WHERE agent_name IS NOT NULL"
+                " UNION SELECT DISTINCT prefix FROM logs"
+            ).fetchall()
+        return sorted(row[0] for row in rows)
+
+def _read_tail(f, end: int, lines: int, block_size: int) -> list[str]:
+    """Returns the last `lines` lines before offset `end` of a binary file."""
+    if lines <= 0:
+        return []
+    position = end
+    data = b""
+    # One more newline than lines wanted, unless the whole file has been read
+    while position > 0 and data.count(b"\n") <= lines:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        data = f.read(read_size) + data
+    return data.decode("utf-8", errors="replace").splitlines()[-lines:]
+
+def tail(path: str, lines: int, block_size: int = TAIL_BLOCK_SIZE) -> list[str]:
+    """Returns the last `lines` lines of a file, reading it backwards block by block."""
+    with open(path, "rb") as f:
+        return _read_tail(f, f.seek(0, os.SEEK_END), lines, block_size)
+
+def follow(path: str, lines: int = 0, watcher: FileWatcher = None, timeout: float = None):
+    """
+    Yields the last `lines` lines of a file, then lines as they are appended,
+    waiting for changes with a FileWatcher. A log that is rotated (renamed
+    away and created again) is followed into its new file. Stops after
+    `timeout` seconds without a change.
+    """
+    watcher = watcher or FileWatcher(path)
+    source = open(path, "rb") if os.path.exists(path) else None
+    pending = b""
+    try:
+        if source is not None:
+            end = source.seek(0, os.SEEK_END)
+            yield from _read_tail(source, end, lines, TAIL_BLOCK_SIZE)
+            source.seek(end)
+        while True:
+            chunk = source.read() if source is not None else b""
+            if chunk:
+                pending += chunk
+                *complete, pending = pending.split(b"\n")
+                for line in complete:
+                    yield line.decode("utf-8", errors="replace")
+                continue
+            if _replaced(path, source):
+                # Rotated or truncated: everything left in the old file has been read
+                if source is not None:
+                    source.close()
+                source = open(path, "rb") if os.path.exists(path) else None
+                continue
+            if not watcher.wait(timeout):
+                return
+    finally:
+        if source is not None:
+            source.close()
+        watcher.close()
+
+def _replaced(path: str, source) -> bool:
+    """True if `path` no longer refers to the open file `source` (or has been truncated)."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    if source is None:
+        return True
+    return stat.st_ino != os.fstat(source.fileno()).st_ino or stat.st_size < source.tell()
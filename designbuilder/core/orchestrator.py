@@ -6,24 +6,68 @@ parallel coding agents to build, test, and debug them.
 """
 import asyncio
 import os
-from . import parser
+import time
+import uuid
+from . import parser, telemetry
 from designbuilder.coding_agents.python_agent import PythonAgent
+from designbuilder.coding_agents.pytest_pool import PytestWorkerPool
 from designbuilder.core.status_manager import StatusManager # Import StatusManager
 from designbuilder.core.cache_manager import CacheManager
 from designbuilder.core.planner import Planner
+from designbuilder.core.scheduler import COMPLEXITY_PRIORITY, AgentScheduler
+from designbuilder.core.dependency_graph import DependencyGraph
+from designbuilder.core.file_watch import FileWatcher
+from designbuilder.core.job_queue import CANCELLED, FINISHED, JOB_RETENTION, JobQueue
+from designbuilder.llm_backends.cached import LLMResponseCache
+from designbuilder.llm_backends.rate_limiter import RateLimiter
+from designbuilder.llm_backends.resilient import BackendHealth
+from designbuilder.llm_backends.transcript import ReplayBackend, TranscriptRecorder
+from designbuilder.prompts.prompts import Prompts
+
+QUEUE_POLL_INTERVAL = 1.0  # seconds between job queue checks without a change notification
 
 class Orchestrator:
     """
     Manages the end-to-end build process.
     """
-    def __init__(self, design_docs: list[str]):
+    def __init__(self, design_docs: list[str], max_agents: int = None, max_tests: int = None,
+                 max_llm_calls: int = None, use_llm_cache: bool = True, force: bool = False,
+                 debug_token_budget: int = None, metrics_textfile: str = None, components: list[dict] = None,
+                 llm_backend=None, status_manager: StatusManager = None, output_dir: str = None,
+                 log_dir: str = None, run_dir: str = telemetry.RUN_DIR, record_transcript: str = None,
+                 job_queue: JobQueue = None):
+        """
+        `components`, `llm_backend`, `status_manager`, `output_dir`, `log_dir` and
+        `run_dir` override the defaults, e.g. to benchmark against a fake backend.
+        Given components (with their plans) are built as-is, without planning.
+        With a `job_queue`, components are enqueued for `designbuilder worker`
+        processes instead of being built in this process.
+        """
         self.design_docs = design_docs
+        self.debug_token_budget = debug_token_budget
+        self.metrics_textfile = metrics_textfile  # Prometheus textfile written at the end of the build
+        self.record_transcript = record_transcript  # LLM transcript file the build's calls are recorded to
+        self.use_llm_cache = use_llm_cache
+        self.force = force  # Rebuild every component, even if unchanged
         self.components = []
+        self._given_components = components
+        self.llm_backend = llm_backend  # shared by every agent; each agent creates its own by default
+        self.output_dir = output_dir
+        self.log_dir = log_dir
+        self.run_dir = run_dir
+        self.job_queue = job_queue
+        self.build_id = None  # id of the queued build's jobs
         self.agents = []
         self.agent_map = {}
-        self.status_manager = StatusManager() # Instantiate StatusManager
+        self.status_manager = status_manager or StatusManager() # Instantiate StatusManager
         self._loaded_agent_states = self.status_manager.get_all_status() # Use StatusManager to load state
         self._agent_counter = 0  # Counter for generating agent names
+        self.scheduler = AgentScheduler(
+            max_agents=max_agents,
+            max_llm_calls=max_llm_calls,
+            max_tests=max_tests
+        )
+        self.test_pool = None
 
     def _save_state(self):
         serializable_state = {} # This will hold the state of all agents
@@ -32,7 +76,10 @@ class Orchestrator:
                 "name": agent.component['name'],
                 "status": agent.status,
                 "debug_attempts": agent.debug_attempts,
-                "llm_backend": agent.get_llm_backend_name()
+                "started_at": agent.started_at,
+                "finished_at": agent.finished_at,
+                "llm_backend": agent.get_llm_backend_name(),
+                "fingerprint": agent.fingerprint
             }
         self.status_manager.set_all_status(serializable_state) # Use set_all_status
 
@@ -45,10 +92,29 @@ class Orchestrator:
         """
         Main entrypoint to start the build process.
         """
+        run = telemetry.Telemetry.start(run_dir=self.run_dir, metrics_textfile=self.metrics_textfile,
+                                        design_docs=self.design_docs,
+                                        max_agents=self.scheduler.max_agents, max_tests=self.scheduler.max_tests,
+                                        max_llm_calls=self.scheduler.max_llm_calls,
+                                        replay=ReplayBackend.default_path)
+        recorder = TranscriptRecorder.start(self.record_transcript) if self.record_transcript else None
+        try:
+            with telemetry.span("build"):
+                await self._run()
+        finally:
+            if recorder is not None:
+                recorder.finish()
+            run.finish()
+
+    async def _run(self):
         print("Orchestrator starting...")
 
-        planner = Planner(design_docs=self.design_docs)
-        self.components = await planner.plan_all()
+        if self._given_components is not None:
+            self.components = list(self._given_components)
+        else:
+            planner = Planner(design_docs=self.design_docs, use_llm_cache=self.use_llm_cache,
+                              max_llm_calls=self.scheduler.max_llm_calls)
+            self.components = await planner.plan_all()
         
         if not self.components:
             print("No components found or generated.")
@@ -57,41 +123,290 @@ class Orchestrator:
 
         print(f"Found {len(self.components)} components.")
 
-        tasks = []
+        # One warm pytest worker per concurrent test slot
+        self.test_pool = PytestWorkerPool(size=self.scheduler.max_tests)
+
         self.agents = []
         self.agent_map = {}
+        agents_by_component = {}
 
         for component in self.components:
+            if component['name'] in agents_by_component:
+                print(f"Skipping duplicate component: {component['name']}")
+                continue
             agent_name = self._generate_agent_name()
             agent = PythonAgent(
                 component,
                 status_manager=self.status_manager,
-                agent_name=agent_name
+                agent_name=agent_name,
+                scheduler=self.scheduler,
+                use_llm_cache=self.use_llm_cache,
+                test_pool=self.test_pool,
+                debug_token_budget=self.debug_token_budget,
+                output_dir=self.output_dir,
+                log_dir=self.log_dir,
+                llm_backend=self.llm_backend
             )
             if 'plan' in component:
                 agent._plan = component['plan']
 
-            loaded_state = None
-            if component['name'] in self._loaded_agent_states:
-                loaded_state = self._loaded_agent_states[component['name']]
-            elif agent_name in self._loaded_agent_states:
-                loaded_state = self._loaded_agent_states[agent_name]
-            
-            if loaded_state:
-                agent.status = loaded_state.get("status", "initialized")
-                agent.debug_attempts = loaded_state.get("debug_attempts", 0)
-
             self.agents.append(agent)
             self.agent_map[agent_name] = agent
-            tasks.append(agent.run())
+            agents_by_component[component['name']] = agent
 
+        graph = self._build_dependency_graph([agent.component for agent in self.agents])
+        self._restore_agent_states(graph, agents_by_component)
         self._save_state()
 
-        await asyncio.gather(*tasks)
+        critical_path = graph.critical_path_lengths()
+        if self.job_queue is not None:
+            await self._run_queued(graph, agents_by_component, critical_path)
+        else:
+            await self._run_in_process(graph, agents_by_component, critical_path)
 
         print("All agents have completed their work.")
+        if self.use_llm_cache:
+            cache = LLMResponseCache.default()
+            print(f"LLM response cache: {cache.hits} hits, {cache.misses} misses.")
+        for name, stats in RateLimiter.all_stats().items():
+            print(f"Rate limiter {name}: {stats['calls']} calls, {stats['rate_limited']} rate limited, "
+                  f"concurrency limit {stats['concurrency_limit']}, "
+                  f"queue wait avg {stats['avg_wait']:.2f}s / max {stats['max_wait']:.2f}s.")
+        if ReplayBackend.default_path:
+            replay = ReplayBackend.default()
+            print(f"Replayed {replay.replayed} LLM call(s) from {replay.path} at {replay.speed:g}x speed"
+                  f" ({replay.misses} prompt(s) not in the transcript).")
+        for name, stats in BackendHealth.all_stats().items():
+            latency = f"p50 {stats['p50']:.1f}s / p95 {stats['p95']:.1f}s" if stats["p95"] is not None else "no latency samples"
+            print(f"LLM backend {name}: {stats['calls']} calls, {stats['errors']} errors, {stats['retries']} retries, "
+                  f"{stats['hedges']} hedged ({stats['hedge_wins']} won), {latency}, circuit {stats['circuit']}.")
         self._run_evals()
         self._save_state()
+        self.status_manager.flush()
+
+    async def _run_in_process(self, graph: DependencyGraph, agents_by_component: dict, critical_path: dict):
+        """
+        Runs the agents on this event loop, each once its prerequisites have completed.
+        """
+        pending = {name: len(graph.dependencies[name]) for name in graph.nodes}
+
+        def submit(component_name: str):
+            agent = agents_by_component[component_name]
+            # Longest remaining chain first; complexity breaks ties
+            priority = (-critical_path[component_name], AgentScheduler.complexity_priority(agent.component))
+            submitted = time.monotonic()
+            self.scheduler.submit(lambda: run_agent(agent, submitted), priority)
+
+        async def run_agent(agent, submitted: float):
+            component_name = agent.component['name']
+            with telemetry.span("agent", agent=component_name, agent_name=agent.agent_name,
+                                depends_on=sorted(graph.dependencies[component_name]),
+                                reused=agent.reused) as event:
+                telemetry.record_wait("agent_queue", time.monotonic() - submitted)
+                await self._run_agent(agent)
+                event.update(status=agent.status, debug_attempts=agent.debug_attempts)
+            if agent.status == "completed":
+                for dependent in graph.dependents[component_name]:
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0:
+                        submit(dependent)
+            else:
+                self._block_dependents(graph.descendants(component_name), component_name, agents_by_component)
+
+        for component_name in graph.nodes:
+            if pending[component_name] == 0:
+                submit(component_name)
+
+        print(f"Scheduling agents (max {self.scheduler.max_agents} agents, "
+              f"{self.scheduler.max_llm_calls} LLM calls, {self.scheduler.max_tests} test runs in flight)...")
+        try:
+            await self.test_pool.start()
+            await self.scheduler.run()
+        finally:
+            await self.test_pool.close()
+
+    async def _run_queued(self, graph: DependencyGraph, agents_by_component: dict, critical_path: dict):
+        """
+        Enqueues each component once its prerequisites have completed and
+        waits for workers to build it. The agent statuses the workers report
+        are copied into the status store. If the build is interrupted, its
+        unfinished jobs are cancelled.
+        """
+        queue = self.job_queue
+        build_id = self.build_id = uuid.uuid4().hex
+        await asyncio.to_thread(queue.purge, JOB_RETENTION)
+        pending = {name: len(graph.dependencies[name]) for name in graph.nodes}
+        options = {
+            "use_llm_cache": self.use_llm_cache,
+            "debug_token_budget": self.debug_token_budget,
+            "edit_mode": PythonAgent.default_edit_mode,
+            "speculative_candidates": PythonAgent.default_speculative_candidates,
+            "output_dir": self.output_dir,
+            "log_dir": self.log_dir,
+        }
+        results = {}  # job id -> future resolved with the job's result
+        finished_early = {}  # job id -> job seen finished before its future was registered
+        tracked = []
+        version = 0
+
+        def submit(component_name: str):
+            tracked.append(asyncio.create_task(track(agents_by_component[component_name])))
+
+        async def track(agent):
+            component_name = agent.component['name']
+            with telemetry.span("agent", agent=component_name, agent_name=agent.agent_name,
+                                depends_on=sorted(graph.dependencies[component_name]),
+                                reused=agent.reused, queued=True) as event:
+                if agent.reused:
+                    await self._run_agent(agent)
+                else:
+                    # Longest remaining chain first; complexity breaks ties
+                    priority = (-critical_path[component_name] * (max(COMPLEXITY_PRIORITY.values()) + 1)
+                                + AgentScheduler.complexity_priority(agent.component))
+                    job_id = await asyncio.to_thread(
+                        queue.enqueue, build_id, agent.agent_name, agent.component,
+                        dict(options, bypass_llm_cache=agent.bypass_llm_cache), priority
+                    )
+                    results[job_id] = asyncio.get_running_loop().create_future()
+                    if job_id in finished_early:
+                        results[job_id].set_result(finished_early.pop(job_id))
+                    job = await results[job_id]
+                    result = job.result or {}
+                    agent.status = result.get("status", "failed")
+                    agent.debug_attempts = result.get("debug_attempts", agent.debug_attempts)
+                    agent.started_at = result.get("started_at")
+                    agent.finished_at = result.get("finished_at")
+                    if job.status == CANCELLED or "error" in result:
+                        agent._log(f"Job {job.id} did not complete: {result.get('error', job.status)}")
+                    self.status_manager.set_agent_status(agent.agent_name, {
+                        "status": agent.status, "debug_attempts": agent.debug_attempts,
+                        "started_at": agent.started_at, "finished_at": agent.finished_at,
+                        "worker": job.worker,
+                    })
+                    event.update(worker=job.worker, attempts=job.attempts)
+                event.update(status=agent.status, debug_attempts=agent.debug_attempts)
+            if agent.status == "completed":
+                for dependent in graph.dependents[component_name]:
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0:
+                        submit(dependent)
+            else:
+                self._block_dependents(graph.descendants(component_name), component_name, agents_by_component)
+
+        for component_name in graph.nodes:
+            if pending[component_name] == 0:
+                submit(component_name)
+
+        print(f"Queued build {build_id} in {queue.path}; waiting for workers (start them with `designbuilder worker`)...")
+        try:
+            with FileWatcher(queue.watch_path) as watcher:
+                while any(not task.done() for task in tracked):
+                    await asyncio.sleep(0)  # let newly submitted components enqueue their jobs
+                    version, changed = await asyncio.to_thread(queue.changes_since, build_id, version)
+                    for job in changed:
+                        if job.id not in results:
+                            # Its enqueue has not returned yet
+                            if job.status in FINISHED:
+                                finished_early[job.id] = job
+                            continue
+                        if results[job.id].done():
+                            continue
+                        if job.status in FINISHED:
+                            results[job.id].set_result(job)
+                        elif job.progress:
+                            self.status_manager.set_agent_status(job.agent_name, {**job.progress, "worker": job.worker})
+                    if changed:
+                        continue
+                    # Wake on a queue write, or poll for workers on hosts that get no notification
+                    await asyncio.to_thread(watcher.wait, QUEUE_POLL_INTERVAL)
+        except BaseException:
+            cancelled = queue.cancel(build_id)
+            if cancelled:
+                print(f"Cancelled {cancelled} unfinished job(s) of build {build_id}.")
+            raise
+        finally:
+            for task in tracked:
+                task.cancel()
+            await asyncio.gather(*tracked, return_exceptions=True)
+
+    def _build_dependency_graph(self, components: list[dict]) -> DependencyGraph:
+        """
+        Builds the component dependency DAG, breaking any cycles in the plan.
+        """
+        graph = DependencyGraph(components)
+        for prerequisite, dependent in graph.break_cycles():
+            print(f"Warning: dependency cycle detected; ignoring dependency of "
+                  f"'{dependent}' on '{prerequisite}'.")
+        waves = graph.waves()
+        print(f"Planned {len(waves)} dependency wave(s): "
+              + " | ".join(", ".join(wave) for wave in waves))
+        return graph
+
+    def _restore_agent_states(self, graph: DependencyGraph, agents_by_component: dict):
+        """
+        Fingerprints every component and marks those whose fingerprint matches a
+        previously completed run as reusable. Everything else starts fresh.
+
+        A component's fingerprint covers its prerequisites' fingerprints, so
+        changing a component also rebuilds everything that depends on it.
+        """
+        previous_states = {}
+        for key, state in self._loaded_agent_states.items():
+            if isinstance(state, dict):
+                previous_states[state.get("name", key)] = state
+
+        for wave in graph.waves():
+            for component_name in wave:
+                agent = agents_by_component[component_name]
+                upstream = sorted(agents_by_component[name].fingerprint for name in graph.dependencies[component_name])
+                agent.fingerprint = CacheManager._hash_component(
+                    agent.component, agent.get_llm_backend_name(), Prompts.VERSION, upstream
+                )
+
+                previous = previous_states.get(component_name, {})
+                if (not self.force
+                        and previous.get("status") == "completed"
+                        and previous.get("fingerprint") == agent.fingerprint
+                        and agent.has_existing_output()):
+                    agent.reused = True
+                    agent.status = "completed"
+                    agent.debug_attempts = previous.get("debug_attempts", 0)
+                elif previous.get("status") and previous.get("status") != "completed":
+                    # Cached responses would replay the previous build's failure
+                    agent.bypass_llm_cache = True
+
+        reused = sum(1 for agent in agents_by_component.values() if agent.reused)
+        if reused:
+            print(f"Reusing {reused} unchanged component(s); rebuilding {len(agents_by_component) - reused}.")
+        retried = sum(1 for agent in agents_by_component.values() if agent.bypass_llm_cache)
+        if retried and self.use_llm_cache:
+            print(f"Bypassing the LLM response cache for {retried} component(s) that did not complete last time.")
+
+    async def _run_agent(self, agent):
+        """
+        Runs a single agent, recording a failure status if it raises.
+        Unchanged components keep their existing class and test files.
+        """
+        if agent.reused:
+            agent._log(f"Unchanged since the last completed build; reusing {agent.workspace.output_class_file}")
+            return
+        try:
+            await agent.run()
+        except Exception as e:
+            agent._log(f"Agent failed with an unexpected error: {e}")
+            agent.status = "failed"
+            agent._save_status()
+
+    def _block_dependents(self, component_names: set, failed_component: str, agents_by_component: dict):
+        """
+        Marks components as blocked because a prerequisite did not complete.
+        """
+        for component_name in component_names:
+            agent = agents_by_component[component_name]
+            if agent.status != "blocked":
+                agent._log(f"Blocked: prerequisite '{failed_component}' did not complete.")
+                agent.status = "blocked"
+                agent._save_status()
 
     def get_agent_names(self) -> list[str]:
         """
@@ -128,6 +443,7 @@ class Orchestrator:
         
         # Save state after the cycle
         self._save_state()
+        self.status_manager.flush()
         
         return success
 
@@ -3,64 +3,91 @@ Design Document Parser
 
 Extracts software components and their requirements from
 design documents using an LLM.
+
+Large inputs are extracted map-reduce style: the documents are split by
+section headings into overlapping chunks, each chunk is extracted
+concurrently, and components found in more than one chunk are merged.
 """
-import os
+import asyncio
+import bisect
+import hashlib
+import re
 import yaml
-import docx
-from pypdf import PdfReader
-from designbuilder.llm_backends.gemini import GeminiBackend
-from designbuilder.llm_backends.gpt4_turbo import GPT4TurboBackend
+from designbuilder.core import ingest, telemetry
+from designbuilder.llm_backends.factory import create_backend
+from designbuilder.llm_backends.router import route_hints
 from designbuilder.prompts.prompts import Prompts
 
+CHUNK_CHARS = 24_000                # about 6k tokens of document per extraction prompt
+CHUNK_OVERLAP_CHARS = 1_500         # text repeated from the previous chunk for context
+CHUNKED_THRESHOLD_CHARS = 48_000    # inputs larger than this are extracted chunk by chunk
+EXTRACTION_CONCURRENCY = 8          # default number of chunks extracted at once
+
+# Markdown headings ("## Payments") and numbered headings ("3.2 Payment Gateway")
+_HEADING = re.compile(r"^(?:#{1,6}[ \t]+(?P<md>.+?)[ \t#]*|(?P<num>\d+(?:\.\d+)*\.?[ \t]+[A-Z][^\n]{0,80}))$",
+                      re.MULTILINE)
+
 async def _read_file_content(file_path: str) -> str:
-    """Reads the content of a file based on its extension."""
-    _, extension = os.path.splitext(file_path)
-    content = ""
+    """Reads the text content of a design document, using the extracted-text cache."""
+    return await ingest.read_document(file_path)
 
-    try:
-        if extension in [".md", ".mdx"]:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        elif extension == ".pdf":
-            reader = PdfReader(file_path)
-            for page in reader.pages:
-                content += page.extract_text() or ''
-        elif extension == ".docx":
-            doc = docx.Document(file_path)
-            for para in doc.paragraphs:
-                content += para.text + "\n"
-        else:
-            print(f"Warning: Unsupported file type: {extension}. Reading as plain text.")
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-
-    return content
-
-
-async def parse_design_docs(design_docs: list[str], design_doc_text: str = None) -> str:
+def split_sections(full_text: str, documents: list[tuple[str, int, int]]) -> list[tuple[str, str, int, int]]:
     """
-    Reads design documents, uses an LLM to extract components,
-    and returns them as a YAML formatted string.
-    """
-    print(f"Parsing design documents: {design_docs}")
+    Splits the joined document text at section headings.
 
-    full_text = design_doc_text
-    if not full_text:
-        for doc_path in design_docs:
-            full_text += await _read_file_content(doc_path) + "\n\n"
-    
-    #TODO: modify this to return list of full texts
-    if not full_text.strip():
-        return ""
+    Args:
+        full_text: The text of all documents, joined
+        documents: (document, start, end) spans of each document in full_text
 
+    Returns:
+        (document, section title, start, end) spans covering full_text in order;
+        text before a document's first heading has the title None
+    """
+    sections = []
+    for document, doc_start, doc_end in documents:
+        starts = [(doc_start, None)]
+        for match in _HEADING.finditer(full_text, doc_start, doc_end):
+            title = (match.group("md") or match.group("num")).strip()
+            if match.start() == doc_start:
+                starts[0] = (doc_start, title)
+            else:
+                starts.append((match.start(), title))
+        for i, (start, title) in enumerate(starts):
+            end = starts[i + 1][0] if i + 1 < len(starts) else doc_end
+            if end > start:
+                sections.append((document, title, start, end))
+    return sections
 
-    prompt = Prompts.get_design_doc_extraction_prompt(full_text)
+def _split_span(full_text: str, start: int, end: int, max_chars: int) -> list[tuple[int, int]]:
+    """Splits an oversized span at paragraph breaks (or hard, if there are none) into pieces of at most max_chars."""
+    pieces = []
+    while end - start > max_chars:
+        cut = full_text.rfind("\n\n", start + max_chars // 2, start + max_chars)
+        cut = cut + 2 if cut != -1 else start + max_chars
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, end))
+    return pieces
 
-    llm_backend = GeminiBackend()
-    yaml_output = await llm_backend.send_prompt(prompt)
+def chunk_sections(full_text: str, sections: list[tuple[str, str, int, int]],
+                   max_chars: int = None) -> list[tuple[int, int]]:
+    """
+    Packs consecutive sections into (start, end) chunks of at most max_chars
+    (CHUNK_CHARS by default), splitting sections that are larger than a chunk
+    on their own.
+    """
+    max_chars = max_chars or CHUNK_CHARS
+    chunks = []
+    for _, _, start, end in sections:
+        for piece_start, piece_end in _split_span(full_text, start, end, max_chars):
+            if chunks and piece_end - chunks[-1][0] <= max_chars:
+                chunks[-1] = (chunks[-1][0], piece_end)
+            else:
+                chunks.append((piece_start, piece_end))
+    return chunks
 
+def _parse_components(yaml_output: str) -> list[dict]:
+    """Parses the YAML list of components returned by an extraction prompt."""
     try:
         # The LLM might return the YAML within a code block, so we need to extract it.
         if "```yaml" in yaml_output:
@@ -70,5 +97,120 @@ async def parse_design_docs(design_docs: list[str], design_doc_text: str = None)
         print(f"Error parsing YAML from LLM: {e}")
         print(f"LLM output:\n{yaml_output}")
         components = []
+    if not isinstance(components, list):
+        return []
+    return [component for component in components if isinstance(component, dict) and component.get("name")]
+
+def _source(lowered_text: str, sections: list, section_starts: list[int], section_hashes: list[str],
+            chunk: tuple[int, int], name: str) -> dict:
+    """
+    Finds the document and section where a component is first mentioned
+    within a chunk, with a hash of the section's text.
+    """
+    start, end = chunk
+    position = lowered_text.find(str(name).lower(), start, end)
+    if position == -1:
+        position = start
+    index = max(0, bisect.bisect_right(section_starts, position) - 1)
+    document, title, _, _ = sections[index]
+    return {"document": document, "section": title, "section_hash": section_hashes[index]}
+
+def _normalize_name(name: str) -> str:
+    """The name without case, spacing, punctuation or a plural "s", e.g. "Payment Services" -> "paymentservice"."""
+    normalized = re.sub(r"[^a-z0-9]", "", str(name).lower())
+    return normalized[:-1] if len(normalized) > 1 and normalized.endswith("s") else normalized
+
+def merge_components(chunk_components: list[list[dict]]) -> list[dict]:
+    """
+    Merges the components extracted from each chunk. A component found in
+    several chunks under the same name (ignoring case, spacing and plurals)
+    is combined, keeping the longest description and every place it was
+    found. Components extracted from the same chunk are never merged.
+    """
+    merged = []   # (normalized name, component)
+    for components in chunk_components:
+        matched = set()  # indexes into merged used by this chunk
+        for component in components:
+            name = _normalize_name(component["name"])
+            index = next((i for i, (other, _) in enumerate(merged) if other == name and i not in matched), None)
+            if index is None:
+                merged.append((name, dict(component)))
+                matched.add(len(merged) - 1)
+                continue
+            matched.add(index)
+            match = merged[index][1]
+            if len(str(component.get("description") or "")) > len(str(match.get("description") or "")):
+                match["description"] = component["description"]
+            for key, value in component.items():
+                if match.get(key) is None:
+                    match[key] = value
+            if component.get("source") and component["source"] != match.get("source"):
+                sources = match.setdefault("sources", [match["source"]])
+                if component["source"] not in sources:
+                    sources.append(component["source"])
+    return [component for _, component in merged]
+
+async def parse_design_docs(design_docs: list[str], design_doc_text: str = None, llm_backend=None,
+                            document_texts: list[str] = None, max_concurrency: int = None,
+                            chunked: bool = None) -> str:
+    """
+    Reads design documents, uses an LLM to extract components,
+    and returns them as a YAML formatted string.
+
+    Args:
+        design_docs: Paths of the design documents
+        design_doc_text: The documents' text, already joined
+        llm_backend: The LLM backend to use
+        document_texts: The text of each document, so components can be traced to their document
+        max_concurrency: Maximum number of chunks extracted at once
+        chunked: Force (True) or disable (False) chunked extraction; by default
+            only inputs larger than CHUNKED_THRESHOLD_CHARS are chunked
+    """
+    print(f"Parsing design documents: {design_docs}")
+
+    if document_texts is None and not design_doc_text:
+        document_texts = await ingest.read_documents(design_docs)
+    if document_texts is not None:
+        documents, full_text = [], ""
+        for doc_path, text in zip(design_docs, document_texts):
+            documents.append((doc_path, len(full_text), len(full_text) + len(text)))
+            full_text += text + "\n\n"
+    else:
+        full_text = design_doc_text
+        documents = [(", ".join(design_docs), 0, len(full_text))]
+
+    #TODO: modify this to return list of full texts
+    if not full_text.strip():
+        return full_text, yaml.dump([])
+
+    sections = split_sections(full_text, documents)
+    section_starts = [start for _, _, start, _ in sections]
+    section_hashes = [hashlib.sha256(full_text[start:end].encode()).hexdigest()[:16] for _, _, start, end in sections]
+    lowered_text = full_text.lower()
+    if chunked is None:
+        chunked = len(full_text) > CHUNKED_THRESHOLD_CHARS
+    chunks = chunk_sections(full_text, sections) if chunked else [(0, len(full_text))]
+
+    llm_backend = llm_backend or create_backend()
+    semaphore = asyncio.Semaphore(max_concurrency or EXTRACTION_CONCURRENCY)
+
+    async def extract(chunk: tuple[int, int]) -> list[dict]:
+        start, end = chunk
+        text = full_text[max(0, start - CHUNK_OVERLAP_CHARS) if chunked else start:end]
+        async with semaphore:
+            yaml_output = await llm_backend.send_prompt(Prompts.get_design_doc_extraction_prompt(text),
+                                                        **route_hints(llm_backend, "extraction"))
+        components = _parse_components(yaml_output)
+        for component in components:
+            component["source"] = _source(lowered_text, sections, section_starts, section_hashes,
+                                          chunk, component["name"])
+        return components
+
+    if chunked:
+        print(f"Extracting components from {len(chunks)} chunk(s) of {len(sections)} section(s)...")
+    with telemetry.span("extract", chunks=len(chunks)) as event:
+        results = await asyncio.gather(*(extract(chunk) for chunk in chunks))
+        components = merge_components(results) if chunked else results[0]
+        event["components"] = len(components)
 
-    return full_text, yaml.dump(components)
\ No newline at end of file
+    return full_text, yaml.dump(components)
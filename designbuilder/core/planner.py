@@ -2,14 +2,16 @@ import re
 import yaml
 import time
 from designbuilder.core.cache_manager import CacheManager
-from designbuilder.llm_backends.gemini import GeminiBackend
+from designbuilder.llm_backends.factory import create_backend
+from designbuilder.llm_backends.router import route_hints
 from designbuilder.prompts.prompts import Prompts
-from designbuilder.core import parser
+from designbuilder.core import ingest, parser, telemetry
 
 class Planner:
-    def __init__(self, design_docs):
-        self.llm_backend = GeminiBackend()
+    def __init__(self, design_docs, use_llm_cache: bool = True, max_llm_calls: int = None):
+        self.llm_backend = create_backend(use_cache=use_llm_cache)
         self.design_docs = design_docs
+        self.max_llm_calls = max_llm_calls
         self.model_name = self.llm_backend.model_name
 
     def _extract_yaml(self, text: str) -> str:
@@ -28,25 +30,38 @@ class Planner:
         
         return text
 
-    async def plan_all(self, use_cache=True, prompt_version="v0"):
+    async def plan_all(self, use_cache=True, prompt_version=Prompts.VERSION):
+        with telemetry.span("plan_all") as event:
+            plans = await self._plan_all(use_cache, prompt_version)
+            event["components"] = len(plans or [])
+            return plans
+
+    async def _plan_all(self, use_cache, prompt_version):
         # Read design docs content to generate a hash
-        design_doc_text = ""
-        for doc_path in self.design_docs:
-            design_doc_text += await parser._read_file_content(doc_path) + "\n\n"
+        document_texts = await ingest.read_documents(self.design_docs)
+        design_doc_text = "".join(text + "\n\n" for text in document_texts)
 
-        cache = CacheManager._load_cache()
         doc_hash = CacheManager._hash_doc(design_doc_text)
 
-        if use_cache and doc_hash in cache:
+        cached = CacheManager.get_plan(doc_hash) if use_cache else None
+        telemetry.record_cache("plan", bool(cached))
+        if cached:
             print("Using cached plan.")
-            return cache[doc_hash]["plan"]
+            return cached["plan"]
         
         # Since we already have the text, we can pass it to the parser
-        _, components_desc_yaml = await parser.parse_design_docs(self.design_docs, design_doc_text)
+        _, components_desc_yaml = await parser.parse_design_docs(
+            self.design_docs, design_doc_text, llm_backend=self.llm_backend,
+            document_texts=document_texts, max_concurrency=self.max_llm_calls
+        )
+        components = [c for c in yaml.safe_load(components_desc_yaml) or [] if isinstance(c, dict)]
 
         print("Generating unified plan...")
 
-        response = await self.llm_backend.send_prompt(Prompts.get_unified_plan_prompt(components_desc_yaml))
+        # Sources are carried into the plan below; the planning prompt only needs names and descriptions
+        prompt_components = [{k: v for k, v in c.items() if k not in ("source", "sources")} for c in components]
+        response = await self.llm_backend.send_prompt(Prompts.get_unified_plan_prompt(yaml.dump(prompt_components)),
+                                                      **route_hints(self.llm_backend, "plan"))
 
         cleaned_response = self._extract_yaml(response)
 
@@ -64,11 +79,15 @@ class Planner:
                     except yaml.YAMLError as e:
                         raise ValueError(f"Failed to parse inner plan YAML for component {component_plan.get('name')}: {e}")
 
-        cache[doc_hash] = {
-            "plan": plans,
-            "timestamp": time.time(),
-            "model": self.model_name,
-            "prompt_version": prompt_version,
-        }
-        CacheManager._save_cache(cache)
+            # Carry each component's extracted description (and where in the design
+            # documents it was found) into its plan entry, so component
+            # fingerprints change when the description does
+            extracted = {component.get("name"): component for component in components}
+            for component_plan in plans:
+                component = extracted.get(component_plan.get("name"), {})
+                for key in ("description", "source", "sources"):
+                    if component.get(key):
+                        component_plan.setdefault(key, component[key])
+
+        CacheManager.put_plan(doc_hash, plans, self.model_name, prompt_version)
         return plans
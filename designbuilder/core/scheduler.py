@@ -0,0 +1,89 @@
+"""
+Agent Scheduler
+
+Runs coding agents with bounded concurrency. The scheduler caps the
+number of agents in flight and hands out separate slots for LLM calls
+and test subprocesses, so large builds saturate the host without
+oversubscribing it.
+"""
+import asyncio
+import itertools
+import os
+from designbuilder.core import telemetry
+
+# Lower values are scheduled first. Hard components start early so the
+# long-running agents do not end up trailing at the end of the build.
+COMPLEXITY_PRIORITY = {"high": 0, "medium": 1, "low": 2}
+DEFAULT_PRIORITY = 1
+
+class AgentScheduler:
+    """
+    A priority queue of agent jobs drained by a fixed number of workers.
+    """
+    def __init__(self, max_agents: int = None, max_llm_calls: int = None, max_tests: int = None):
+        cpu_count = os.cpu_count() or 1
+        # Tests are CPU bound, LLM calls are network bound; agents spend most
+        # of their time waiting on the network, so allow more of them in flight.
+        self.max_tests = max_tests or cpu_count
+        self.max_agents = max_agents or 4 * cpu_count
+        self.max_llm_calls = max_llm_calls or self.max_agents
+        for name in ("max_agents", "max_llm_calls", "max_tests"):
+            if getattr(self, name) < 1:
+                raise ValueError(f"{name} must be at least 1.")
+
+        self._llm_slots = asyncio.Semaphore(self.max_llm_calls)
+        self._test_slots = asyncio.Semaphore(self.max_tests)
+        self._queue = asyncio.PriorityQueue()
+        self._sequence = itertools.count()  # FIFO tie-breaker within a priority
+
+    @staticmethod
+    def complexity_priority(component: dict) -> int:
+        """
+        Returns the queue priority for a component based on its plan's complexity.
+        """
+        plan = component.get("plan")
+        if not isinstance(plan, dict):
+            return DEFAULT_PRIORITY
+        complexity = str(plan.get("complexity", "")).strip().lower()
+        return COMPLEXITY_PRIORITY.get(complexity, DEFAULT_PRIORITY)
+
+    def llm_slot(self) -> telemetry.timed_wait:
+        """Returns a context manager holding one of the concurrent LLM call slots; the wait is recorded."""
+        return telemetry.timed_wait(self._llm_slots, "llm_slot")
+
+    def test_slot(self) -> telemetry.timed_wait:
+        """Returns a context manager holding one of the concurrent test run slots; the wait is recorded."""
+        return telemetry.timed_wait(self._test_slots, "test_slot")
+
+    def submit(self, job, priority=DEFAULT_PRIORITY):
+        """
+        Queues a job for execution.
+
+        Args:
+            job: A zero-argument callable returning an awaitable
+            priority: Lower values run first; any comparable value (e.g. a tuple)
+        """
+        self._queue.put_nowait((priority, next(self._sequence), job))
+
+    async def run(self):
+        """
+        Drains the queue with at most `max_agents` jobs running at once.
+        Jobs may submit further jobs while the scheduler is running.
+        """
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.max_agents)]
+        try:
+            await self._queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await job()
+            except Exception as e:
+                print(f"[Scheduler] Job failed: {e}")
+            finally:
+                self._queue.task_done()
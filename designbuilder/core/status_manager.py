@@ -5,56 +5,194 @@ This module provides a way to manage the status of the DesignBuilder agents.
 """
 import json
 import os
-from filelock import FileLock
+import sqlite3
+import threading
+import time
+from designbuilder.core.file_watch import FileWatcher
 
-STATUS_FILE = "/home/karthik/repos/DesignBuilder/designbuilder/cache/status.json"
-LOCK_FILE = "/home/karthik/repos/DesignBuilder/designbuilder/cache/status.json.lock"
+STATUS_FILE = "/home/karthik/repos/DesignBuilder/designbuilder/cache/status.json"  # legacy, migrated on first use
+STATUS_DB_FILE = "/home/karthik/repos/DesignBuilder/designbuilder/cache/status.db"
+FLUSH_INTERVAL = 0.05  # seconds over which status updates are coalesced into one write
+
+def next_version(conn: sqlite3.Connection) -> int:
+    """Increments the version in a database's `meta` table; call inside a write transaction."""
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('version', 1)"
+        " ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+    return int(conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
 
 class StatusManager:
     """
     Manages the status of the agents in a thread-safe and process-safe manner.
+
+    Each agent has its own record in an SQLite database in WAL mode, so
+    readers never block writers and an update touches only one row.
+    Updates are buffered and written in a single transaction once per
+    flush interval.
+
+    Every write bumps a version number stored with the rows it touched, so
+    a watcher reads only what changed since its last read (see watch()).
     """
 
-    def __init__(self):
-        os.makedirs(os.path.dirname(STATUS_FILE), exist_ok=True)
-        self._lock = FileLock(LOCK_FILE)
+    def __init__(self, path: str = None, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path or STATUS_DB_FILE
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._pending = {}  # agent_name -> fields to merge into its record
+        self._timer = None
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS agents ("
+                " agent_name TEXT PRIMARY KEY, record TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(agents)")}
+            if "version" not in columns:  # databases from before the change feed
+                self._conn.execute("ALTER TABLE agents ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS agents_version ON agents (version)")
+        if path is None:
+            self._migrate_legacy_status()
+
+    def _migrate_legacy_status(self):
+        """Imports agent statuses from the old status.json once."""
+        with self._lock, self._conn:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_migrated'").fetchone():
+                return
+            legacy = {}
+            if os.path.exists(STATUS_FILE):
+                try:
+                    with open(STATUS_FILE, 'r') as f:
+                        legacy = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    legacy = {}
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO agents (agent_name, record, updated_at) VALUES (?, ?, ?)",
+                [(name, json.dumps(record), now) for name, record in legacy.items() if isinstance(record, dict)]
+            )
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_json_migrated', '1')")
 
     def get_all_status(self) -> dict:
         """
-        Reads all agent statuses from the status file.
+        Returns a snapshot of every agent's status, including buffered updates.
         """
         with self._lock:
-            if not os.path.exists(STATUS_FILE):
-                return {}
-            with open(STATUS_FILE, 'r') as f:
-                try:
-                    return json.load(f)
-                except json.JSONDecodeError:
-                    return {}
+            rows = self._conn.execute("SELECT agent_name, record FROM agents").fetchall()
+            statuses = {name: json.loads(record) for name, record in rows}
+            for agent_name, fields in self._pending.items():
+                statuses.setdefault(agent_name, {}).update(fields)
+        return statuses
 
     def get_agent_status(self, agent_name: str) -> dict:
         """
-        Reads the status of a specific agent from the status file.
+        Reads the status of a specific agent.
         """
-        statuses = self.get_all_status()
-        return statuses.get(agent_name, {})
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM agents WHERE agent_name = ?", (agent_name,)).fetchone()
+            status = json.loads(row[0]) if row else {}
+            status.update(self._pending.get(agent_name, {}))
+        return status
 
-    def set_agent_status(self, agent_name: str, new_status: dict):
+    def set_agent_status(self, agent_name: str, new_status):
         """
-        Updates the status of a specific agent in the status file.
+        Updates the status of a specific agent. A string sets the agent's
+        `status` field; a dict is merged into the agent's record. The write
+        is buffered and flushed within `flush_interval` seconds.
         """
+        fields = dict(new_status) if isinstance(new_status, dict) else {"status": new_status}
+        fields["updated_at"] = time.time()
         with self._lock:
-            statuses = self.get_all_status()
-            if agent_name not in statuses:
-                statuses[agent_name] = {}
-            statuses[agent_name]['status'] = new_status
-            with open(STATUS_FILE, 'w') as f:
-                json.dump(statuses, f, indent=4)
+            self._pending.setdefault(agent_name, {}).update(fields)
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.start()
 
     def set_all_status(self, all_statuses: dict):
         """
-        Overwrites the entire status file with the given dictionary of statuses.
+        Replaces every agent record with the given dictionary of statuses.
+        """
+        now = time.time()
+        with self._lock:
+            self._cancel_timer()
+            self._pending.clear()
+            with self._conn:
+                version = next_version(self._conn)
+                # Watchers reload every record once they see a reset
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('reset_version', ?)", (version,))
+                self._conn.execute("DELETE FROM agents")
+                self._conn.executemany(
+                    "INSERT INTO agents (agent_name, record, updated_at, version) VALUES (?, ?, ?, ?)",
+                    [(name, json.dumps(record), now, version) for name, record in all_statuses.items()]
+                )
+
+    def flush(self):
+        """
+        Writes all buffered updates in one transaction.
         """
         with self._lock:
-            with open(STATUS_FILE, 'w') as f:
-                json.dump(all_statuses, f, indent=4)
\ No newline at end of file
+            self._cancel_timer()
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            # Merge in SQL so concurrent writers from other processes cannot lose updates
+            with self._conn:
+                version = next_version(self._conn)
+                self._conn.executemany(
+                    "INSERT INTO agents (agent_name, record, updated_at, version) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (agent_name) DO UPDATE SET"
+                    " record = json_patch(record, excluded.record), updated_at = excluded.updated_at,"
+                    " version = excluded.version",
+                    [(name, json.dumps(fields), fields["updated_at"], version) for name, fields in pending.items()]
+                )
+
+    def changes_since(self, version: int) -> tuple[int, dict, bool]:
+        """
+        Returns the records written after `version`, as (current version,
+        records by agent name, reset). When `reset` is True the records
+        were replaced wholesale and the returned records are all there are.
+        """
+        with self._lock, self._conn:
+            # One read transaction, so the version matches the records
+            self._conn.execute("BEGIN")
+            meta = dict(self._conn.execute("SELECT key, value FROM meta WHERE key IN ('version', 'reset_version')"))
+            current = int(meta.get("version", 0))
+            reset = version == 0 or int(meta.get("reset_version", 0)) > version
+            rows = self._conn.execute(
+                "SELECT agent_name, record FROM agents WHERE version > ?", (-1 if reset else version,)
+            ).fetchall()
+        return current, {name: json.loads(record) for name, record in rows}, reset
+
+    def watch(self, timeout: float = 1.0, version: int = 0):
+        """
+        Yields (records, reset) whenever other processes write statuses, and
+        at least every `timeout` seconds (with no records if nothing
+        changed). The first item holds every record. The store is only
+        queried when its write-ahead log changes, and only for changed rows.
+        """
+        # Watch before the first read, so a write in between is not missed
+        with FileWatcher(self.path + "-wal") as watcher:
+            changed = True
+            while True:
+                records, reset = {}, False
+                if changed:
+                    version, records, reset = self.changes_since(version)
+                yield records, reset
+                changed = watcher.wait(timeout)
+
+    def close(self):
+        """
+        Flushes buffered updates and closes the database.
+        """
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,334 @@
+"""
+Telemetry
+
+Records where build time goes: a span for each phase (planning, each
+agent and each of its steps, test runs), every LLM call with its
+latency, estimated tokens and bytes, cache hits, and the time spent
+waiting for scheduler slots and rate limits.
+
+Events are appended to a JSON lines run file under RUN_DIR by a
+background writer; aggregated metrics can also be written to a
+Prometheus textfile. `designbuilder profile` reads a run file back.
+When no run is active every recording function is a no-op.
+"""
+import contextlib
+import contextvars
+import itertools
+import json
+import os
+import secrets
+import time
+from collections import defaultdict
+from datetime import datetime
+from designbuilder.core.log_writer import LogWriter
+
+RUN_DIR = "/home/karthik/repos/DesignBuilder/runs"
+RUN_FILE_MAX_BYTES = 1024 ** 3  # run files are never rotated in practice
+
+# The innermost open span of the running task: its event, which children annotate and inherit the agent from
+_current_span = contextvars.ContextVar("designbuilder_span", default=None)
+
+class Telemetry:
+    """
+    The telemetry of one build run.
+    """
+    _active = None
+
+    def __init__(self, run_id: str = None, run_dir: str = RUN_DIR, metrics_textfile: str = None):
+        # Timestamped so runs sort by start time; the suffix keeps runs started in the same second apart
+        self.run_id = run_id or f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        self.path = os.path.join(run_dir, f"{self.run_id}.jsonl")
+        self.metrics_textfile = metrics_textfile
+        self.started_at = time.time()
+        self._started = time.monotonic()
+        self._ids = itertools.count(1)
+        self._writer = LogWriter(max_bytes=RUN_FILE_MAX_BYTES)
+        # Aggregates for the Prometheus textfile
+        self.llm_calls = defaultdict(lambda: {"count": 0, "errors": 0, "seconds": 0.0, "input_tokens": 0,
+                                              "output_tokens": 0, "input_bytes": 0, "output_bytes": 0})
+        self.cache = defaultdict(int)
+        self.waits = defaultdict(lambda: [0, 0.0])
+        self.spans = defaultdict(lambda: [0, 0.0])
+
+    @classmethod
+    def start(cls, run_id: str = None, run_dir: str = RUN_DIR, metrics_textfile: str = None,
+              **attributes) -> "Telemetry":
+        """Starts recording a run; events recorded from now on go to its run file."""
+        run = cls(run_id, run_dir, metrics_textfile)
+        cls._active = run
+        run.emit({"type": "run", "run_id": run.run_id, "started_at": run.started_at, **attributes})
+        return run
+
+    @classmethod
+    def active(cls) -> "Telemetry":
+        """Returns the run being recorded, or None."""
+        return cls._active
+
+    def now(self) -> float:
+        """Seconds since the run started."""
+        return time.monotonic() - self._started
+
+    def emit(self, event: dict):
+        self._writer.write(self.path, json.dumps(event, default=str))
+
+    def finish(self):
+        """Ends the run: writes the closing event and the Prometheus textfile, and flushes the run file."""
+        if Telemetry._active is self:
+            Telemetry._active = None
+        self.emit({"type": "end", "duration": self.now()})
+        self._writer.close()
+        if self.metrics_textfile:
+            write_prometheus_textfile(self, self.metrics_textfile)
+        print(f"Telemetry written to {self.path}")
+
+def _context() -> tuple:
+    """Returns (parent span id, agent) for an event recorded in the current task."""
+    parent = _current_span.get()
+    return (parent["id"], parent.get("agent")) if parent else (None, None)
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """
+    Times a block as a span. Spans nest within a task; an agent attribute
+    is inherited from the enclosing span.
+
+    Yields:
+        The span's event, so attributes can be added while it is open
+    """
+    run = Telemetry.active()
+    if run is None:
+        yield {}
+        return
+    parent, agent = _context()
+    event = {"type": "span", "id": next(run._ids), "parent": parent, "name": name, "agent": agent}
+    event.update(attributes)
+    event["start"] = run.now()
+    token = _current_span.set(event)
+    try:
+        yield event
+    except BaseException as e:
+        event["error"] = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        event["duration"] = run.now() - event["start"]
+        totals = run.spans[name]
+        totals[0] += 1
+        totals[1] += event["duration"]
+        run.emit(event)
+
+def annotate(**attributes):
+    """Adds attributes to the innermost open span."""
+    event = _current_span.get()
+    if event is not None:
+        event.update(attributes)
+
+def record_llm_call(model: str, kind: str, started: float, prompt: str, response: str = "",
+                    stream: bool = False, error: BaseException = None, **attributes):
+    """
+    Records one LLM call. `started` is a time.monotonic() value; token
+    counts are estimates (about four characters per token).
+    """
+    run = Telemetry.active()
+    if run is None:
+        return
+    from designbuilder.llm_backends.rate_limiter import estimate_tokens
+    duration = time.monotonic() - started
+    parent, agent = _context()
+    event = {
+        "type": "llm", "parent": parent, "agent": agent, "model": model, "kind": kind, "stream": stream,
+        "start": run.now() - duration, "duration": duration,
+        "prompt_tokens": estimate_tokens(prompt), "output_tokens": estimate_tokens(response) if response else 0,
+        "prompt_bytes": len(prompt.encode()), "response_bytes": len(response.encode()),
+        **attributes
+    }
+    if error is not None:
+        event["error"] = type(error).__name__
+    totals = run.llm_calls[(model, kind)]
+    totals["count"] += 1
+    totals["errors"] += error is not None
+    totals["seconds"] += duration
+    totals["input_tokens"] += event["prompt_tokens"]
+    totals["output_tokens"] += event["output_tokens"]
+    totals["input_bytes"] += event["prompt_bytes"]
+    totals["output_bytes"] += event["response_bytes"]
+    run.emit(event)
+
+def record_cache(cache: str, hit: bool, **attributes):
+    """Records a cache lookup."""
+    run = Telemetry.active()
+    if run is None:
+        return
+    run.cache[(cache, "hit" if hit else "miss")] += 1
+    parent, agent = _context()
+    run.emit({"type": "cache", "parent": parent, "agent": agent, "cache": cache, "hit": hit, **attributes})
+
+def record_wait(resource: str, seconds: float, **attributes):
+    """Records time spent waiting for a scheduler slot, a rate limit or the agent queue."""
+    run = Telemetry.active()
+    if run is None:
+        return
+    totals = run.waits[resource]
+    totals[0] += 1
+    totals[1] += seconds
+    parent, agent = _context()
+    run.emit({"type": "wait", "parent": parent, "agent": agent, "resource": resource,
+              "start": run.now() - seconds, "duration": seconds, **attributes})
+
+class timed_wait:
+    """An async context manager that acquires a lock or semaphore and records how long that took."""
+    def __init__(self, lock, resource: str):
+        self.lock = lock
+        self.resource = resource
+
+    async def __aenter__(self):
+        started = time.monotonic()
+        await self.lock.acquire()
+        record_wait(self.resource, time.monotonic() - started)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.lock.release()
+
+def _labels(**labels) -> str:
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for key, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+def write_prometheus_textfile(run: Telemetry, path: str):
+    """Writes the run's aggregated metrics in the Prometheus text exposition format, atomically."""
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples: list):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+    calls = sorted(run.llm_calls.items())
+    metric("designbuilder_llm_calls_total", "counter", "LLM calls by model and kind of prompt.",
+           [(_labels(model=m, kind=k), t["count"]) for (m, k), t in calls])
+    metric("designbuilder_llm_errors_total", "counter", "Failed LLM calls by model and kind of prompt.",
+           [(_labels(model=m, kind=k), t["errors"]) for (m, k), t in calls])
+    metric("designbuilder_llm_seconds_total", "counter", "Time spent in LLM calls.",
+           [(_labels(model=m, kind=k), round(t["seconds"], 3)) for (m, k), t in calls])
+    metric("designbuilder_llm_tokens_total", "counter", "Estimated LLM tokens sent and received.",
+           [(_labels(model=m, kind=k, direction=d), t[f"{d}_tokens"]) for (m, k), t in calls
+            for d in ("input", "output")])
+    metric("designbuilder_llm_bytes_total", "counter", "LLM prompt and response bytes.",
+           [(_labels(model=m, kind=k, direction=d), t[f"{d}_bytes"]) for (m, k), t in calls
+            for d in ("input", "output")])
+    metric("designbuilder_cache_lookups_total", "counter", "Cache lookups by cache and result.",
+           [(_labels(cache=c, result=r), n) for (c, r), n in sorted(run.cache.items())])
+    metric("designbuilder_wait_seconds_total", "counter", "Time spent waiting for slots, rate limits and the agent queue.",
+           [(_labels(resource=r), round(s, 3)) for r, (_, s) in sorted(run.waits.items())])
+    metric("designbuilder_span_seconds_total", "counter", "Time spent in each build phase, summed over agents.",
+           [(_labels(name=n), round(s, 3)) for n, (_, s) in sorted(run.spans.items())])
+    metric("designbuilder_span_count_total", "counter", "Number of spans of each build phase.",
+           [(_labels(name=n), c) for n, (c, _) in sorted(run.spans.items())])
+    metric("designbuilder_build_duration_seconds", "gauge", "Wall-clock duration of the last build.",
+           [("", round(run.now(), 3))])
+    metric("designbuilder_build_timestamp_seconds", "gauge", "Start time of the last build.",
+           [("", round(run.started_at, 3))])
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(temp_path, path)
+
+# Reading runs back
+
+def resolve_run(run: str = None, run_dir: str = RUN_DIR) -> str:
+    """Returns the run file for a run id or path; the latest run if none is given."""
+    if run and os.path.exists(run):
+        return run
+    if run:
+        path = os.path.join(run_dir, run if run.endswith(".jsonl") else f"{run}.jsonl")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No run file found for '{run}' in {run_dir}")
+        return path
+    runs = sorted(name for name in os.listdir(run_dir) if name.endswith(".jsonl")) if os.path.isdir(run_dir) else []
+    if not runs:
+        raise FileNotFoundError(f"No runs recorded in {run_dir}")
+    return os.path.join(run_dir, runs[-1])
+
+def load_run(path: str) -> list[dict]:
+    """Reads the events of a run file, skipping a truncated last line."""
+    events = []
+    with open(path) as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return events
+
+def critical_path(events: list[dict]) -> list[dict]:
+    """
+    Returns the chain of spans that determined the build's duration:
+    planning, then the agents whose completion gated the last agent to
+    finish, walking back through the dependency each one waited on longest.
+    """
+    spans = [e for e in events if e.get("type") == "span"]
+    agents = {e["agent"]: e for e in spans if e["name"] == "agent" and e.get("agent")}
+    chain = []
+    current = max(agents.values(), key=lambda e: e["start"] + e["duration"], default=None)
+    while current is not None:
+        chain.append(current)
+        prerequisites = [agents[name] for name in current.get("depends_on", []) if name in agents]
+        current = max(prerequisites, key=lambda e: e["start"] + e["duration"], default=None)
+    chain.reverse()
+    planning = [e for e in spans if e["name"] == "plan_all"]
+    return planning[:1] + chain
+
+def agent_breakdown(events: list[dict]) -> dict:
+    """Returns, per agent, its total time, the time in each phase, LLM calls and time, and queue waits."""
+    breakdown = defaultdict(lambda: {"total": 0.0, "phases": defaultdict(float), "llm_calls": 0, "llm_seconds": 0.0,
+                                     "wait_seconds": 0.0, "debug_attempts": 0})
+    for event in events:
+        agent = event.get("agent")
+        if not agent:
+            continue
+        entry = breakdown[agent]
+        if event.get("type") == "span":
+            if event["name"] == "agent":
+                entry["total"] = event["duration"]
+                entry["debug_attempts"] = event.get("debug_attempts", 0)
+            elif event.get("phase"):
+                entry["phases"][event["name"]] += event["duration"]
+        elif event.get("type") == "llm":
+            entry["llm_calls"] += 1
+            entry["llm_seconds"] += event["duration"]
+        elif event.get("type") == "wait":
+            entry["wait_seconds"] += event["duration"]
+    return breakdown
+
+def slowest(events: list[dict], limit: int = 10) -> list[dict]:
+    """Returns the slowest LLM calls and test runs."""
+    calls = [e for e in events if e.get("type") == "llm" or (e.get("type") == "span" and e["name"] == "pytest")]
+    return sorted(calls, key=lambda e: e["duration"], reverse=True)[:limit]
+
+def run_summary(events: list[dict]) -> dict:
+    """Returns run-wide totals: duration, LLM calls, tokens, cache hits and waits."""
+    summary = {"run_id": None, "duration": None, "llm_calls": 0, "llm_seconds": 0.0, "llm_errors": 0,
+               "prompt_tokens": 0, "output_tokens": 0, "cache_hits": 0, "cache_misses": 0, "waits": defaultdict(float)}
+    for event in events:
+        kind = event.get("type")
+        if kind == "run":
+            summary["run_id"] = event.get("run_id")
+        elif kind == "end":
+            summary["duration"] = event["duration"]
+        elif kind == "llm":
+            summary["llm_calls"] += 1
+            summary["llm_seconds"] += event["duration"]
+            summary["llm_errors"] += "error" in event
+            summary["prompt_tokens"] += event.get("prompt_tokens", 0)
+            summary["output_tokens"] += event.get("output_tokens", 0)
+        elif kind == "cache":
+            summary["cache_hits" if event.get("hit") else "cache_misses"] += 1
+        elif kind == "wait":
+            summary["waits"][event["resource"]] += event["duration"]
+    if summary["duration"] is None:
+        ends = [e["start"] + e["duration"] for e in events if "start" in e and "duration" in e]
+        summary["duration"] = max(ends, default=0.0)
+    return summary
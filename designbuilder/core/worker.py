@@ -0,0 +1,212 @@
+"""
+Build Worker
+
+Runs component jobs from the job queue: claims a job, runs the
+PythonAgent loop for it and reports the agent's status back through the
+queue, keeping its lease alive while the agent runs. Started by
+`designbuilder worker`; any number of workers, on this host or others,
+can share one queue, so a build is not limited to one core.
+"""
+import asyncio
+import math
+import signal
+import subprocess
+import sys
+from designbuilder.coding_agents.python_agent import PythonAgent
+from designbuilder.coding_agents.pytest_pool import PytestWorkerPool
+from designbuilder.core.file_watch import FileWatcher
+from designbuilder.core.job_queue import LEASE_SECONDS, Job, JobQueue, default_worker_id
+from designbuilder.core.log_writer import LogWriter
+from designbuilder.core.scheduler import AgentScheduler
+
+POLL_INTERVAL = 1.0    # seconds between queue checks when no change notification arrives
+REPORT_INTERVAL = 0.25  # seconds over which agent status reports are coalesced into one queue write
+
+class _JobStatusReporter:
+    """
+    Stands in for the StatusManager of an agent run by a worker: status
+    updates are buffered in `reports` and written to the job's progress
+    by the worker, and the orchestrator copies them into its own status store.
+    """
+    def __init__(self, reports: dict, job: Job):
+        self.reports = reports
+        self.job = job
+
+    def set_agent_status(self, agent_name: str, new_status):
+        fields = dict(new_status) if isinstance(new_status, dict) else {"status": new_status}
+        self.reports.setdefault(self.job.id, {}).update(fields)
+
+class Worker:
+    """
+    Pulls component jobs from a JobQueue and builds them.
+    """
+    def __init__(self, queue: JobQueue, max_agents: int = None, max_tests: int = None,
+                 max_llm_calls: int = None, worker_id: str = None, llm_backend=None,
+                 lease_seconds: float = LEASE_SECONDS, poll_interval: float = POLL_INTERVAL):
+        """
+        Args:
+            max_agents: Jobs built at once by this worker (default: 4 x CPU count)
+            llm_backend: Shared by every agent; each agent creates its own by default
+        """
+        self.queue = queue
+        self.scheduler = AgentScheduler(max_agents=max_agents, max_tests=max_tests, max_llm_calls=max_llm_calls)
+        self.worker_id = worker_id or default_worker_id()
+        self.llm_backend = llm_backend
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.completed = 0
+        self.failed = 0
+        self._running = {}  # job id -> task
+        self._reports = {}  # job id -> status fields not yet written to the queue
+
+    async def run(self, idle_timeout: float = None, max_jobs: int = None):
+        """
+        Builds jobs until interrupted.
+
+        Args:
+            idle_timeout: Stop after this many seconds with nothing to run
+            max_jobs: Stop after claiming this many jobs
+        """
+        print(f"[Worker {self.worker_id}] Waiting for jobs in {self.queue.path} "
+              f"(up to {self.scheduler.max_agents} at once).")
+        test_pool = PytestWorkerPool(size=self.scheduler.max_tests)
+        heartbeat = asyncio.create_task(self._renew_leases())
+        reporter = asyncio.create_task(self._write_reports())
+        claimed = 0
+        loop = asyncio.get_running_loop()
+        idle_since = loop.time()
+        try:
+            with FileWatcher(self.queue.watch_path) as watcher:
+                while max_jobs is None or claimed < max_jobs or self._running:
+                    while len(self._running) < self.scheduler.max_agents and (max_jobs is None or claimed < max_jobs):
+                        job = await asyncio.to_thread(self.queue.claim, self.worker_id, self.lease_seconds)
+                        if job is None:
+                            break
+                        claimed += 1
+                        self._running[job.id] = asyncio.create_task(self._build(job, test_pool))
+                    if self._running:
+                        idle_since = loop.time()
+                    elif idle_timeout is not None and loop.time() - idle_since >= idle_timeout:
+                        break
+                    # Wake on a queue change (a new job, or one of ours finishing) or the next poll
+                    await asyncio.to_thread(watcher.wait, self.poll_interval)
+        finally:
+            heartbeat.cancel()
+            reporter.cancel()
+            for task in self._running.values():
+                task.cancel()
+            await asyncio.gather(heartbeat, reporter, *self._running.values(), return_exceptions=True)
+            await test_pool.close()
+            LogWriter.default().flush()
+        print(f"[Worker {self.worker_id}] Stopping: {self.completed} job(s) completed, {self.failed} not completed.")
+
+    async def _renew_leases(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            lost = await asyncio.to_thread(self.queue.renew, list(self._running), self.worker_id, self.lease_seconds)
+            for job_id in lost:
+                # Cancelled by the orchestrator, or given to another worker after a stall
+                print(f"[Worker {self.worker_id}] Lost job {job_id}; stopping it.")
+                self._running[job_id].cancel()
+
+    async def _write_reports(self):
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            await self._flush_reports()
+
+    async def _flush_reports(self, job_id: int = None):
+        """Writes the buffered status reports (of one job, or all) in one transaction."""
+        if job_id is None:
+            reports, self._reports = self._reports, {}
+        else:
+            reports = {job_id: self._reports.pop(job_id)} if job_id in self._reports else {}
+        if reports:
+            await asyncio.to_thread(self.queue.report_many, self.worker_id, reports)
+
+    async def _build(self, job: Job, test_pool: PytestWorkerPool):
+        options = job.options
+        agent = None
+        try:
+            agent = PythonAgent(
+                job.component,
+                status_manager=_JobStatusReporter(self._reports, job),
+                agent_name=job.agent_name,
+                scheduler=self.scheduler,
+                use_llm_cache=options.get("use_llm_cache", True),
+                test_pool=test_pool,
+                debug_token_budget=options.get("debug_token_budget"),
+                edit_mode=options.get("edit_mode"),
+                speculative_candidates=options.get("speculative_candidates"),
+                output_dir=options.get("output_dir"),
+                log_dir=options.get("log_dir"),
+                llm_backend=self.llm_backend
+            )
+            agent.bypass_llm_cache = options.get("bypass_llm_cache", False)
+            await agent.run()
+            result = {"status": agent.status}
+        except asyncio.CancelledError:
+            # Worker shutdown: let another worker build it (a no-op if the lease was lost).
+            # Written directly, as the task is being cancelled and must not wait again.
+            self._running.pop(job.id, None)
+            self._reports.pop(job.id, None)
+            self.queue.release(job.id, self.worker_id)
+            raise
+        except Exception as e:
+            if agent is not None:
+                agent._log(f"Agent failed with an unexpected error: {e}")
+            result = {"status": "failed", "error": str(e)}
+        finally:
+            self._running.pop(job.id, None)
+        if agent is not None:
+            result.update(debug_attempts=agent.debug_attempts, started_at=agent.started_at,
+                          finished_at=agent.finished_at, llm_backend=agent.get_llm_backend_name())
+        if result["status"] == "completed":
+            self.completed += 1
+        else:
+            self.failed += 1
+        await self._flush_reports(job.id)
+        await asyncio.to_thread(self.queue.finish, job.id, self.worker_id, result)
+
+def worker_transcript_path(record_transcript: str, index: int) -> str:
+    """The transcript a local worker records its LLM calls to, until they are merged into the build's."""
+    return f"{record_transcript}.worker-{index}"
+
+def spawn_local_workers(count: int, queue: JobQueue, max_agents: int = None, max_tests: int = None,
+                        max_llm_calls: int = None, extra_args: list[str] = None,
+                        record_transcript: str = None) -> list[subprocess.Popen]:
+    """
+    Starts `count` `designbuilder worker` processes on this host, splitting
+    the agent, test and LLM call limits and the provider rate limits between
+    them. With a `record_transcript`, each worker records to its
+    worker_transcript_path.
+    """
+    processes = []
+    for index in range(count):
+        command = [sys.executable, "-m", "designbuilder.cli", "worker", "--queue-file", queue.path]
+        if queue.shared:
+            command.append("--shared-queue")
+        for flag, value in (("--max-agents", max_agents), ("--max-tests", max_tests),
+                            ("--max-llm-calls", max_llm_calls)):
+            if value:
+                command += [flag, str(max(1, math.ceil(value / count)))]
+        if count > 1:
+            command += ["--rate-limit-share", str(1 / count)]
+        if record_transcript:
+            command += ["--record", worker_transcript_path(record_transcript, index)]
+        processes.append(subprocess.Popen(command + (extra_args or [])))
+    return processes
+
+def stop_local_workers(processes: list[subprocess.Popen], timeout: float = 10.0):
+    """
+    Stops workers started by spawn_local_workers. They are interrupted
+    rather than terminated, so they release their jobs and close their
+    transcripts; a worker that does not stop within `timeout` is killed.
+    """
+    for process in processes:
+        if process.poll() is None:
+            process.send_signal(signal.SIGINT)
+    for process in processes:
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
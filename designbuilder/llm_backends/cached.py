@@ -0,0 +1,191 @@
+"""
+Cached LLM Backend
+
+Wraps any LLM backend with a content-addressed response cache on local
+disk, so rebuilding an unchanged design does not pay for the same
+prompts twice.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from designbuilder.core import telemetry
+from .wrapper import BackendWrapper
+from .code_stream import FencedCodeStream
+
+LLM_CACHE_FILE = "/home/karthik/repos/DesignBuilder/designbuilder/cache/llm_cache.db"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024      # 256 MiB of responses
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60    # 30 days
+
+class LLMResponseCache:
+    """
+    An SQLite-backed response store with TTL expiry and LRU eviction by total size.
+    """
+    _default = None
+
+    def __init__(self, path: str = LLM_CACHE_FILE, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "LLMResponseCache":
+        """Returns the process-wide cache shared by every CachedBackend."""
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> str:
+        """Returns the cached response for a key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """Stores a response, then evicts expired and least recently used entries."""
+        now = time.time()
+        size = len(response.encode())
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now)
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def stats(self) -> dict:
+        """Returns entry count, total size and this process's hit/miss counters."""
+        with self._lock:
+            entries, total = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"entries": entries, "bytes": total, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+class CachedBackend(BackendWrapper):
+    """
+    An LLM backend that serves repeated prompts from an LLMResponseCache.
+    """
+    def __init__(self, backend, cache: LLMResponseCache = None):
+        super().__init__(backend)
+        self.cache = cache or LLMResponseCache.default()
+
+    def cache_key(self, prompt: str) -> str:
+        """
+        Keys a prompt on the backend, model, generation parameters and prompt hash.
+        """
+        identity = {
+            "backend": self.backend_name,
+            "model": self.model_name,
+            "params": self.generation_params,
+            "prompt": hashlib.sha256(prompt.encode()).hexdigest(),
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+    async def send_prompt(self, prompt: str, use_cache: bool = True, **kwargs) -> str:
+        """
+        Returns the cached response for the prompt, calling the wrapped backend on a miss.
+
+        Args:
+            prompt: The prompt to send
+            use_cache: Set to False to bypass the cache for this call
+            kwargs: Passed through to the wrapped backend
+        """
+        if not use_cache:
+            return await self.backend.send_prompt(prompt, **kwargs)
+
+        key = self.cache_key(prompt)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        telemetry.record_cache("llm", cached is not None, model=self.model_name)
+        if cached is not None:
+            return cached
+
+        response = await self.backend.send_prompt(prompt, **kwargs)
+        if response:  # Empty responses are usually safety blocks; retry them next time
+            await asyncio.to_thread(self.cache.put, key, response)
+        return response
+
+    async def stream_prompt(self, prompt: str, use_cache: bool = True, **kwargs):
+        """
+        Streams the response to a prompt; a cached response is yielded as one chunk.
+
+        If the consumer stops early, the text received so far is cached only
+        if it already holds a complete code block, which is all the consumer
+        needed; a stream abandoned for any other reason is not cached.
+        """
+        key = self.cache_key(prompt)
+        cached = await asyncio.to_thread(self.cache.get, key) if use_cache else None
+        if use_cache:
+            telemetry.record_cache("llm", cached is not None, model=self.model_name)
+        if cached is not None:
+            yield cached
+            return
+
+        received = FencedCodeStream()
+        finished = False
+        stream = self.backend.stream_prompt(prompt, **kwargs)
+        try:
+            async for chunk in stream:
+                received.feed(chunk)
+                yield chunk
+            finished = True
+        except GeneratorExit:
+            finished = received.complete
+        finally:
+            await stream.aclose()
+        if use_cache and finished and received.text:
+            await asyncio.to_thread(self.cache.put, key, received.text)
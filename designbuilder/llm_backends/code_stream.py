@@ -0,0 +1,53 @@
+"""
+Code Stream
+
+Incrementally extracts the first Python (or untagged) fenced code block
+from a streamed LLM response, so generation can be abandoned as soon as
+the block closes. Blocks tagged with another language, such as a shell
+example before the code, are skipped.
+"""
+import re
+
+# An opening fence with an optional language tag, then the body, then a closing fence on its own line
+_FENCED_BLOCK = re.compile(r"```(?P<language>[\w+-]*)[ \t]*\n(?P<code>.*?)\n[ \t]*```", re.DOTALL)
+CODE_LANGUAGES = ("", "python", "py", "python3")
+
+class FencedCodeStream:
+    """
+    Accumulates streamed chunks and reports when a complete code block has arrived.
+    """
+    def __init__(self):
+        self._chunks = []
+        self._code = None
+        self._scan_from = 0  # skipped blocks end before this offset
+        self.complete = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Adds a chunk of the response.
+
+        Returns:
+            True once the first Python or untagged code block is complete
+        """
+        self._chunks.append(chunk)
+        if self.complete:
+            return True
+        # The chunk that completes a closing fence always contains a backtick
+        if "`" in chunk:
+            for match in _FENCED_BLOCK.finditer(self.text, self._scan_from):
+                if match.group("language").lower() in CODE_LANGUAGES:
+                    self._code = match.group("code")
+                    self.complete = True
+                    break
+                self._scan_from = match.end()
+        return self.complete
+
+    def code(self) -> str:
+        """
+        Returns the completed code block, or None if no block has closed yet.
+        """
+        return self._code.strip() if self._code is not None else None
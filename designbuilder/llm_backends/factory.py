@@ -0,0 +1,22 @@
+"""
+LLM Backend Factory
+
+Builds the LLM backend used by the planner, parser and coding agents.
+"""
+from .base import LLMBackend
+from .router import BackendRouter
+from .transcript import ReplayBackend
+
+def create_backend(use_cache: bool = True) -> LLMBackend:
+    """
+    Creates the default LLM backend: a router that picks a backend and
+    model per prompt. Each routed backend is rate limited against the
+    shared per-model quota, retried and hedged by the resilience layer,
+    and wrapped in the response cache unless disabled. The cache sits
+    outermost so cache hits never consume quota.
+
+    When a transcript is being replayed, every caller shares the replay backend instead.
+    """
+    if ReplayBackend.default_path:
+        return ReplayBackend.default()
+    return BackendRouter(use_cache=use_cache)
@@ -0,0 +1,175 @@
+"""
+Fake LLM Backend
+
+A local, deterministic stand-in for a real LLM, for tests and benchmarks.
+It recognizes DesignBuilder's prompts and answers each with canned output
+that works end to end: component lists, plans, an implementation, tests
+for it, and edits that fix a deliberately injected bug. Latency, transient
+failures and rate-limit errors are drawn from configurable distributions,
+seeded per prompt so results do not depend on call interleaving.
+"""
+import asyncio
+import hashlib
+import math
+import random
+import re
+import yaml
+from .base import LLMBackend
+from .router import FAST, BackendRouter, RouteCandidate
+
+IMPLEMENTATION = '''def checksum(values):
+    """Returns the sum of the values modulo 2**32."""
+    return sum(values) % 2 ** 32
+
+def describe(values):
+    """Returns a short description of the values."""
+    return f"{len(values)} value(s), checksum {checksum(values)}"
+'''
+
+# The same module with a bug a debug attempt has to fix
+BUGGY_LINE = "    return sum(values[1:]) % 2 ** 32"
+FIXED_LINE = "    return sum(values) % 2 ** 32"
+BUGGY_IMPLEMENTATION = IMPLEMENTATION.replace(FIXED_LINE, BUGGY_LINE)
+
+# Tests import the module under test by the test file's name (tests/test_<module>.py)
+TESTS = '''import importlib
+import os
+
+module = importlib.import_module(os.path.basename(__file__)[len("test_"):-len(".py")])
+
+def test_checksum():
+    assert module.checksum([1, 2, 3]) == 6
+
+def test_checksum_wraps():
+    assert module.checksum([2 ** 32, 5]) == 5
+
+def test_describe():
+    assert module.describe([]) == "0 value(s), checksum 0"
+'''
+
+FIX_EDIT = f"<<<<<<< SEARCH\n{BUGGY_LINE}\n=======\n{FIXED_LINE}\n>>>>>>> REPLACE"
+
+def parse_latency(spec) -> callable:
+    """
+    Builds a latency distribution: a number of seconds, a callable taking a
+    random.Random, or a spec string: "fixed:0.2", "uniform:0.1,0.5",
+    "lognormal:0.3,0.8" (median and sigma) or "exponential:0.4" (mean).
+    """
+    if callable(spec):
+        return spec
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+    kind, _, arguments = str(spec).partition(":")
+    values = [float(value) for value in arguments.split(",") if value.strip()]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(*values)
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    if kind == "exponential" and len(values) == 1:
+        return lambda rng: rng.expovariate(1 / values[0])
+    raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+class FakeRateLimitError(RuntimeError):
+    """Raised like a provider's HTTP 429."""
+    status_code = 429
+
+class FakeBackend(LLMBackend):
+    """
+    An LLM backend that answers DesignBuilder's prompts locally.
+    """
+    def __init__(self, latency=0.0, failure_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 bug_rate: float = 0.0, components: int = 3, seed: int = 0, model_name: str = "fake",
+                 chunk_chars: int = 256, retry_after: float = 0.05):
+        """
+        Args:
+            latency: Seconds per call, or a distribution (see parse_latency)
+            failure_rate: Probability that a call fails with a transient ConnectionError
+            rate_limit_rate: Probability that a call fails with a rate-limit error
+            bug_rate: Probability that an implementation has a bug its tests catch
+            components: Number of components returned for a design document
+            seed: Seed for every random draw
+            model_name: The model name to report
+            chunk_chars: Size of the chunks streamed responses are split into
+            retry_after: Cooldown in seconds suggested by rate-limit errors
+        """
+        self.latency = parse_latency(latency)
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.bug_rate = bug_rate
+        self.components = components
+        self.seed = seed
+        self.model_name = model_name
+        self.chunk_chars = chunk_chars
+        self.retry_after = retry_after
+        self.generation_params = {"seed": seed}
+        self.calls = 0
+        self.failures = 0
+        self._prompt_calls = {}
+
+    def _random(self, prompt: str) -> random.Random:
+        """A generator seeded by the prompt and how often it has been sent, independent of call order."""
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        count = self._prompt_calls.get(digest, 0)
+        self._prompt_calls[digest] = count + 1
+        return random.Random(f"{self.seed}:{digest}:{count}")
+
+    def respond(self, prompt: str, rng: random.Random = None) -> str:
+        """Returns the canned response to a prompt."""
+        rng = rng or random.Random(self.seed)
+        if "Extract all architectural components" in prompt:
+            return yaml.dump([{"name": f"Component {i + 1}", "description": f"Synthetic component {i + 1}.",
+                               "language": "Python"} for i in range(self.components)])
+        if "planning implementations for multiple components" in prompt:
+            listed = prompt.split("Components:", 1)[-1]
+            names = re.findall(r"^\s*-?\s*name:\s*(.+?)\s*$", listed, re.MULTILINE)
+            return "```yaml\n" + yaml.dump([
+                {"name": name.strip("'\""), "plan": {"purpose": f"Implement {name}.", "sub_tasks": ["checksum"],
+                                                     "dependencies": [], "edge_cases": ["empty input"],
+                                                     "complexity": "Low"}}
+                for name in names
+            ]) + "```"
+        if "planning the implementation of a code component" in prompt:
+            return "1. Purpose: checksum values.\n2. Sub-tasks: checksum, describe.\n5. Complexity: Low"
+        if prompt.startswith("Implement the following component"):
+            code = BUGGY_IMPLEMENTATION if rng.random() < self.bug_rate else IMPLEMENTATION
+            return f"```python\n{code}```"
+        if "Write comprehensive unit tests" in prompt:
+            return f"```python\n{TESTS}```"
+        if "SEARCH/REPLACE" in prompt and (BUGGY_LINE in prompt or "failed its tests" in prompt):
+            return f"```\n{FIX_EDIT}\n```"
+        if "failed its tests" in prompt or "The user has provided the following guidance" in prompt:
+            return f"```python\n{IMPLEMENTATION}```"
+        return "OK"
+
+    async def _call(self, prompt: str) -> str:
+        rng = self._random(prompt)
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency(rng)))
+        draw = rng.random()
+        if draw < self.failure_rate:
+            self.failures += 1
+            raise ConnectionError("fake transient failure")
+        if draw < self.failure_rate + self.rate_limit_rate:
+            self.failures += 1
+            raise FakeRateLimitError(f"429 fake rate limit exceeded, retry after {self.retry_after}s")
+        return self.respond(prompt, rng)
+
+    async def send_prompt(self, prompt: str) -> str:
+        return await self._call(prompt)
+
+    async def stream_prompt(self, prompt: str):
+        response = await self._call(prompt)
+        for start in range(0, len(response), self.chunk_chars):
+            yield response[start:start + self.chunk_chars]
+            await asyncio.sleep(0)
+
+def fake_router(backend: FakeBackend = None) -> BackendRouter:
+    """
+    A router whose only candidate is a fake backend, wrapped in the rate
+    limiter and resilience layer like a real one (but not the response cache).
+    """
+    backend = backend or FakeBackend()
+    candidate = RouteCandidate(backend.model_name, FAST, (0.0, 0.0), 0.1, type(backend).__name__, lambda: backend)
+    return BackendRouter([candidate], use_cache=False)
@@ -11,12 +11,12 @@ class GeminiBackend(LLMBackend):
     """
     An LLM backend that uses the google-generativeai library.
     """
-    def __init__(self):
+    def __init__(self, model_name: str = 'gemini-2.5-flash'):
         api_key = os.environ.get("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set.")
         genai.configure(api_key=api_key)
-        self.model_name = 'gemini-2.5-flash'
+        self.model_name = model_name
         self.model = genai.GenerativeModel(self.model_name)
 
 
@@ -30,3 +30,15 @@ class GeminiBackend(LLMBackend):
             # often due to safety filters or if it generates an empty string.
             print("Warning: Gemini response contained no valid text part. Returning empty string.")
             return ""
+
+    async def stream_prompt(self, prompt: str):
+        """Streams content from the Gemini API as it is generated."""
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without a text part (e.g. safety metadata) carry nothing to yield
+                continue
+            if text:
+                yield text
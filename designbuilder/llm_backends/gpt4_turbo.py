@@ -15,16 +15,31 @@ class GPT4TurboBackend(LLMBackend):
         api_key = os.environ.get("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set.")
-        openai.api_key = api_key
+        self.client = openai.AsyncOpenAI(api_key=api_key)
         self.model = model
+        self.model_name = model
+        self.generation_params = {
+            "model": model,
+            "temperature": 0.2,
+            "max_tokens": 2000,
+        }
 
     async def send_prompt(self, prompt: str) -> str:
         """Generates content using OpenAI GPT-4-turbo asynchronously."""
-        response = await openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+        response = await self.client.chat.completions.create(
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            max_tokens=2000
+            **self.generation_params
         )
         return response.choices[0].message.content
 
+    async def stream_prompt(self, prompt: str):
+        """Streams content from OpenAI GPT-4-turbo as it is generated."""
+        stream = await self.client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            **self.generation_params
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
@@ -0,0 +1,276 @@
+"""
+Rate Limiter
+
+A process-wide limiter for each backend and model. Token buckets cap
+requests per minute and tokens per minute, and an adaptive concurrency
+limit shrinks when the provider returns rate-limit errors and grows
+back as calls succeed. Processes that share a provider quota (e.g. the
+local workers of a build) each take a share of the per-minute limits.
+"""
+import asyncio
+import re
+import time
+from designbuilder.core import telemetry
+from .wrapper import BackendWrapper
+
+# (requests per minute, tokens per minute)
+DEFAULT_LIMITS = {
+    "gemini-2.5-flash": (1000, 1_000_000),
+    "gemini-2.5-pro": (150, 2_000_000),
+    "gpt-3.5-turbo": (500, 200_000),
+    "gpt-4-turbo": (500, 300_000),
+    "gemini-cli": (60, 1_000_000),
+    "fake": (1_000_000, 1_000_000_000),  # the local fake backend used by tests and benchmarks
+}
+FALLBACK_LIMITS = (60, 100_000)
+MAX_CONCURRENCY = 64
+EXPECTED_OUTPUT_TOKENS = 1000   # reserved per call until the real output size is known
+MAX_RATE_LIMIT_RETRIES = 5
+SLOW_WAIT_SECONDS = 5.0         # queue waits longer than this are reported
+MIN_RECORDED_WAIT = 0.01        # shorter queue waits are not recorded as telemetry
+
+# A 429 status in an error message: leading ("429 Resource has been exhausted"), after
+# "status" or "code" ("Error code: 429"), or with its reason ("429 Too Many Requests")
+_RATE_LIMIT_STATUS = re.compile(r"^\s*429\b|\b(?:status|code)\W{0,3}429\b|\b429\W{0,3}too many requests",
+                                re.IGNORECASE)
+
+def estimate_tokens(text: str) -> int:
+    """A rough token count (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Returns True for provider rate-limit / quota errors, without importing the provider SDKs.
+    """
+    if type(error).__name__ in ("ResourceExhausted", "RateLimitError", "TooManyRequests"):
+        return True
+    if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    message = str(error)
+    if _RATE_LIMIT_STATUS.search(message):
+        return True
+    message = message.lower()
+    return "quota exceeded" in message or "rate limit" in message
+
+def retry_after_seconds(error: Exception) -> float:
+    """Extracts a provider-suggested retry delay from an error, if there is one."""
+    match = re.search(r"retry[ _-]?(?:after|delay)\D{0,20}(\d+(?:\.\d+)?)", str(error), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+class _LoopLocal:
+    """
+    Creates an asyncio primitive lazily for the running event loop, so
+    process-wide limiters survive across separate asyncio.run() calls.
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._loop = None
+        self._value = None
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._value = self._factory()
+        return self._value
+
+class TokenBucket:
+    """
+    A bucket refilled continuously at `rate_per_minute`. Consumption may
+    drive the balance negative (e.g. when a response is larger than
+    expected); later acquisitions then wait until it recovers.
+    """
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = _LoopLocal(asyncio.Lock)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float):
+        """Waits until `amount` tokens are available, then takes them."""
+        amount = min(amount, self.capacity)
+        async with self._lock.get():  # FIFO: waiters are served in arrival order
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def consume(self, amount: float):
+        """Takes tokens without waiting."""
+        self._refill()
+        self.tokens -= amount
+
+class AdaptiveConcurrency:
+    """
+    An AIMD concurrency limit: halved on every rate-limit error and raised
+    by one after a full window of successful calls.
+    """
+    def __init__(self, initial: int = MAX_CONCURRENCY, maximum: int = MAX_CONCURRENCY):
+        self.limit = float(initial)
+        self.maximum = maximum
+        self.in_flight = 0
+        self._condition = _LoopLocal(asyncio.Condition)
+
+    async def acquire(self):
+        condition = self._condition.get()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        condition = self._condition.get()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    def on_success(self):
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_rate_limited(self):
+        self.limit = max(1.0, self.limit / 2)
+
+class RateLimiter:
+    """
+    Requests-per-minute, tokens-per-minute and concurrency limits for one backend and model.
+    """
+    _registry = {}
+    default_share = 1.0  # Fraction of each quota this process uses; set by `designbuilder worker --rate-limit-share`
+
+    def __init__(self, name: str, requests_per_minute: int, tokens_per_minute: int):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency()
+        self.calls = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @classmethod
+    def for_backend(cls, backend_name: str, model_name: str) -> "RateLimiter":
+        """Returns the limiter shared by every backend instance for this backend and model."""
+        key = (backend_name, model_name)
+        if key not in cls._registry:
+            requests_per_minute, tokens_per_minute = DEFAULT_LIMITS.get(model_name, FALLBACK_LIMITS)
+            cls._registry[key] = cls(f"{backend_name}/{model_name}", requests_per_minute * cls.default_share,
+                                     tokens_per_minute * cls.default_share)
+        return cls._registry[key]
+
+    @classmethod
+    def all_stats(cls) -> dict:
+        return {limiter.name: limiter.stats() for limiter in cls._registry.values()}
+
+    async def acquire(self, prompt_tokens: int) -> float:
+        """
+        Waits for a request slot, request quota and token quota.
+
+        Returns:
+            Seconds spent waiting in the queue
+        """
+        started = time.monotonic()
+        await self.concurrency.acquire()
+        try:
+            await self.requests.acquire(1)
+            await self.tokens.acquire(prompt_tokens + EXPECTED_OUTPUT_TOKENS)
+        except BaseException:
+            await self.concurrency.release()
+            raise
+        waited = time.monotonic() - started
+        if waited > MIN_RECORDED_WAIT:
+            telemetry.record_wait("rate_limit", waited, limiter=self.name)
+        self.calls += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if waited > SLOW_WAIT_SECONDS:
+            print(f"[RateLimiter] {self.name}: waited {waited:.1f}s for quota "
+                  f"(concurrency limit {int(self.concurrency.limit)}).")
+        return waited
+
+    async def release(self, output_tokens: int = None, error: Exception = None):
+        """
+        Frees the request slot and adapts the concurrency limit to the outcome.
+        """
+        if output_tokens is not None:
+            # Settle the difference between the reserved and the actual output size
+            self.tokens.consume(output_tokens - EXPECTED_OUTPUT_TOKENS)
+        if error is not None and is_rate_limit_error(error):
+            self.rate_limited += 1
+            self.concurrency.on_rate_limited()
+        elif error is None:
+            self.concurrency.on_success()
+        await self.concurrency.release()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "concurrency_limit": int(self.concurrency.limit),
+            "avg_wait": self.total_wait / self.calls if self.calls else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+class RateLimitedBackend(BackendWrapper):
+    """
+    An LLM backend whose calls pass through the shared RateLimiter for its model.
+    Rate-limited calls are retried after a cooldown instead of failing the build.
+    """
+    def __init__(self, backend, limiter: RateLimiter = None, max_retries: int = MAX_RATE_LIMIT_RETRIES):
+        super().__init__(backend)
+        self.limiter = limiter or RateLimiter.for_backend(self.backend_name, self.model_name)
+        self.max_retries = max_retries
+
+    async def _cooldown(self, error: Exception, attempt: int):
+        delay = retry_after_seconds(error) or min(60.0, 2.0 ** attempt)
+        print(f"[RateLimiter] {self.limiter.name}: rate limited, retrying in {delay:.1f}s "
+              f"(attempt {attempt + 1}/{self.max_retries}).")
+        await asyncio.sleep(delay)
+
+    async def send_prompt(self, prompt: str, **kwargs) -> str:
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(estimate_tokens(prompt))
+            try:
+                response = await self.backend.send_prompt(prompt, **kwargs)
+            except Exception as e:
+                await self.limiter.release(error=e)
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                await self._cooldown(e, attempt)
+                continue
+            except BaseException as e:
+                # Cancelled (e.g. a deadline or a losing hedged request); free the slot
+                await self.limiter.release(error=e)
+                raise
+            await self.limiter.release(output_tokens=estimate_tokens(response or ""))
+            return response
+
+    async def stream_prompt(self, prompt: str, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(estimate_tokens(prompt))
+            received = []
+            stream = self.backend.stream_prompt(prompt, **kwargs)
+            try:
+                async for chunk in stream:
+                    received.append(chunk)
+                    yield chunk
+            except Exception as e:
+                await stream.aclose()
+                await self.limiter.release(error=e)
+                # Only retry if nothing was yielded yet; the consumer cannot un-see chunks
+                if received or not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                await self._cooldown(e, attempt)
+                continue
+            except BaseException:
+                await stream.aclose()
+                await self.limiter.release(output_tokens=estimate_tokens("".join(received)))
+                raise
+            await stream.aclose()
+            await self.limiter.release(output_tokens=estimate_tokens("".join(received)))
+            return
@@ -0,0 +1,336 @@
+"""
+Resilient LLM Backend
+
+Wraps an LLM backend with classified retries (exponential backoff with
+full jitter), per-call deadlines, optional hedged requests and a circuit
+breaker per backend and model, so one transient error or slow tail
+response does not stall or crash an agent.
+"""
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from .wrapper import BackendWrapper
+from .rate_limiter import is_rate_limit_error
+
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 30.0
+ATTEMPT_TIMEOUT_SECONDS = 180.0     # one attempt, including time queued for quota
+CALL_DEADLINE_SECONDS = 600.0       # all attempts of one call
+LATENCY_WINDOW = 100                # recent successful calls used for the p95
+MIN_HEDGE_SAMPLES = 10              # no hedging until the p95 is meaningful
+MIN_HEDGE_DELAY_SECONDS = 2.0
+FAILURE_THRESHOLD = 5               # consecutive transient failures that open the circuit
+RESET_TIMEOUT_SECONDS = 30.0        # how long an open circuit rejects calls before a trial call
+EWMA_ALPHA = 0.2                    # weight of the newest call in the latency and error-rate averages
+
+TRANSIENT = "transient"
+RATE_LIMITED = "rate_limited"
+FATAL = "fatal"
+
+_TRANSIENT_ERROR_NAMES = {
+    "ServiceUnavailable", "InternalServerError", "DeadlineExceeded",
+    "APIConnectionError", "APITimeoutError", "BadGateway", "GatewayTimeout", "Aborted",
+}
+_TRANSIENT_MESSAGES = (
+    "timed out", "temporarily unavailable", "service unavailable", "connection reset", "connection aborted",
+)
+# A 502, 503 or 504 status in an error message: leading ("503 Service Unavailable")
+# or after "status" or "code" ("Error code: 502")
+_TRANSIENT_STATUS = re.compile(r"^\s*50[234]\b|\b(?:status|code)\W{0,3}50[234]\b", re.IGNORECASE)
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit breaker is open."""
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classifies an LLM call error as TRANSIENT (worth retrying), RATE_LIMITED
+    (already retried by the rate limiter below) or FATAL (e.g. a bad request
+    or missing credentials, which a retry cannot fix).
+    """
+    if isinstance(error, CircuitOpenError):
+        return FATAL
+    if is_rate_limit_error(error):
+        return RATE_LIMITED
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return TRANSIENT
+    if type(error).__name__ in _TRANSIENT_ERROR_NAMES:
+        return TRANSIENT
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int) and 500 <= status < 600:
+        return TRANSIENT
+    message = str(error)
+    if _TRANSIENT_STATUS.search(message):
+        return TRANSIENT
+    message = message.lower()
+    if any(fragment in message for fragment in _TRANSIENT_MESSAGES):
+        return TRANSIENT
+    return FATAL
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE_SECONDS, cap: float = BACKOFF_CAP_SECONDS) -> float:
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class CircuitBreaker:
+    """
+    Opens after FAILURE_THRESHOLD consecutive transient failures and rejects
+    calls for RESET_TIMEOUT_SECONDS. Then a single trial call is let through:
+    success closes the circuit, failure opens it again.
+    """
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD,
+                 reset_timeout: float = RESET_TIMEOUT_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allows_request(self) -> bool:
+        """Returns True if a call may be made now, without reserving the trial call."""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            return not self._trial_in_flight
+        return self.state == "closed" or (self.state == "half_open" and not self._trial_in_flight)
+
+    def before_call(self):
+        """Raises CircuitOpenError if the circuit rejects the call."""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "open" or (self.state == "half_open" and self._trial_in_flight):
+            raise CircuitOpenError("circuit breaker is open")
+        if self.state == "half_open":
+            self._trial_in_flight = True
+
+    def on_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def on_failure(self):
+        self._trial_in_flight = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                print(f"[Resilience] Circuit opened after {self.failures} consecutive failures.")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def on_abandoned(self):
+        """A call ended without an outcome (e.g. it was cancelled); free the trial slot."""
+        self._trial_in_flight = False
+
+class BackendHealth:
+    """
+    Latency, error and circuit-breaker state shared by every wrapper around
+    the same backend and model.
+    """
+    _registry = {}
+
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latency_ewma = None
+        self.error_rate = 0.0
+
+    @classmethod
+    def for_backend(cls, backend_name: str, model_name: str) -> "BackendHealth":
+        key = (backend_name, model_name)
+        if key not in cls._registry:
+            cls._registry[key] = cls(f"{backend_name}/{model_name}")
+        return cls._registry[key]
+
+    @classmethod
+    def all_stats(cls) -> dict:
+        return {health.name: health.stats() for health in cls._registry.values()}
+
+    @classmethod
+    def lookup(cls, backend_name: str, model_name: str) -> "BackendHealth":
+        """Returns the health for a backend and model, or None if it has not been called yet."""
+        return cls._registry.get((backend_name, model_name))
+
+    def record_success(self, latency: float):
+        self.calls += 1
+        self.latencies.append(latency)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += EWMA_ALPHA * (latency - self.latency_ewma)
+        self.error_rate -= EWMA_ALPHA * self.error_rate
+        self.breaker.on_success()
+
+    def record_failure(self, error: BaseException):
+        self.calls += 1
+        self.errors += 1
+        if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+            self.timeouts += 1
+        kind = classify_error(error)
+        if kind != FATAL:
+            self.error_rate += EWMA_ALPHA * (1.0 - self.error_rate)
+        if kind == TRANSIENT:
+            self.breaker.on_failure()
+        else:
+            # The service answered; a bad request says nothing about its health
+            self.breaker.on_abandoned()
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the given latency percentile of recent successful calls, or None."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def hedge_delay(self) -> float:
+        """Returns how long to wait before hedging a call, or None if there are too few samples."""
+        if len(self.latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        return max(MIN_HEDGE_DELAY_SECONDS, self.percentile(0.95))
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "circuit": self.breaker.state,
+        }
+
+class ResilientBackend(BackendWrapper):
+    """
+    An LLM backend that retries transient failures, enforces per-call
+    deadlines, optionally hedges slow calls and stops calling a backend
+    whose circuit breaker is open.
+
+    Stack it above the RateLimitedBackend so retries and hedged duplicates
+    are paced by the shared quota.
+    """
+    default_hedging = False  # Set by `designbuilder build --hedge`
+
+    def __init__(self, backend, health: BackendHealth = None, max_retries: int = MAX_RETRIES,
+                 attempt_timeout: float = ATTEMPT_TIMEOUT_SECONDS,
+                 deadline: float = CALL_DEADLINE_SECONDS, hedge: bool = None):
+        super().__init__(backend)
+        self.health = health or BackendHealth.for_backend(self.backend_name, self.model_name)
+        self.max_retries = max_retries
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.hedge = self.default_hedging if hedge is None else hedge
+
+    async def _retry_or_raise(self, error: BaseException, attempt: int, call_deadline: float):
+        """Sleeps before the next attempt, or re-raises if the error or budget rules it out."""
+        remaining = call_deadline - time.monotonic()
+        if classify_error(error) != TRANSIENT or attempt >= self.max_retries or remaining <= 0:
+            raise error
+        delay = min(backoff_delay(attempt), remaining)
+        self.health.retries += 1
+        print(f"[Resilience] {self.health.name}: {type(error).__name__}: {str(error)[:100]}; "
+              f"retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries}).")
+        await asyncio.sleep(delay)
+
+    async def _attempt(self, prompt: str, timeout: float, kwargs: dict) -> str:
+        """Makes one timed call through the circuit breaker."""
+        self.health.breaker.before_call()
+        started = time.monotonic()
+        try:
+            response = await asyncio.wait_for(self.backend.send_prompt(prompt, **kwargs), timeout)
+        except asyncio.CancelledError:
+            self.health.breaker.on_abandoned()
+            raise
+        except Exception as e:
+            self.health.record_failure(e)
+            raise
+        self.health.record_success(time.monotonic() - started)
+        return response
+
+    async def _hedged_attempt(self, prompt: str, timeout: float, kwargs: dict) -> str:
+        """
+        Makes a call and, if it is slower than the recent p95, sends a duplicate
+        and returns whichever response arrives first.
+        """
+        delay = self.health.hedge_delay() if self.hedge else None
+        if delay is None or delay >= timeout:
+            return await self._attempt(prompt, timeout, kwargs)
+
+        primary = asyncio.ensure_future(self._attempt(prompt, timeout, kwargs))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done and self.health.breaker.allows_request():
+                self.health.hedges += 1
+                pending.add(asyncio.ensure_future(self._attempt(prompt, timeout - delay, kwargs)))
+            pending |= done
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.health.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def send_prompt(self, prompt: str, **kwargs) -> str:
+        call_deadline = time.monotonic() + self.deadline
+        for attempt in range(self.max_retries + 1):
+            timeout = min(self.attempt_timeout, call_deadline - time.monotonic())
+            try:
+                return await self._hedged_attempt(prompt, timeout, kwargs)
+            except Exception as e:
+                await self._retry_or_raise(e, attempt, call_deadline)
+
+    async def stream_prompt(self, prompt: str, **kwargs):
+        """
+        Streams a response, retrying transient failures that happen before the
+        first chunk. The attempt timeout bounds the wait for each chunk; streams
+        are not hedged, since the consumer cannot take back chunks it has seen.
+        """
+        call_deadline = time.monotonic() + self.deadline
+        for attempt in range(self.max_retries + 1):
+            self.health.breaker.before_call()
+            started = time.monotonic()
+            received = False
+            stream = self.backend.stream_prompt(prompt, **kwargs)
+            try:
+                while True:
+                    timeout = min(self.attempt_timeout, call_deadline - time.monotonic())
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    received = True
+                    yield chunk
+            except Exception as e:
+                await stream.aclose()
+                self.health.record_failure(e)
+                if received:
+                    raise
+                await self._retry_or_raise(e, attempt, call_deadline)
+                continue
+            except BaseException:
+                # The consumer stopped early or the task was cancelled
+                await stream.aclose()
+                if received:
+                    self.health.record_success(time.monotonic() - started)
+                else:
+                    self.health.breaker.on_abandoned()
+                raise
+            await stream.aclose()
+            self.health.record_success(time.monotonic() - started)
+            return
@@ -0,0 +1,272 @@
+"""
+LLM Backend Router
+
+Picks a backend and model for each call from the kind of prompt, the
+observed latency and error rate of each backend, and its configured
+cost. Routine prompts go to cheap, fast models; guidance and debug
+loops that keep failing are escalated to stronger ones. Degraded or
+unavailable backends are skipped automatically.
+"""
+import itertools
+import shutil
+import time
+from dataclasses import dataclass
+from typing import Callable
+from designbuilder.core import telemetry
+from . import transcript
+from .base import LLMBackend
+from .cached import CachedBackend
+from .rate_limiter import EXPECTED_OUTPUT_TOKENS, RateLimitedBackend, estimate_tokens
+from .resilient import BackendHealth, CircuitOpenError, FATAL, ResilientBackend, classify_error
+
+FAST = "fast"
+STRONG = "strong"
+
+# The tier of model each kind of prompt is routed to first
+KIND_TIERS = {
+    "extraction": FAST,
+    "plan": FAST,
+    "implement": FAST,
+    "write_tests": FAST,
+    "debug": FAST,
+    "guide": STRONG,
+}
+DEFAULT_KIND = "implement"
+ESCALATE_DEBUG_AFTER = 3    # debug attempts on the fast tier before escalating to the strong tier
+ERROR_PENALTY = 4.0         # an error rate of 25% doubles a backend's effective latency
+COST_WEIGHT = 500.0         # seconds of latency one US dollar is worth
+
+_call_ids = itertools.count(1)  # identifies the attempts of one routed call in transcripts
+
+def _gemini(model_name: str):
+    def create():
+        from .gemini import GeminiBackend
+        return GeminiBackend(model_name)
+    return create
+
+def _openai(model_name: str):
+    def create():
+        from .gpt4_turbo import GPT4TurboBackend
+        return GPT4TurboBackend(model_name)
+    return create
+
+def _gemini_cli():
+    if shutil.which("gemini") is None:
+        raise RuntimeError("the 'gemini' CLI is not on PATH")
+    from designbuilder.llm_clis.gemini_cli import GeminiCliBackend
+    return GeminiCliBackend()
+
+@dataclass
+class RouteCandidate:
+    """A backend and model the router may choose, with its routing profile."""
+    model: str
+    tier: str
+    cost: tuple                 # US dollars per million input and output tokens
+    prior_latency: float        # seconds, used until the backend has been observed
+    backend_name: str
+    create: Callable[[], LLMBackend]
+
+    def expected_cost(self, prompt_tokens: int) -> float:
+        input_cost, output_cost = self.cost
+        return (prompt_tokens * input_cost + EXPECTED_OUTPUT_TOKENS * output_cost) / 1_000_000
+
+# Listed in order of preference within each tier
+DEFAULT_CANDIDATES = [
+    RouteCandidate("gemini-2.5-flash", FAST, (0.30, 2.50), 10.0, "GeminiBackend", _gemini("gemini-2.5-flash")),
+    RouteCandidate("gemini-cli", FAST, (0.0, 0.0), 40.0, "GeminiCliBackend", _gemini_cli),
+    RouteCandidate("gemini-2.5-pro", STRONG, (1.25, 10.00), 30.0, "GeminiBackend", _gemini("gemini-2.5-pro")),
+    RouteCandidate("gpt-4-turbo", STRONG, (10.00, 30.00), 25.0, "GPT4TurboBackend", _openai("gpt-4-turbo")),
+]
+
+class BackendRouter(LLMBackend):
+    """
+    An LLM backend that routes each prompt to the best available candidate.
+
+    Every candidate is wrapped in the rate limiter, the resilience layer and
+    (unless disabled) the response cache, and is only constructed when it is
+    first chosen. A candidate that cannot be constructed (e.g. a missing API
+    key) is skipped for the rest of the process.
+    """
+    _unavailable = {}  # model -> reason, shared by every router
+
+    def __init__(self, candidates: list[RouteCandidate] = None, use_cache: bool = True):
+        self.candidates = candidates or DEFAULT_CANDIDATES
+        self.use_cache = use_cache
+        self.last_model = None
+        self._backends = {}
+
+    @property
+    def model_name(self) -> str:
+        """
+        The model that served the last call or, before any call, the first
+        listed candidate of the default tier (stable, so it can be fingerprinted).
+        """
+        if self.last_model:
+            return self.last_model
+        tier = self.tier_for(DEFAULT_KIND)
+        for candidate in self.candidates:
+            if candidate.tier == tier and candidate.model not in self._unavailable:
+                return candidate.model
+        return "unknown"
+
+    def _backend(self, candidate: RouteCandidate) -> LLMBackend:
+        """Returns the wrapped backend for a candidate, or None if it is unavailable."""
+        if candidate.model in self._unavailable:
+            return None
+        if candidate.model not in self._backends:
+            try:
+                backend = ResilientBackend(RateLimitedBackend(candidate.create()))
+            except Exception as e:
+                self._unavailable[candidate.model] = str(e)
+                print(f"[Router] {candidate.model} is unavailable: {e}")
+                return None
+            self._backends[candidate.model] = CachedBackend(backend) if self.use_cache else backend
+        return self._backends[candidate.model]
+
+    def tier_for(self, kind: str, attempt: int = 0) -> str:
+        """Returns the model tier for a kind of prompt; debugging escalates after repeated attempts."""
+        if kind == "debug" and attempt >= ESCALATE_DEBUG_AFTER:
+            return STRONG
+        return KIND_TIERS.get(kind, KIND_TIERS[DEFAULT_KIND])
+
+    def score(self, candidate: RouteCandidate, prompt_tokens: int) -> float:
+        """
+        Returns the expected cost of a call in seconds: observed (or prior)
+        latency, inflated by the recent error rate, plus the weighted price.
+        """
+        health = BackendHealth.lookup(candidate.backend_name, candidate.model)
+        latency = candidate.prior_latency
+        error_rate = 0.0
+        if health is not None:
+            latency = health.latency_ewma if health.latency_ewma is not None else latency
+            error_rate = health.error_rate
+        return latency * (1 + ERROR_PENALTY * error_rate) + COST_WEIGHT * candidate.expected_cost(prompt_tokens)
+
+    def rank(self, kind: str, prompt: str, attempt: int = 0, variant: int = 0) -> list[RouteCandidate]:
+        """
+        Orders the usable candidates for a prompt: the preferred tier first,
+        then the other tier as a fallback, each by score. Unavailable
+        candidates and candidates with an open circuit are left out.
+
+        A non-zero `variant` rotates the order, so concurrent variants of a
+        prompt (e.g. speculative debug candidates) start on different models.
+        """
+        tier = self.tier_for(kind, attempt)
+        prompt_tokens = estimate_tokens(prompt)
+        usable = []
+        for candidate in self.candidates:
+            if candidate.model in self._unavailable:
+                continue
+            health = BackendHealth.lookup(candidate.backend_name, candidate.model)
+            if health is not None and not health.breaker.allows_request():
+                continue
+            usable.append(candidate)
+        ranked = sorted(usable, key=lambda c: (c.tier != tier, self.score(c, prompt_tokens)))
+        if variant and ranked:
+            start = variant % len(ranked)
+            ranked = ranked[start:] + ranked[:start]
+        return ranked
+
+    def _no_backend_error(self) -> RuntimeError:
+        reasons = "; ".join(f"{model}: {reason}" for model, reason in self._unavailable.items())
+        return RuntimeError(f"No LLM backend is available ({reasons or 'all circuits are open'}).")
+
+    def _should_fall_back(self, error: Exception) -> bool:
+        return isinstance(error, CircuitOpenError) or classify_error(error) != FATAL
+
+    def _cache_kwargs(self, backend: LLMBackend, use_cache: bool) -> dict:
+        """Bypasses the response cache of a cached backend for this call if `use_cache` is False."""
+        return {"use_cache": False} if not use_cache and isinstance(backend, CachedBackend) else {}
+
+    async def send_prompt(self, prompt: str, kind: str = DEFAULT_KIND, attempt: int = 0, variant: int = 0,
+                          use_cache: bool = True, **kwargs) -> str:
+        """
+        Sends a prompt to the best candidate, falling back to the next one if
+        it is unavailable or fails with a non-fatal error.
+
+        Args:
+            prompt: The prompt to send
+            kind: The kind of prompt (extraction, plan, implement, write_tests, debug, guide)
+            attempt: The debug attempt number, used to escalate long debug loops
+            variant: Index of a concurrent variant of the prompt, which starts on a different candidate
+            use_cache: Set to False to bypass the response cache for this call
+        """
+        error = None
+        call = next(_call_ids)
+        for candidate in self.rank(kind, prompt, attempt, variant):
+            backend = self._backend(candidate)
+            if backend is None:
+                continue
+            started = time.monotonic()
+            try:
+                response = await backend.send_prompt(prompt, **self._cache_kwargs(backend, use_cache), **kwargs)
+            except Exception as e:
+                telemetry.record_llm_call(candidate.model, kind, started, prompt, error=e)
+                transcript.record_llm_call(call, candidate.backend_name, candidate.model, kind, started, prompt,
+                                           error=e)
+                if not self._should_fall_back(e):
+                    raise
+                print(f"[Router] {candidate.model} failed ({type(e).__name__}); falling back.")
+                error = e
+                continue
+            telemetry.record_llm_call(candidate.model, kind, started, prompt, response or "")
+            transcript.record_llm_call(call, candidate.backend_name, candidate.model, kind, started, prompt,
+                                       response or "")
+            self.last_model = candidate.model
+            return response
+        raise error or self._no_backend_error()
+
+    async def stream_prompt(self, prompt: str, kind: str = DEFAULT_KIND, attempt: int = 0, variant: int = 0,
+                            use_cache: bool = True, **kwargs):
+        """
+        Streams a prompt from the best candidate. Falls back to the next
+        candidate only if the stream fails before its first chunk.
+        """
+        error = None
+        call = next(_call_ids)
+        for candidate in self.rank(kind, prompt, attempt, variant):
+            backend = self._backend(candidate)
+            if backend is None:
+                continue
+            received = []
+            started = time.monotonic()
+            first_chunk = None
+            failure = None
+            stream = backend.stream_prompt(prompt, **self._cache_kwargs(backend, use_cache), **kwargs)
+            try:
+                async for chunk in stream:
+                    if not received:
+                        first_chunk = time.monotonic() - started
+                        self.last_model = candidate.model
+                    received.append(chunk)
+                    yield chunk
+            except Exception as e:
+                failure = e
+                if received or not self._should_fall_back(e):
+                    raise
+                print(f"[Router] {candidate.model} failed ({type(e).__name__}); falling back.")
+                error = e
+                continue
+            finally:
+                await stream.aclose()
+                telemetry.record_llm_call(candidate.model, kind, started, prompt, "".join(received), stream=True,
+                                          error=failure, first_chunk=first_chunk)
+                transcript.record_llm_call(call, candidate.backend_name, candidate.model, kind, started, prompt,
+                                           "".join(received), stream=True, error=failure, first_chunk=first_chunk)
+            self.last_model = candidate.model
+            return
+        raise error or self._no_backend_error()
+
+def route_hints(backend: LLMBackend, kind: str, attempt: int = 0, variant: int = 0, use_cache: bool = True) -> dict:
+    """
+    Returns the keyword arguments that route a prompt of the given kind,
+    or none if the backend is not a router.
+    """
+    if not isinstance(backend, BackendRouter):
+        return {}
+    hints = {"kind": kind, "attempt": attempt}
+    if variant:
+        hints["variant"] = variant
+    if not use_cache:
+        hints["use_cache"] = False
+    return hints
@@ -0,0 +1,260 @@
+"""
+LLM Transcripts
+
+Records every LLM call of a build (its order, timing, backend, model
+and response) to a compact gzip-compressed JSON lines transcript, and
+replays a transcript through the LLMBackend interface. A replayed build
+makes no network calls, so it can be re-profiled on an air-gapped box,
+or a slow build reproduced, without paying for the tokens again.
+
+Prompts are stored as SHA-256 hashes only (with memory addresses in
+object reprs masked). A replayed call returns the next recorded response
+to the same prompt, after the recorded latency scaled by the replay speed.
+"""
+import asyncio
+import builtins
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from collections import Counter, defaultdict, deque
+from designbuilder.core import telemetry
+from .base import LLMBackend
+
+TRANSCRIPT_VERSION = 1
+
+# Object reprs in test failures (e.g. "<function f at 0x7f03...>") differ between runs
+_MEMORY_ADDRESS = re.compile(r"\bat 0x[0-9a-fA-F]+")
+
+def prompt_hash(prompt: str) -> str:
+    """Hashes a prompt, ignoring the parts that differ between otherwise identical builds."""
+    return hashlib.sha256(_MEMORY_ADDRESS.sub("at 0x", prompt).encode()).hexdigest()
+
+class TranscriptRecorder:
+    """
+    Appends each LLM call to a transcript file. One recorder is active per build.
+    """
+    _active = None
+
+    def __init__(self, path: str):
+        self.path = path
+        self.calls = 0
+        self._started = time.monotonic()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._write({"type": "transcript", "version": TRANSCRIPT_VERSION, "started_at": time.time()})
+
+    @classmethod
+    def start(cls, path: str) -> "TranscriptRecorder":
+        """Starts recording; calls made from now on are appended to the transcript at `path`."""
+        cls._active = cls(path)
+        return cls._active
+
+    @classmethod
+    def active(cls) -> "TranscriptRecorder":
+        """Returns the recorder in use, or None."""
+        return cls._active
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def record(self, call: int, backend: str, model: str, kind: str, started: float, prompt: str,
+               response: str = "", stream: bool = False, error: BaseException = None, first_chunk: float = None):
+        """
+        Appends one attempt of a call. Attempts of the same router call (e.g. a
+        failure followed by a fallback) share the `call` id and are replayed as one.
+        """
+        duration = time.monotonic() - started
+        record = {
+            "call": call, "t": round(started - self._started, 4), "duration": round(duration, 4),
+            "backend": backend, "model": model, "kind": kind, "prompt": prompt_hash(prompt),
+            "prompt_chars": len(prompt), "response": response,
+        }
+        if stream:
+            record["stream"] = True
+            if first_chunk is not None:
+                record["first_chunk"] = round(first_chunk, 4)
+        if error is not None:
+            record["error"] = {"type": type(error).__name__, "message": str(error)}
+            status = getattr(error, "status_code", None)
+            if isinstance(status, int):
+                record["error"]["status_code"] = status
+        self.calls += 1
+        self._write(record)
+
+    def finish(self):
+        """Stops recording and closes the transcript."""
+        if TranscriptRecorder._active is self:
+            TranscriptRecorder._active = None
+        self._file.close()
+        print(f"Recorded {self.calls} LLM call(s) to {self.path}.")
+
+def record_llm_call(call: int, backend: str, model: str, kind: str, started: float, prompt: str,
+                    response: str = "", stream: bool = False, error: BaseException = None, first_chunk: float = None):
+    """Records one LLM call attempt if a transcript is being recorded."""
+    recorder = TranscriptRecorder.active()
+    if recorder is not None:
+        recorder.record(call, backend, model, kind, started, prompt, response, stream, error, first_chunk)
+
+def load_transcript(path: str) -> tuple[dict, list[dict]]:
+    """Returns a transcript's header and its call records, skipping a truncated last line."""
+    header, records = {}, []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("type") == "transcript":
+                    header = record
+                else:
+                    records.append(record)
+        except EOFError:  # the recording build was killed before closing the file
+            pass
+    if header.get("version", TRANSCRIPT_VERSION) > TRANSCRIPT_VERSION:
+        raise ValueError(f"Unsupported transcript version {header['version']}: {path}")
+    return header, records
+
+def merge_transcripts(path: str, parts: list[str]) -> int:
+    """
+    Merges the calls of other transcripts (e.g. recorded by build workers)
+    into the transcript at `path`, in the order they were made, and deletes
+    the parts. Call ids are renumbered so they stay unique.
+
+    Returns:
+        The number of call attempts merged in
+    """
+    header, records = load_transcript(path)
+    started_at = header.get("started_at", time.time())
+    next_call = max((record["call"] for record in records), default=0) + 1
+    merged = 0
+    for part in parts:
+        part_header, part_records = load_transcript(part)
+        offset = part_header.get("started_at", started_at) - started_at
+        calls = {}
+        for record in part_records:
+            if record["call"] not in calls:
+                calls[record["call"]] = next_call
+                next_call += 1
+            records.append(dict(record, call=calls[record["call"]], t=round(record["t"] + offset, 4)))
+        merged += len(part_records)
+    records.sort(key=lambda record: record["t"])
+    temp_path = path + ".tmp"
+    with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+        for record in [header, *records]:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    os.replace(temp_path, path)
+    for part in parts:
+        os.remove(part)
+    return merged
+
+class TranscriptMissError(RuntimeError):
+    """Raised when a replayed build sends a prompt the transcript has no response for."""
+
+class ReplayedError(RuntimeError):
+    """Base class of replayed errors whose original type is not a built-in exception."""
+
+_replayed_error_types = {}
+
+def _replayed_error(error: dict) -> Exception:
+    """Rebuilds a recorded error with its original type name, so it is classified like the original."""
+    name, message = error.get("type", "Exception"), error.get("message", "")
+    builtin = getattr(builtins, name, None)
+    if isinstance(builtin, type) and issubclass(builtin, Exception):
+        exception = builtin(message)
+    else:
+        if name not in _replayed_error_types:
+            _replayed_error_types[name] = type(name, (ReplayedError,), {})
+        exception = _replayed_error_types[name](message)
+    if "status_code" in error:
+        exception.status_code = error["status_code"]
+    return exception
+
+class ReplayBackend(LLMBackend):
+    """
+    An LLM backend that answers from a recorded transcript.
+
+    Calls are matched to recordings by prompt: the n-th call with a given
+    prompt gets the n-th recorded response to it (and the last one after
+    that). Router fallbacks and errors are replayed as they happened.
+    """
+    default_path = None     # set by `designbuilder build --replay`
+    default_speed = 1.0     # set by `designbuilder build --replay-speed`
+    _default = None
+
+    def __init__(self, path: str, speed: float = 1.0):
+        """
+        Args:
+            path: The transcript to replay
+            speed: Playback speed; 1 waits the recorded latency, 10 a tenth of it, 0 not at all
+        """
+        if speed < 0:
+            raise ValueError("The replay speed cannot be negative.")
+        self.path = path
+        self.speed = speed
+        self.header, records = load_transcript(path)
+        calls = defaultdict(list)
+        for record in records:
+            calls[record["call"]].append(record)
+        self._calls = defaultdict(deque)   # prompt hash -> attempts of each recorded call, in order
+        self._last = {}
+        for call in sorted(calls.values(), key=lambda attempts: attempts[0]["t"]):
+            self._calls[call[0]["prompt"]].append(call)
+        models = Counter(record["model"] for record in records if "error" not in record)
+        self._default_model = models.most_common(1)[0][0] if models else "replay"
+        self.last_model = None
+        self.replayed = 0
+        self.misses = 0
+
+    @classmethod
+    def default(cls) -> "ReplayBackend":
+        """Returns the replay backend shared by every agent of the build."""
+        if cls._default is None or cls._default.path != cls.default_path:
+            cls._default = cls(cls.default_path, cls.default_speed)
+        return cls._default
+
+    @property
+    def model_name(self) -> str:
+        """The model of the last replayed call or, before any call, the most used recorded model."""
+        return self.last_model or self._default_model
+
+    @property
+    def generation_params(self) -> dict:
+        return {"replay": os.path.basename(self.path)}
+
+    def _next_call(self, prompt: str) -> list[dict]:
+        key = prompt_hash(prompt)
+        queue = self._calls.get(key)
+        if queue:
+            self._last[key] = queue.popleft()
+        if key not in self._last:
+            self.misses += 1
+            raise TranscriptMissError(f"{self.path} has no response for this prompt (sha256 {key[:12]}, "
+                                      f"{len(prompt)} characters); it was not sent in the recorded build.")
+        return self._last[key]
+
+    async def _replay(self, prompt: str) -> str:
+        attempts = self._next_call(prompt)
+        last = attempts[-1]
+        started = time.monotonic()
+        if self.speed:
+            elapsed = last["t"] + last["duration"] - attempts[0]["t"]
+            await asyncio.sleep(elapsed / self.speed)
+        self.replayed += 1
+        if "error" in last:
+            error = _replayed_error(last["error"])
+            telemetry.record_llm_call(last["model"], last["kind"], started, prompt, error=error, replayed=True)
+            raise error
+        self.last_model = last["model"]
+        telemetry.record_llm_call(last["model"], last["kind"], started, prompt, last["response"],
+                                  stream=last.get("stream", False), replayed=True)
+        return last["response"]
+
+    async def send_prompt(self, prompt: str, **kwargs) -> str:
+        return await self._replay(prompt)
+
+    async def stream_prompt(self, prompt: str, **kwargs):
+        yield await self._replay(prompt)
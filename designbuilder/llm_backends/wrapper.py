@@ -0,0 +1,38 @@
+"""
+LLM Backend Wrapper
+
+Base class for backends that add behaviour (caching, rate limiting, ...)
+around another backend while presenting the wrapped backend's identity.
+"""
+from .base import LLMBackend
+
+class BackendWrapper(LLMBackend):
+    """
+    An LLM backend that delegates to another backend.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+
+    @property
+    def backend_name(self) -> str:
+        """The class name of the innermost backend."""
+        return getattr(self.backend, "backend_name", self.backend.__class__.__name__)
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.backend, "model_name", None) or str(getattr(self.backend, "model", "unknown"))
+
+    @property
+    def generation_params(self) -> dict:
+        return getattr(self.backend, "generation_params", {})
+
+    async def send_prompt(self, prompt: str, **kwargs) -> str:
+        return await self.backend.send_prompt(prompt, **kwargs)
+
+    async def stream_prompt(self, prompt: str, **kwargs):
+        stream = self.backend.stream_prompt(prompt, **kwargs)
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
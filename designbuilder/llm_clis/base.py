@@ -13,3 +13,13 @@ class LLMBackend(ABC):
     async def send_prompt(self, prompt: str) -> str:
         """Send a prompt to the LLM."""
         pass
+
+    async def stream_prompt(self, prompt: str):
+        """
+        Stream the response to a prompt as text chunks.
+
+        The consumer may stop iterating early (e.g. once a code block is
+        complete); backends should then abandon the rest of the generation.
+        Backends without native streaming yield the full response as one chunk.
+        """
+        yield await self.send_prompt(prompt)
@@ -12,7 +12,7 @@ class GeminiCliBackend(LLMBackend):
     An implementation that calls the 'gemini' CLI tool as a subprocess.
     """
     def __init__(self):
-        pass 
+        self.model_name = "gemini-cli"
 
     async def _run_gemini_cli(self, prompt: str) -> str:
         """Helper function to run the gemini CLI tool."""
@@ -42,3 +42,30 @@ class GeminiCliBackend(LLMBackend):
     async def send_prompt(self, prompt: str) -> str:
         print(f"Sending prompt to Gemini CLI (auto-selected model): {prompt[:50]}...")
         return await self._run_gemini_cli(prompt)
+
+    async def stream_prompt(self, prompt: str):
+        """Streams the gemini CLI's stdout, killing the CLI if the consumer stops early."""
+        print(f"Streaming prompt to Gemini CLI (auto-selected model): {prompt[:50]}...")
+        process = await asyncio.create_subprocess_exec(
+            "gemini",
+            "-p", prompt,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            while True:
+                chunk = await process.stdout.read(4096)
+                if not chunk:
+                    break
+                yield chunk.decode(errors="replace")
+            stderr = await process.stderr.read()
+            await process.wait()
+            if process.returncode != 0:
+                error_message = stderr.decode()
+                # The CLI falls back to another model on quota errors and still prints its output
+                if not ("Quota exceeded" in error_message and "You will be switched to" in error_message):
+                    raise RuntimeError(f"Gemini CLI failed: {error_message}")
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
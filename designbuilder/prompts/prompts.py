@@ -2,6 +2,29 @@ class Prompts:
     """
     Prompts for the DesignBuilder project.
     """
+    # Bump when prompt wording changes so cached plans and components are rebuilt.
+    VERSION = "v0"
+
+    # How code-editing prompts ask for changes instead of a whole file
+    EDIT_FORMAT = """Return only your changes, as SEARCH/REPLACE blocks inside a single fenced code block:
+
+    ```
+    <<<<<<< SEARCH
+    exact lines of the current code to replace
+    =======
+    the new lines
+    >>>>>>> REPLACE
+    ```
+
+    Each SEARCH section must copy the current code exactly (without line numbers) and match only one place; include enough surrounding lines to make it unique.
+    Use one block per change and put new imports in their own block. Do not repeat code you leave unchanged."""
+
+    # Steer concurrent (speculative) debug candidates towards different root causes
+    SPECULATIVE_HINTS = [
+        "Before settling on the most obvious cause, check whether the tests exercise an edge case (empty input, boundaries, None, ordering) that the implementation mishandles.",
+        "Check whether the implementation misreads the interface the tests expect: names, argument order, return types or the exceptions raised.",
+        "Check state and side effects: mutable defaults, state that is not reset between calls, or objects that are modified in place.",
+    ]
 
     @staticmethod
     def get_design_doc_extraction_prompt(full_text: str) -> str:
@@ -125,6 +148,57 @@ class Prompts:
     Return only the corrected Python code with no markdown, comments, or explanations.
     """
 
+    @staticmethod
+    def get_focused_debug_prompt(failure_context: str) -> str:
+        return f"""A Python implementation failed its tests. Below are the failing tests, their assertion diffs and trimmed tracebacks, the relevant regions of the implementation (with line numbers) and an outline of the module:
+
+    {failure_context}
+
+    Perform a root cause analysis to identify why the failures occurred.
+    Use a scientific method mindset: hypothesize, reason through likely causes, and apply only necessary fixes.
+
+    Return only the complete corrected definitions (functions, methods or classes) that you change, in a single Python code block, without line numbers.
+    Add any new imports at the top of the block. Do not repeat definitions you leave unchanged.
+    """
+
+    @staticmethod
+    def get_speculative_hint(variant: int) -> str:
+        """Returns the extra instruction for the given speculative debug candidate (none for the first)."""
+        if not variant:
+            return ""
+        hint = Prompts.SPECULATIVE_HINTS[(variant - 1) % len(Prompts.SPECULATIVE_HINTS)]
+        return f"""
+
+    This is candidate fix {variant + 1} of several tried in parallel. {hint}
+    """
+
+    @staticmethod
+    def get_patch_debug_prompt(failure_context: str) -> str:
+        return f"""A Python implementation failed its tests. Below are the failing tests, their assertion diffs and trimmed tracebacks, and the implementation code they point at (with line numbers):
+
+    {failure_context}
+
+    Perform a root cause analysis to identify why the failures occurred.
+    Use a scientific method mindset: hypothesize, reason through likely causes, and apply only necessary fixes.
+
+    {Prompts.EDIT_FORMAT}
+    """
+
+    @staticmethod
+    def get_patch_guide_prompt(guidance: str, implementation: str) -> str:
+        return f"""The user has provided the following guidance:
+
+    {guidance}
+
+    The current code is:
+
+    {implementation}
+
+    Please incorporate this guidance into the code.
+
+    {Prompts.EDIT_FORMAT}
+    """
+
     @staticmethod
     def get_guide_prompt(guidance: str, implementation: str) -> str:
         return f"""The user has provided the following guidance:
@@ -0,0 +1,61 @@
+"""
+Tests for the plan Cache Manager
+"""
+import json
+import os
+import pytest
+from designbuilder.core import cache_manager
+from designbuilder.core.cache_manager import CacheManager
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_manager, "CACHE_DB_FILE", os.path.join(tmp_path, "plan_cache.db"))
+    monkeypatch.setattr(cache_manager, "CACHE_FILE", os.path.join(tmp_path, "plan_cache.json"))
+    monkeypatch.setattr(CacheManager, "_conn", None)
+    yield tmp_path
+    if CacheManager._conn is not None:
+        CacheManager._conn.close()
+
+def test_put_and_get_plan():
+    plan = [{"name": "Logger", "plan": {"complexity": "Low"}}]
+    CacheManager.put_plan("abc", plan, "gemini-2.5-flash", "v0")
+
+    entry = CacheManager.get_plan("abc")
+    assert entry["plan"] == plan
+    assert entry["model"] == "gemini-2.5-flash"
+    assert CacheManager.get_plan("missing") is None
+
+def test_legacy_json_cache_is_migrated(isolated_cache):
+    legacy = {"abc": {"plan": [{"name": "Router"}], "timestamp": 1.0, "model": "m", "prompt_version": "v0"}}
+    with open(os.path.join(isolated_cache, "plan_cache.json"), "w") as f:
+        json.dump(legacy, f)
+
+    assert CacheManager.get_plan("abc")["plan"] == [{"name": "Router"}]
+
+def test_prune_by_model_and_age():
+    CacheManager.put_plan("a", [], "old-model", "v0")
+    CacheManager.put_plan("b", [], "new-model", "v0")
+
+    assert CacheManager.prune(model="old-model") == 1
+    assert CacheManager.prune(max_age_seconds=3600) == 0
+    assert CacheManager.stats()["by_model"] == {"new-model": 1}
+
+    with pytest.raises(ValueError):
+        CacheManager.prune()
+
+def test_component_fingerprint_ignores_regenerated_plans():
+    source = {"document": "spec.md", "section": "Logger", "section_hash": "1111"}
+    component = {"name": "Logger", "description": "Logs", "plan": {"steps": ["a"]}, "source": source}
+    fingerprint = CacheManager._hash_component(component, "m", "v0")
+
+    # Replanning after an edit elsewhere in the design rewrites the plan and description
+    replanned = dict(component, description="Writes logs", plan={"steps": ["b"]})
+    assert CacheManager._hash_component(replanned, "m", "v0") == fingerprint
+
+    edited = dict(component, source=dict(source, section_hash="2222"))
+    assert CacheManager._hash_component(edited, "m", "v0") != fingerprint
+
+    # Without a source section, the plan is all there is to go on
+    given = {"name": "Logger", "description": "Logs", "plan": {"steps": ["a"]}}
+    assert CacheManager._hash_component(given, "m", "v0") != CacheManager._hash_component(
+        dict(given, plan={"steps": ["b"]}), "m", "v0")
@@ -0,0 +1,18 @@
+"""
+Tests that the CLI loads heavy modules only for the commands that need them
+"""
+from designbuilder.benchmarks.import_bench import COMMANDS, heavy_modules, loaded_modules
+
+def test_cli_import_is_light():
+    assert heavy_modules(loaded_modules("import designbuilder.cli")) == []
+
+def test_agent_logs_is_light():
+    args, allowed = COMMANDS["agent-logs"]
+    statement = ("from typer.testing import CliRunner\nfrom designbuilder.cli import app\n"
+                 f"assert CliRunner().invoke(app, {args!r}).exit_code == 1")
+    assert heavy_modules(loaded_modules(statement), allowed) == []
+
+def test_orchestrator_does_not_load_sdks_or_document_parsers():
+    loaded = heavy_modules(loaded_modules("import designbuilder.core.orchestrator"))
+    assert "designbuilder.core.orchestrator" in loaded
+    assert not {"pypdf", "docx", "openai", "google.generativeai"} & set(loaded)
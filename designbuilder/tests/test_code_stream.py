@@ -0,0 +1,84 @@
+"""
+Tests for streamed code extraction
+"""
+import os
+import pytest
+from designbuilder.llm_backends.cached import CachedBackend, LLMResponseCache
+from designbuilder.llm_backends.code_stream import FencedCodeStream
+
+class StreamingBackend:
+    model_name = "stream-model"
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.sent = 0
+
+    async def send_prompt(self, prompt: str) -> str:
+        return "".join(self.chunks)
+
+    async def stream_prompt(self, prompt: str):
+        for chunk in self.chunks:
+            self.sent += 1
+            yield chunk
+
+async def _consume(backend, prompt):
+    received = FencedCodeStream()
+    stream = backend.stream_prompt(prompt)
+    try:
+        async for chunk in stream:
+            if received.feed(chunk):
+                break
+    finally:
+        await stream.aclose()
+    return received
+
+def test_block_completes_when_closing_fence_arrives_across_chunks():
+    received = FencedCodeStream()
+    for chunk in ["Here you go:\n``", "`python\ndef add(a, b):\n", "    return a + b\n`", "``"]:
+        done = received.feed(chunk)
+
+    assert done
+    assert received.code() == "def add(a, b):\n    return a + b"
+
+def test_blocks_in_other_languages_are_skipped():
+    received = FencedCodeStream()
+    for chunk in ["Install it first:\n```bash\npip install requests\n```\n", "Then:\n```python\nimport requests\n",
+                  "```\n"]:
+        done = received.feed(chunk)
+        if "bash" in chunk:
+            assert not done
+
+    assert done
+    assert received.code() == "import requests"
+
+def test_unfenced_response_never_completes():
+    received = FencedCodeStream()
+    received.feed("def add(a, b):\n    return a + b\n")
+
+    assert not received.complete
+    assert received.code() is None
+
+@pytest.mark.asyncio
+async def test_stream_stops_early_and_partial_code_is_cached(tmp_path):
+    chunks = ["```python\nx = 1\n", "```\n", "Explanation that is never generated", "..."]
+    backend = StreamingBackend(chunks)
+    cached = CachedBackend(backend, LLMResponseCache(path=os.path.join(tmp_path, "llm_cache.db")))
+
+    received = await _consume(cached, "prompt")
+    assert received.code() == "x = 1"
+    assert backend.sent == 2
+
+    replay = await _consume(cached, "prompt")
+    assert replay.code() == "x = 1"
+    assert backend.sent == 2
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_without_code_is_not_cached(tmp_path):
+    backend = StreamingBackend(["```python\nx = ", "1\n", "```"])
+    cache = LLMResponseCache(path=os.path.join(tmp_path, "llm_cache.db"))
+    stream = CachedBackend(backend, cache).stream_prompt("prompt")
+
+    await stream.__anext__()
+    await stream.aclose()
+
+    assert cache.stats()["entries"] == 0
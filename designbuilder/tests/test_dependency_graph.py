@@ -0,0 +1,55 @@
+"""
+Tests for the component Dependency Graph
+"""
+import pytest
+from designbuilder.core.dependency_graph import DependencyGraph
+
+def _component(name, dependencies=(), complexity="Medium"):
+    return {"name": name, "plan": {"dependencies": list(dependencies), "complexity": complexity}}
+
+def test_waves_follow_plan_dependencies():
+    graph = DependencyGraph([
+        _component("HTTP Server", ["Router (dispatches requests)", "Logger", "socket module"]),
+        _component("Router", ["Request Handler"]),
+        _component("Request Handler", ["Logger"]),
+        _component("Logger"),
+    ])
+
+    assert graph.waves() == [["Logger"], ["Request Handler"], ["Router"], ["HTTP Server"]]
+    assert graph.dependencies["HTTP Server"] == {"Router", "Logger"}
+
+def test_resolve_prefers_longest_component_name():
+    graph = DependencyGraph([
+        _component("Handler"),
+        _component("Request Handler"),
+        _component("Router", ["Request Handler"]),
+    ])
+
+    assert graph.dependencies["Router"] == {"Request Handler"}
+
+def test_cycles_are_detected_and_broken():
+    graph = DependencyGraph([
+        _component("A", ["B"]),
+        _component("B", ["A"]),
+        _component("C", ["A"]),
+    ])
+
+    assert graph.find_cycle() is not None
+    with pytest.raises(ValueError):
+        graph.waves()
+
+    removed = graph.break_cycles()
+    assert len(removed) == 1
+    assert graph.find_cycle() is None
+    assert sum(len(wave) for wave in graph.waves()) == 3
+
+def test_critical_path_weights_complexity():
+    graph = DependencyGraph([
+        _component("Core", complexity="High"),
+        _component("Api", ["Core"], complexity="Low"),
+        _component("Cli", complexity="Low"),
+    ])
+
+    lengths = graph.critical_path_lengths()
+    assert lengths == {"Core": 4, "Api": 1, "Cli": 1}
+    assert graph.descendants("Core") == {"Api"}
@@ -0,0 +1,109 @@
+"""
+Tests for structured failure context and definition merging
+"""
+import subprocess
+import sys
+import pytest
+from designbuilder.coding_agents.failure_context import (
+    build_failure_context, is_full_replacement, merge_definitions, parse_junit_xml,
+)
+from designbuilder.llm_backends.rate_limiter import estimate_tokens
+
+IMPLEMENTATION = '''"""Inventory."""
+import math
+
+class Inventory:
+    def __init__(self):
+        self.items = {}
+
+    def add(self, name, count):
+        self.items[name] = self.items.get(name, 0) - count
+
+    def total(self):
+        return sum(self.items.values())
+
+    def report(self):
+        return "\\n".join(f"{name}: {count}" for name, count in sorted(self.items.items()))
+
+def unrelated_helper(value):
+    return math.floor(value) * 2
+'''
+
+TESTS = '''from inventory import Inventory
+
+def test_add():
+    inventory = Inventory()
+    inventory.add("apples", 3)
+    assert inventory.items == {"apples": 3}
+
+def test_total():
+    inventory = Inventory()
+    inventory.add("apples", 2)
+    assert inventory.total() == 2
+
+def test_empty_total():
+    assert Inventory().total() == 0
+'''
+
+@pytest.fixture
+def failing_run(tmp_path):
+    implementation_path = tmp_path / "inventory.py"
+    implementation_path.write_text(IMPLEMENTATION)
+    (tmp_path / "test_inventory.py").write_text(TESTS)
+    report = tmp_path / "report.xml"
+    subprocess.run([sys.executable, "-m", "pytest", "test_inventory.py", "-p", "no:cacheprovider",
+                    f"--junitxml={report}"], cwd=tmp_path, capture_output=True)
+    return str(implementation_path), parse_junit_xml(str(report))
+
+def test_junit_report_is_parsed(failing_run):
+    _, (passed, failed, failures) = failing_run
+
+    assert (passed, failed) == (1, 2)
+    assert [f["nodeid"].split("::")[-1] for f in failures] == ["test_add", "test_total"]
+    assert "assert" in failures[0]["message"]
+
+def test_context_holds_failures_and_only_relevant_code(failing_run):
+    implementation_path, (_, _, failures) = failing_run
+
+    context = build_failure_context(failures, IMPLEMENTATION, implementation_path)
+
+    assert "FAILED test_add" in context and "FAILED test_total" in context
+    assert "self.items[name] = self.items.get(name, 0) - count" in context
+    assert "Module outline:" in context
+    assert "math.floor(value)" not in context  # unrelated code is left out
+    assert "def test_empty_total" not in context
+
+def test_context_respects_token_budget(failing_run):
+    implementation_path, (_, _, failures) = failing_run
+
+    context = build_failure_context(failures, IMPLEMENTATION, implementation_path, token_budget=60)
+
+    assert estimate_tokens(context) <= 60
+    assert "FAILED test_add" in context
+
+def test_method_is_merged_into_its_class():
+    fixed = "def add(self, name, count):\n    self.items[name] = self.items.get(name, 0) + count\n"
+
+    merged = merge_definitions(IMPLEMENTATION, fixed)
+
+    assert "self.items.get(name, 0) + count" in merged
+    assert "    def add(self, name, count):" in merged
+    assert merged.count("def total") == 1 and "unrelated_helper" in merged
+
+def test_partial_class_merges_methods_and_adds_imports():
+    fixed = (
+        "import collections\n\n"
+        "class Inventory:\n"
+        "    def total(self):\n        return sum(self.items.values()) or 0\n\n"
+        "    def clear(self):\n        self.items.clear()\n"
+    )
+
+    merged = merge_definitions(IMPLEMENTATION, fixed)
+
+    assert merged.startswith('"""Inventory."""\nimport collections\n')
+    assert "def report" in merged and "def clear(self):" in merged
+    assert "return sum(self.items.values()) or 0" in merged
+
+def test_whole_file_is_recognized():
+    assert is_full_replacement(IMPLEMENTATION, IMPLEMENTATION)
+    assert not is_full_replacement(IMPLEMENTATION, "def add(self, name, count):\n    pass\n")
@@ -0,0 +1,60 @@
+"""
+Tests for the fake LLM backend
+"""
+import random
+import pytest
+from designbuilder.coding_agents.patching import apply_edits
+from designbuilder.llm_backends.fake import BUGGY_IMPLEMENTATION, IMPLEMENTATION, FakeBackend, parse_latency
+from designbuilder.llm_backends.rate_limiter import is_rate_limit_error
+from designbuilder.llm_backends.resilient import TRANSIENT, classify_error
+from designbuilder.prompts.prompts import Prompts
+
+def test_parse_latency():
+    rng = random.Random(0)
+    assert parse_latency(0.25)(rng) == 0.25
+    assert parse_latency("fixed:0.5")(rng) == 0.5
+    assert all(0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2 for _ in range(100))
+    assert parse_latency("lognormal:0.3,0.5")(rng) > 0
+    assert parse_latency("exponential:0.1")(rng) >= 0
+    with pytest.raises(ValueError):
+        parse_latency("gaussian:1")
+
+@pytest.mark.asyncio
+async def test_responses_are_deterministic_per_prompt():
+    prompts = [Prompts.get_implement_prompt(f"plan {i}") for i in range(20)]
+    first, second = FakeBackend(bug_rate=0.5, seed=7), FakeBackend(bug_rate=0.5, seed=7)
+    responses = [await first.send_prompt(prompt) for prompt in prompts]
+    # The same answers regardless of the order the prompts arrive in
+    reversed_responses = [await second.send_prompt(prompt) for prompt in reversed(prompts)]
+    assert responses == list(reversed(reversed_responses))
+    assert any(BUGGY_IMPLEMENTATION in response for response in responses)
+    assert any(IMPLEMENTATION in response for response in responses)
+
+@pytest.mark.asyncio
+async def test_injected_failures_are_classified_like_provider_errors():
+    backend = FakeBackend(failure_rate=0.3, rate_limit_rate=0.3, seed=1)
+    errors = []
+    for i in range(100):
+        try:
+            await backend.send_prompt(f"prompt {i}")
+        except Exception as e:
+            errors.append(e)
+    assert backend.failures == len(errors) > 0
+    assert any(is_rate_limit_error(e) for e in errors)
+    assert any(classify_error(e) == TRANSIENT for e in errors)
+
+@pytest.mark.asyncio
+async def test_debug_edits_fix_the_injected_bug():
+    backend = FakeBackend()
+    response = await backend.send_prompt(Prompts.get_patch_debug_prompt("test_checksum failed"))
+    code, changed = apply_edits(BUGGY_IMPLEMENTATION, response)
+    assert code.strip() == IMPLEMENTATION.strip()
+    assert changed == 1
+
+@pytest.mark.asyncio
+async def test_stream_prompt_yields_the_whole_response():
+    backend = FakeBackend(chunk_chars=16)
+    prompt = Prompts.get_write_tests_prompt(IMPLEMENTATION, "Checksum")
+    chunks = [chunk async for chunk in backend.stream_prompt(prompt)]
+    assert len(chunks) > 1
+    assert "".join(chunks) == await backend.send_prompt(prompt)
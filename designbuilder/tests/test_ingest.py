@@ -0,0 +1,60 @@
+"""
+Tests for parallel document ingestion and the extracted-text cache
+"""
+import os
+import shutil
+import docx
+import pytest
+from designbuilder.core.ingest import TextCache, _page_ranges, read_documents
+
+@pytest.fixture
+def cache(tmp_path):
+    return TextCache(path=os.path.join(tmp_path, "text_cache.db"))
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return str(path)
+
+@pytest.mark.asyncio
+async def test_documents_are_read_in_order_and_cached(tmp_path, cache):
+    first = write(tmp_path / "a.md", "# A\nfirst")
+    second = str(tmp_path / "b.docx")
+    document = docx.Document()
+    document.add_paragraph("Component B")
+    document.add_paragraph("does things")
+    document.save(second)
+
+    texts = await read_documents([first, second], cache)
+    assert texts == ["# A\nfirst", "Component B\ndoes things\n"]
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    assert await read_documents([first, second], cache) == texts
+    assert (cache.hits, cache.misses) == (2, 2)
+
+@pytest.mark.asyncio
+async def test_changed_document_is_re_extracted(tmp_path, cache):
+    path = write(tmp_path / "a.md", "before")
+    await read_documents([path], cache)
+
+    write(path, "after, and longer")
+    assert await read_documents([path], cache) == ["after, and longer"]
+    assert cache.misses == 2
+
+@pytest.mark.asyncio
+async def test_copied_document_is_found_by_content_hash(tmp_path, cache):
+    original = write(tmp_path / "a.md", "same content")
+    await read_documents([original], cache)
+
+    copy = str(tmp_path / "copy.md")
+    shutil.copy(original, copy)
+    assert await read_documents([copy], cache) == ["same content"]
+    assert cache.hits == 1
+
+@pytest.mark.asyncio
+async def test_missing_document_yields_empty_text(tmp_path, cache):
+    assert await read_documents([str(tmp_path / "missing.md")], cache) == [""]
+
+def test_pdf_pages_are_split_into_ranges():
+    assert _page_ranges(45, 20) == [(0, 20), (20, 40), (40, 45)]
+    assert _page_ranges(0, 20) == []
@@ -0,0 +1,97 @@
+"""
+Tests for the Job Queue and build workers
+"""
+import asyncio
+import os
+import time
+import pytest
+from designbuilder.core.job_queue import CANCELLED, DONE, FAILED, MAX_ATTEMPTS, PENDING, RUNNING, JobQueue
+
+@pytest.fixture
+def queue(tmp_path):
+    job_queue = JobQueue(os.path.join(tmp_path, "jobs.db"))
+    yield job_queue
+    job_queue.close()
+
+def test_jobs_are_claimed_by_priority_and_reported_back(queue):
+    low = queue.enqueue("build-1", "agent-1", {"name": "Low"}, {"use_llm_cache": False}, priority=5)
+    high = queue.enqueue("build-1", "agent-2", {"name": "High"}, priority=-3)
+
+    job = queue.claim("worker-a")
+    assert (job.id, job.component, job.status, job.attempts) == (high, {"name": "High"}, RUNNING, 1)
+    assert queue.claim("worker-b").options == {"use_llm_cache": False}
+    assert queue.claim("worker-c") is None
+
+    version, jobs = queue.changes_since("build-1", 0)
+    queue.report(high, "worker-a", {"status": "testing"})
+    queue.report_many("worker-a", {high: {"debug_attempts": 1}, low: {"status": "testing"}})  # low is worker-b's
+    assert not queue.finish(high, "worker-b", {"status": "completed"})  # not its job
+    assert queue.finish(high, "worker-a", {"status": "completed"})
+
+    _, jobs = queue.changes_since("build-1", version)
+    assert [(j.id, j.status, j.progress, j.result) for j in jobs] == [
+        (high, DONE, {"status": "testing", "debug_attempts": 1}, {"status": "completed"})
+    ]
+    assert queue.changes_since("build-2", 0)[1] == []
+    assert low != high
+
+def test_expired_leases_are_reclaimed_then_failed(queue):
+    job_id = queue.enqueue("build-1", "agent-1", {"name": "Flaky"})
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        job = queue.claim(f"worker-{attempt}", lease_seconds=0.01)
+        assert (job.id, job.attempts) == (job_id, attempt)
+        time.sleep(0.02)
+
+    assert queue.claim("worker-last") is None
+    job = queue.get(job_id)
+    assert job.status == FAILED and "Lost its worker" in job.result["error"]
+
+def test_cancelled_and_released_jobs(queue):
+    first = queue.enqueue("build-1", "agent-1", {"name": "A"})
+    second = queue.enqueue("build-1", "agent-2", {"name": "B"})
+    queue.claim("worker-a")
+    queue.claim("worker-a")
+
+    assert queue.release(second, "worker-a")
+    assert queue.get(second).status == PENDING and queue.get(second).attempts == 0
+    assert queue.renew([first], "worker-a") == []
+    assert queue.cancel("build-1") == 2
+    assert queue.renew([first], "worker-a") == [first]
+    assert queue.get(first).status == CANCELLED
+
+@pytest.mark.asyncio
+async def test_workers_build_a_queued_design_in_dependency_order(tmp_path):
+    from designbuilder.benchmarks.orchestrator_bench import synthetic_components
+    from designbuilder.core.orchestrator import Orchestrator
+    from designbuilder.core.status_manager import StatusManager
+    from designbuilder.core.worker import Worker
+    from designbuilder.llm_backends.fake import FakeBackend, fake_router
+
+    job_queue = JobQueue(str(tmp_path / "jobs.db"))
+    status_manager = StatusManager(path=str(tmp_path / "status.db"))
+    orchestrator = Orchestrator(
+        [], use_llm_cache=False, force=True, components=synthetic_components(6),
+        llm_backend=fake_router(FakeBackend()), status_manager=status_manager,
+        output_dir=str(tmp_path / "output"), log_dir=str(tmp_path / "logs"), run_dir=str(tmp_path / "runs"),
+        job_queue=job_queue,
+    )
+    workers = [Worker(JobQueue(job_queue.path), max_agents=2, max_tests=1, worker_id=f"worker-{i}",
+                      llm_backend=fake_router(FakeBackend(seed=i)), poll_interval=0.1) for i in range(2)]
+    worker_tasks = [asyncio.create_task(worker.run()) for worker in workers]
+    try:
+        await asyncio.wait_for(orchestrator.run(), timeout=60)
+    finally:
+        for task in worker_tasks:
+            task.cancel()
+        await asyncio.gather(*worker_tasks, return_exceptions=True)
+
+    assert all(agent.status == "completed" for agent in orchestrator.agents)
+    assert sum(worker.completed for worker in workers) == 6
+    agents = {agent.component['name']: agent for agent in orchestrator.agents}
+    for agent in orchestrator.agents:
+        for dependency in agent.component['plan']['dependencies']:
+            assert agents[dependency].finished_at <= agent.started_at
+    _, jobs = job_queue.changes_since(orchestrator.build_id, 0)
+    assert {job.status for job in jobs} == {DONE} and {job.worker for job in jobs} <= {"worker-0", "worker-1"}
+    assert all(record["status"] == "completed" for record in status_manager.get_all_status().values())
+    assert (tmp_path / "output" / "classes" / "component_6.py").exists()
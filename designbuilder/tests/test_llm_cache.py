@@ -0,0 +1,63 @@
+"""
+Tests for the cached LLM backend
+"""
+import os
+import time
+import pytest
+from designbuilder.llm_backends.cached import CachedBackend, LLMResponseCache
+
+class CountingBackend:
+    def __init__(self, model_name="test-model"):
+        self.model_name = model_name
+        self.calls = 0
+
+    async def send_prompt(self, prompt: str) -> str:
+        self.calls += 1
+        return f"response {self.calls} to {prompt}"
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(path=os.path.join(tmp_path, "llm_cache.db"))
+
+@pytest.mark.asyncio
+async def test_repeated_prompt_is_served_from_cache(cache):
+    backend = CountingBackend()
+    cached = CachedBackend(backend, cache)
+
+    first = await cached.send_prompt("implement foo")
+    second = await cached.send_prompt("implement foo")
+
+    assert first == second
+    assert backend.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_bypass_and_model_are_part_of_the_key(cache):
+    backend = CountingBackend()
+    cached = CachedBackend(backend, cache)
+    await cached.send_prompt("implement foo")
+
+    await cached.send_prompt("implement foo", use_cache=False)
+    assert backend.calls == 2
+
+    other_model = CachedBackend(CountingBackend(model_name="other-model"), cache)
+    assert other_model.cache_key("implement foo") != cached.cache_key("implement foo")
+
+def test_expired_entries_are_misses(cache):
+    cache.ttl_seconds = 0.01
+    cache.put("key", "value")
+    time.sleep(0.02)
+
+    assert cache.get("key") is None
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.max_bytes = 10
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") == "aaaa"  # a is now more recent than b
+
+    cache.put("c", "cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa"
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,85 @@
+"""
+Tests for the Log Index, reverse tail and follow mode
+"""
+import os
+import threading
+import time
+import pytest
+from designbuilder.core.file_watch import FileWatcher
+from designbuilder.core.log_index import LogIndex, follow, log_prefix, tail
+
+def test_tail_reads_the_last_lines_across_blocks(tmp_path):
+    log_file = os.path.join(tmp_path, "agent.log")
+    with open(log_file, "w") as f:
+        f.write("".join(f"line {i}\n" for i in range(10000)))
+
+    assert tail(log_file, 3, block_size=16) == ["line 9997", "line 9998", "line 9999"]
+    assert tail(log_file, 0) == []
+
+    with open(log_file, "a") as f:
+        f.write("partial")
+    assert tail(log_file, 2, block_size=7) == ["line 9999", "partial"]
+
+    with open(log_file, "w") as f:
+        f.write("only\n")
+    assert tail(log_file, 5) == ["only"]
+
+def test_logs_are_found_by_agent_name_and_component(tmp_path):
+    index = LogIndex(str(tmp_path))
+    old = os.path.join(tmp_path, "Shape_Area_20240101-000000.log")
+    new = os.path.join(tmp_path, "Shape_Area_20240102-000000.log")
+    for path in (old, new):
+        open(path, "w").close()
+    index.add(old, "agent-1", "Shape Area")
+    index.add(new, "agent-2", "Shape Area")
+
+    assert log_prefix("Shape Area!") == "Shape_Area"
+    assert index.find("agent-1") == [old]
+    assert index.find("Shape Area") == [new, old]
+    assert index.find("Shape_Area", limit=1) == [new]
+    assert index.find("agent-3") == []
+
+def test_unindexed_logs_are_found_on_a_miss(tmp_path):
+    legacy = os.path.join(tmp_path, "Legacy_Component_20230101-120000.log")
+    open(legacy, "w").close()
+    index = LogIndex(str(tmp_path))
+
+    assert index.find("Legacy Component") == [legacy]
+    assert index.names() == ["Legacy_Component"]
+
+def _append_later(path: str, lines: list, rotate_after: int = None):
+    def write():
+        for i, line in enumerate(lines):
+            time.sleep(0.05)
+            if i == rotate_after:
+                os.remove(path)  # what the LogWriter does after compressing a full log
+            with open(path, "a") as f:
+                f.write(line + "\n")
+    thread = threading.Thread(target=write)
+    thread.start()
+    return thread
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_follow_streams_new_lines_across_rotation(tmp_path, use_inotify):
+    log_file = os.path.join(tmp_path, "agent.log")
+    with open(log_file, "w") as f:
+        f.write("old 1\nold 2\n")
+    watcher = FileWatcher(log_file, poll_interval=0.01, use_inotify=use_inotify)
+
+    lines = follow(log_file, 1, watcher=watcher, timeout=2)
+    assert next(lines) == "old 2"
+    writer = _append_later(log_file, ["new 1", "new 2", "rotated 1", "rotated 2"], rotate_after=2)
+    received = [next(lines) for _ in range(4)]
+    writer.join()
+    lines.close()
+
+    assert received == ["new 1", "new 2", "rotated 1", "rotated 2"]
+
+def test_file_watcher_times_out_without_changes(tmp_path):
+    log_file = os.path.join(tmp_path, "agent.log")
+    open(log_file, "w").close()
+    with FileWatcher(log_file, poll_interval=0.01) as watcher:
+        assert watcher.wait(0.05) is False
+        with open(log_file, "a") as f:
+            f.write("changed\n")
+        assert watcher.wait(1) is True
@@ -0,0 +1,46 @@
+"""
+Tests for the background Log Writer
+"""
+import gzip
+import os
+import pytest
+from designbuilder.core.log_writer import LogWriter, QUIET, VERBOSE, write_artifact
+
+def test_lines_are_written_in_order_and_echoed_by_verbosity(tmp_path, capsys):
+    writer = LogWriter(verbosity=QUIET)
+    log_file = os.path.join(tmp_path, "agent.log")
+
+    writer.write(log_file, "first", echo="[agent] first")
+    writer.write(log_file, "second", echo="[agent] second", level=QUIET)
+    writer.close()
+
+    with open(log_file) as f:
+        assert f.read() == "first\nsecond\n"
+    assert capsys.readouterr().out == "[agent] second\n"
+
+def test_full_logs_are_rotated_and_compressed(tmp_path):
+    writer = LogWriter(verbosity=VERBOSE, max_bytes=10, backup_count=2)
+    log_file = os.path.join(tmp_path, "agent.log")
+
+    for line in ["aaaaaaaaaa", "bbbbbbbbbb", "cccccccccc", "dd"]:
+        writer.write(log_file, line)
+    writer.close()
+
+    with open(log_file) as f:
+        assert f.read() == "dd\n"
+    with gzip.open(f"{log_file}.1.gz", "rt") as f:
+        assert f.read() == "cccccccccc\n"
+    with gzip.open(f"{log_file}.2.gz", "rt") as f:
+        assert f.read() == "bbbbbbbbbb\n"
+    assert not os.path.exists(f"{log_file}.3.gz")
+
+@pytest.mark.asyncio
+async def test_write_artifact_replaces_file_atomically(tmp_path):
+    path = os.path.join(tmp_path, "classes", "logger.py")
+
+    await write_artifact(path, "x = 1\n")
+    await write_artifact(path, "x = 2\n")
+
+    with open(path) as f:
+        assert f.read() == "x = 2\n"
+    assert os.listdir(os.path.dirname(path)) == ["logger.py"]
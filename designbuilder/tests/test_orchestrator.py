@@ -13,4 +13,28 @@ async def test_orchestrator_initialization():
     orchestrator = Orchestrator(design_docs)
     assert orchestrator.design_docs == design_docs
 
-# TODO: Add more tests for running the orchestrator, handling failures, etc.
+@pytest.mark.asyncio
+async def test_orchestrator_builds_components_with_fake_backend(tmp_path):
+    """
+    A full build of synthetic components against the fake backend: every
+    implementation starts out buggy, so each agent has to debug it.
+    """
+    from designbuilder.benchmarks.orchestrator_bench import synthetic_components
+    from designbuilder.core.status_manager import StatusManager
+    from designbuilder.llm_backends.fake import FakeBackend, fake_router
+
+    orchestrator = Orchestrator(
+        [], max_agents=4, max_tests=2, use_llm_cache=False, force=True,
+        components=synthetic_components(5), llm_backend=fake_router(FakeBackend(bug_rate=1.0)),
+        status_manager=StatusManager(path=str(tmp_path / "status.db")),
+        output_dir=str(tmp_path / "output"), log_dir=str(tmp_path / "logs"), run_dir=str(tmp_path / "runs"),
+    )
+    await orchestrator.run()
+
+    assert len(orchestrator.agents) == 5
+    assert all(agent.status == "completed" for agent in orchestrator.agents)
+    assert all(agent.debug_attempts == 1 for agent in orchestrator.agents)
+    assert (tmp_path / "output" / "classes" / "component_1.py").exists()
+    assert list((tmp_path / "runs").glob("*.jsonl"))
+
+# TODO: Add more tests for handling failures, etc.
@@ -0,0 +1,92 @@
+"""
+Tests for chunked component extraction
+"""
+import asyncio
+import re
+import yaml
+import pytest
+from designbuilder.core import parser
+from designbuilder.core.parser import chunk_sections, merge_components, parse_design_docs, split_sections
+
+class ExtractionBackend:
+    """Returns one component per '## <Name>' heading found in the prompt."""
+    def __init__(self):
+        self.prompts = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send_prompt(self, prompt: str) -> str:
+        self.prompts += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        names = re.findall(r"^\s*## (\w+)", prompt, re.MULTILINE)
+        return "```yaml\n" + yaml.dump([{"name": n, "description": f"The {n} component."} for n in names]) + "```"
+
+def test_sections_are_split_at_headings():
+    text = "Intro\n# Overview\nabout\n## Payments\npay\n3.1 Billing Service\nbill\n"
+    sections = split_sections(text, [("spec.md", 0, len(text))])
+
+    assert [title for _, title, _, _ in sections] == [None, "Overview", "Payments", "3.1 Billing Service"]
+    assert sections[0][2] == 0 and sections[-1][3] == len(text)
+
+def test_chunks_pack_sections_and_split_large_ones():
+    text = "".join(f"## S{i}\n" + "x" * 40 + "\n\n" for i in range(10))
+    sections = split_sections(text, [("spec.md", 0, len(text))])
+
+    chunks = chunk_sections(text, sections, max_chars=100)
+    assert all(end - start <= 100 for start, end in chunks)
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(text)
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+
+def test_components_found_in_several_chunks_are_merged():
+    merged = merge_components([
+        [{"name": "PaymentService", "description": "short", "source": {"document": "a.md", "section": "Pay"}},
+         {"name": "UserStore", "description": "users", "source": {"document": "a.md", "section": "Users"}}],
+        [{"name": "Payment services", "description": "a longer description", "language": "Python",
+          "source": {"document": "b.md", "section": "Payments"}}],
+    ])
+
+    assert [c["name"] for c in merged] == ["PaymentService", "UserStore"]
+    assert merged[0]["description"] == "a longer description"
+    assert merged[0]["language"] == "Python"
+    assert len(merged[0]["sources"]) == 2
+
+def test_different_components_with_similar_names_are_kept():
+    names = ["Service A", "Service B", "HTTP Server", "HTTPS Server", "Worker Pool", "Worker Tool"]
+    merged = merge_components([[{"name": name} for name in names[::2]], [{"name": name} for name in names[1::2]]])
+    assert sorted(c["name"] for c in merged) == sorted(names)
+
+    # Nor are components of the same chunk merged, even with the same name
+    assert len(merge_components([[{"name": "Cache"}, {"name": "cache"}]])) == 2
+
+@pytest.mark.asyncio
+async def test_chunked_extraction_runs_concurrently_and_records_sources(monkeypatch):
+    monkeypatch.setattr(parser, "CHUNK_CHARS", 200)
+    monkeypatch.setattr(parser, "CHUNK_OVERLAP_CHARS", 20)
+    first = "".join(f"## Alpha{i}\n" + "a" * 150 + "\n" for i in range(4))
+    second = "## Beta\n" + "b" * 150 + "\n## Alpha0\nmentioned again\n"
+    backend = ExtractionBackend()
+
+    _, components_yaml = await parse_design_docs(["one.md", "two.md"], llm_backend=backend,
+                                                 document_texts=[first, second], max_concurrency=3,
+                                                 chunked=True)
+    components = {c["name"]: c for c in yaml.safe_load(components_yaml)}
+
+    assert set(components) == {"Alpha0", "Alpha1", "Alpha2", "Alpha3", "Beta"}
+    assert {k: components["Beta"]["source"][k] for k in ("document", "section")} == {"document": "two.md", "section": "Beta"}
+    assert {k: components["Alpha2"]["source"][k] for k in ("document", "section")} == {"document": "one.md", "section": "Alpha2"}
+    assert components["Alpha2"]["source"]["section_hash"] != components["Alpha1"]["source"]["section_hash"]
+    assert backend.prompts > 1
+    assert 1 < backend.max_in_flight <= 3
+
+@pytest.mark.asyncio
+async def test_small_input_uses_a_single_prompt():
+    backend = ExtractionBackend()
+    text = "## Alpha\nsmall\n## Beta\nsmall\n"
+
+    _, components_yaml = await parse_design_docs(["one.md"], llm_backend=backend, document_texts=[text])
+
+    assert backend.prompts == 1
+    assert [c["name"] for c in yaml.safe_load(components_yaml)] == ["Alpha", "Beta"]
@@ -0,0 +1,118 @@
+"""
+Tests for applying LLM edits to generated code
+"""
+import pytest
+from designbuilder.coding_agents.patching import (
+    PatchError, apply_edits, apply_unified_diff, count_changed_lines, parse_edits,
+)
+from designbuilder.coding_agents.python_agent import PythonAgent
+
+SOURCE = '''import math
+
+def area(radius):
+    return math.pi * radius
+
+def perimeter(radius):
+    return 2 * math.pi * radius
+
+def describe(radius):
+    return f"r={radius}"
+'''
+
+def edit(search: str, replace: str) -> str:
+    return f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE\n"
+
+def test_search_replace_blocks_are_applied():
+    response = edit("    return math.pi * radius", "    return math.pi * radius ** 2") + \
+        edit("import math", "import math\nimport functools")
+
+    patched, count = apply_edits(SOURCE, response)
+
+    assert count == 2
+    assert "return math.pi * radius ** 2" in patched
+    assert patched.startswith("import math\nimport functools\n")
+    assert count_changed_lines(SOURCE, patched) == (2, 1)
+
+def test_line_numbers_copied_from_the_prompt_are_ignored():
+    response = edit("   4:     return math.pi * radius", "   4:     return math.pi * radius ** 2")
+
+    patched, _ = apply_edits(SOURCE, response)
+
+    assert "    return math.pi * radius ** 2\n" in patched
+
+def test_code_that_looks_numbered_is_matched_as_is():
+    source = "NAMES = {\n    1: 'a',\n    2: 'b',\n}\nCODES = {\n    1: 'a',\n    3: 'c',\n}\n"
+    response = edit("    1: 'a',\n    2: 'b',", "    1: 'a',\n    2: 'B',") + \
+        edit("    1: 'a',\n    3: 'c',", "    3: 'c',")
+
+    patched, _ = apply_edits(source, response)
+
+    assert patched == "NAMES = {\n    1: 'a',\n    2: 'B',\n}\nCODES = {\n    3: 'c',\n}\n"
+
+def test_failed_edit_leaves_nothing_applied():
+    response = edit("import math", "import cmath as math") + edit("    return 3 * radius", "    return 0")
+
+    with pytest.raises(PatchError, match="not found"):
+        apply_edits(SOURCE, response)
+
+def test_ambiguous_and_invalid_edits_are_rejected():
+    with pytest.raises(PatchError, match="matches 2 places"):
+        apply_edits("total = 0\ntotal += 1\ntotal += 1\n", edit("total += 1", "total += 2"))
+    with pytest.raises(PatchError, match="syntax error"):
+        apply_edits(SOURCE, edit("def describe(radius):", "def describe(radius)"))
+    with pytest.raises(PatchError, match="no SEARCH/REPLACE"):
+        parse_edits("Here is the fixed code: ...")
+
+def test_unified_diff_is_applied_despite_wrong_line_numbers():
+    diff = (
+        "--- a/circle.py\n+++ b/circle.py\n"
+        "@@ -40,2 +40,2 @@\n"
+        " def perimeter(radius):\n"
+        "-    return 2 * math.pi * radius\n"
+        "+    return math.tau * radius\n"
+    )
+
+    patched = apply_unified_diff(SOURCE, diff)
+
+    assert "return math.tau * radius" in patched
+    assert count_changed_lines(SOURCE, patched) == (1, 1)
+
+class FakeBackend:
+    model_name = "fake"
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    async def stream_prompt(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        yield self.responses.pop(0)
+
+@pytest.mark.asyncio
+async def test_guide_falls_back_to_the_whole_file_when_edits_do_not_apply(tmp_path):
+    agent = PythonAgent({"name": "Circle", "description": "Circle maths"})
+    agent.class_file_path = str(tmp_path / "circle.py")
+    agent._implementation = SOURCE
+    rewritten = SOURCE.replace("def describe", "def summary")
+    agent.llm_backend = FakeBackend(
+        "```\n" + edit("def missing():", "def found():") + "```",
+        f"```python\n{rewritten}```",
+    )
+
+    await agent.guide("Rename describe to summary")
+
+    assert "SEARCH/REPLACE" in agent.llm_backend.prompts[0]
+    assert "SEARCH/REPLACE" not in agent.llm_backend.prompts[1]
+    assert (tmp_path / "circle.py").read_text() == rewritten.strip()
+
+@pytest.mark.asyncio
+async def test_guide_applies_edits(tmp_path):
+    agent = PythonAgent({"name": "Circle", "description": "Circle maths"})
+    agent.class_file_path = str(tmp_path / "circle.py")
+    agent._implementation = SOURCE
+    agent.llm_backend = FakeBackend("```\n" + edit("def describe(radius):", "def summary(radius):") + "```\nDone.")
+
+    await agent.guide("Rename describe to summary")
+
+    assert len(agent.llm_backend.prompts) == 1
+    assert "def summary(radius):" in (tmp_path / "circle.py").read_text()
@@ -0,0 +1,62 @@
+"""
+Tests for the warm Pytest Worker Pool
+"""
+import os
+import pytest
+from designbuilder.coding_agents.pytest_pool import PytestWorkerPool
+
+def _write_component(root, name, impl_code, test_code):
+    classes_dir = os.path.join(root, "classes")
+    tests_dir = os.path.join(root, "tests")
+    os.makedirs(classes_dir, exist_ok=True)
+    os.makedirs(tests_dir, exist_ok=True)
+    with open(os.path.join(classes_dir, f"{name}.py"), "w") as f:
+        f.write(impl_code)
+    test_file_path = os.path.join(tests_dir, f"test_{name}.py")
+    with open(test_file_path, "w") as f:
+        f.write(test_code)
+    return test_file_path, [root, classes_dir, tests_dir]
+
+@pytest.mark.asyncio
+async def test_pool_reports_passing_and_failing_runs(tmp_path):
+    pool = PytestWorkerPool(size=1)
+    root = str(tmp_path)
+    try:
+        test_file, paths = _write_component(
+            root, "adder",
+            "def add(a, b):\n    return a + b\n",
+            "from adder import add\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+        )
+        result = await pool.run(test_file, cwd=root, pythonpath=paths)
+        assert result.returncode == 0
+        assert result.passed == 1
+
+        # Same worker, same module name: the edited module must be re-imported
+        test_file, paths = _write_component(
+            root, "adder",
+            "def add(a, b):\n    return a - b\n",
+            "from adder import add\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+        )
+        result = await pool.run(test_file, cwd=root, pythonpath=paths)
+        assert result.returncode != 0
+        assert result.failed == 1
+        assert result.failures[0]["nodeid"].endswith("test_add")
+        assert "assert -1 == 3" in result.output
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_pool_kills_worker_on_timeout(tmp_path):
+    pool = PytestWorkerPool(size=1)
+    root = str(tmp_path)
+    try:
+        test_file, paths = _write_component(
+            root, "sleeper",
+            "import time\n\ndef nap():\n    time.sleep(30)\n",
+            "from sleeper import nap\n\ndef test_nap():\n    nap()\n"
+        )
+        result = await pool.run(test_file, cwd=root, pythonpath=paths, timeout=2)
+        assert result.timed_out
+        assert result.returncode != 0
+    finally:
+        await pool.close()
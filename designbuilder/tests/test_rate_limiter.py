@@ -0,0 +1,94 @@
+"""
+Tests for the shared LLM rate limiter
+"""
+import time
+import pytest
+from designbuilder.llm_backends.rate_limiter import (
+    AdaptiveConcurrency, RateLimitedBackend, RateLimiter, TokenBucket, is_rate_limit_error,
+)
+
+class FlakyBackend:
+    """Fails with a quota error a given number of times, then succeeds."""
+    def __init__(self, failures: int):
+        self.model_name = "test-model"
+        self.failures = failures
+        self.calls = 0
+
+    async def send_prompt(self, prompt: str) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("429 Quota exceeded. Please retry after 0.01 seconds.")
+        return f"response to {prompt}"
+
+    async def stream_prompt(self, prompt: str):
+        yield await self.send_prompt(prompt)
+
+def make_backend(failures: int, max_retries: int = 3):
+    backend = FlakyBackend(failures)
+    limiter = RateLimiter("test/test-model", requests_per_minute=6000, tokens_per_minute=10_000_000)
+    return backend, RateLimitedBackend(backend, limiter, max_retries=max_retries)
+
+def test_rate_limit_errors_are_recognized():
+    assert is_rate_limit_error(RuntimeError("429 Resource has been exhausted"))
+    assert is_rate_limit_error(RuntimeError("Quota exceeded for requests per minute"))
+    assert is_rate_limit_error(RuntimeError("Error code: 429 - {'error': {'type': 'requests'}}"))
+    assert is_rate_limit_error(RuntimeError("HTTP 429 Too Many Requests"))
+    assert not is_rate_limit_error(ValueError("invalid prompt"))
+    assert not is_rate_limit_error(RuntimeError("Internal error (request id req_8429ab): prompt has 429 tokens"))
+
+@pytest.mark.asyncio
+async def test_rate_limited_call_is_retried_and_concurrency_shrinks():
+    backend, limited = make_backend(failures=2)
+
+    response = await limited.send_prompt("implement foo")
+
+    assert response == "response to implement foo"
+    assert backend.calls == 3
+    stats = limited.limiter.stats()
+    assert stats["rate_limited"] == 2
+    assert stats["concurrency_limit"] < 64
+    assert limited.limiter.concurrency.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_retries_are_bounded():
+    backend, limited = make_backend(failures=10, max_retries=1)
+
+    with pytest.raises(RuntimeError):
+        await limited.send_prompt("implement foo")
+    assert backend.calls == 2
+    assert limited.limiter.concurrency.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_stream_is_retried_before_any_chunk():
+    backend, limited = make_backend(failures=1)
+
+    chunks = [chunk async for chunk in limited.stream_prompt("implement foo")]
+
+    assert chunks == ["response to implement foo"]
+    assert backend.calls == 2
+
+def test_concurrency_is_halved_and_grows_back():
+    concurrency = AdaptiveConcurrency(initial=8)
+    concurrency.on_rate_limited()
+    assert int(concurrency.limit) == 4
+    for _ in range(5):  # about one window of successful calls
+        concurrency.on_success()
+    assert int(concurrency.limit) == 5
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(rate_per_minute=600)  # 10 per second
+    await bucket.acquire(600)
+
+    started = time.monotonic()
+    await bucket.acquire(1)
+    assert time.monotonic() - started >= 0.05
+
+def test_limits_are_scaled_by_the_rate_limit_share(monkeypatch):
+    monkeypatch.setattr(RateLimiter, "_registry", {})
+    monkeypatch.setattr(RateLimiter, "default_share", 0.25)
+
+    limiter = RateLimiter.for_backend("GeminiBackend", "gemini-2.5-pro")
+
+    assert limiter.requests.capacity == 150 * 0.25
+    assert limiter.tokens.capacity == 2_000_000 * 0.25
@@ -0,0 +1,114 @@
+"""
+Tests for the resilient LLM backend
+"""
+import asyncio
+import pytest
+from designbuilder.llm_backends import resilient
+from designbuilder.llm_backends.resilient import (
+    BackendHealth, CircuitBreaker, CircuitOpenError, ResilientBackend, classify_error,
+    FATAL, RATE_LIMITED, TRANSIENT,
+)
+
+class ScriptedBackend:
+    """Plays back a script of delays and errors, one entry per call."""
+    def __init__(self, script):
+        self.model_name = "test-model"
+        self.script = list(script)
+        self.calls = 0
+
+    async def send_prompt(self, prompt: str) -> str:
+        self.calls += 1
+        delay, error = self.script.pop(0) if self.script else (0, None)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return f"response {self.calls}"
+
+    async def stream_prompt(self, prompt: str):
+        yield await self.send_prompt(prompt)
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilient, "backoff_delay", lambda attempt: 0)
+
+def make_backend(script, **kwargs):
+    backend = ScriptedBackend(script)
+    return backend, ResilientBackend(backend, health=BackendHealth("test/test-model"), **kwargs)
+
+def test_errors_are_classified():
+    assert classify_error(ConnectionError("reset")) == TRANSIENT
+    assert classify_error(RuntimeError("503 Service Unavailable")) == TRANSIENT
+    assert classify_error(RuntimeError("Error code: 502 - bad gateway")) == TRANSIENT
+    assert classify_error(RuntimeError("Invalid request (id req_5025): prompt has 503 tokens")) == FATAL
+    assert classify_error(ValueError("Unknown parameter: timeout")) == FATAL
+    assert classify_error(RuntimeError("429 Quota exceeded")) == RATE_LIMITED
+    assert classify_error(ValueError("GEMINI_API_KEY environment variable not set.")) == FATAL
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    backend, wrapped = make_backend([(0, ConnectionError("reset")), (0, RuntimeError("503"))])
+
+    assert await wrapped.send_prompt("implement foo") == "response 3"
+    assert backend.calls == 3
+    assert wrapped.health.retries == 2
+
+@pytest.mark.asyncio
+async def test_fatal_errors_are_not_retried():
+    backend, wrapped = make_backend([(0, ValueError("bad request"))])
+
+    with pytest.raises(ValueError):
+        await wrapped.send_prompt("implement foo")
+    assert backend.calls == 1
+
+@pytest.mark.asyncio
+async def test_slow_attempt_times_out_and_is_retried():
+    backend, wrapped = make_backend([(1.0, None)], attempt_timeout=0.05)
+
+    assert await wrapped.send_prompt("implement foo") == "response 2"
+    assert wrapped.health.timeouts == 1
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged(monkeypatch):
+    monkeypatch.setattr(resilient, "MIN_HEDGE_DELAY_SECONDS", 0.01)
+    backend, wrapped = make_backend([(1.0, None)], hedge=True)
+    wrapped.health.latencies.extend([0.02] * 20)
+
+    started = asyncio.get_running_loop().time()
+    response = await wrapped.send_prompt("implement foo")
+
+    assert response == "response 2"
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert (wrapped.health.hedges, wrapped.health.hedge_wins) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast():
+    script = [(0, ConnectionError("reset"))] * 10
+    backend, wrapped = make_backend(script, max_retries=0)
+    wrapped.health.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await wrapped.send_prompt("implement foo")
+    with pytest.raises(CircuitOpenError):
+        await wrapped.send_prompt("implement foo")
+    assert backend.calls == 2
+
+def test_circuit_closes_after_successful_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.on_failure()
+    assert breaker.state == "open"
+
+    breaker.before_call()  # the reset timeout has passed: trial call
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one trial at a time
+    breaker.on_success()
+    assert breaker.state == "closed"
+
+@pytest.mark.asyncio
+async def test_stream_is_retried_before_first_chunk():
+    backend, wrapped = make_backend([(0, ConnectionError("reset"))])
+
+    chunks = [chunk async for chunk in wrapped.stream_prompt("implement foo")]
+
+    assert chunks == ["response 2"]
@@ -0,0 +1,109 @@
+"""
+Tests for the LLM backend router
+"""
+import pytest
+from designbuilder.llm_backends import resilient
+from designbuilder.llm_backends.cached import LLMResponseCache
+from designbuilder.llm_backends.resilient import BackendHealth
+from designbuilder.llm_backends.router import BackendRouter, RouteCandidate, FAST, STRONG, route_hints
+
+class FakeBackend:
+    def __init__(self, model_name: str, error: Exception = None):
+        self.model_name = model_name
+        self.error = error
+        self.calls = 0
+
+    async def send_prompt(self, prompt: str) -> str:
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return f"{self.model_name}: {prompt}"
+
+    async def stream_prompt(self, prompt: str):
+        yield await self.send_prompt(prompt)
+
+@pytest.fixture(autouse=True)
+def fresh_registries(monkeypatch):
+    monkeypatch.setattr(BackendHealth, "_registry", {})
+    monkeypatch.setattr(BackendRouter, "_unavailable", {})
+    monkeypatch.setattr(resilient, "backoff_delay", lambda attempt: 0)
+
+def candidate(model, tier, latency=10.0, cost=(0.0, 0.0), backend=None):
+    def create():
+        if isinstance(backend, Exception):
+            raise backend
+        return backend or FakeBackend(model)
+    return RouteCandidate(model, tier, cost, latency, "FakeBackend", create)
+
+@pytest.mark.asyncio
+async def test_routine_prompts_use_the_fast_tier_and_guidance_the_strong_tier():
+    router = BackendRouter([candidate("strong", STRONG), candidate("fast", FAST)], use_cache=False)
+
+    assert await router.send_prompt("implement foo", kind="implement") == "fast: implement foo"
+    assert router.model_name == "fast"
+    assert await router.send_prompt("fix it", kind="guide") == "strong: fix it"
+    assert router.model_name == "strong"
+
+def test_long_debug_loops_escalate():
+    router = BackendRouter([candidate("fast", FAST), candidate("strong", STRONG)], use_cache=False)
+
+    assert router.rank("debug", "prompt", attempt=1)[0].model == "fast"
+    assert router.rank("debug", "prompt", attempt=3)[0].model == "strong"
+
+def test_cost_and_observed_latency_are_scored():
+    cheap = candidate("cheap", FAST, latency=10.0)
+    pricey = candidate("pricey", FAST, latency=10.0, cost=(100.0, 100.0))
+    router = BackendRouter([pricey, cheap], use_cache=False)
+    assert router.rank("implement", "prompt")[0].model == "cheap"
+
+    health = BackendHealth.for_backend("FakeBackend", "cheap")
+    for _ in range(10):
+        health.record_success(200.0)
+    assert router.rank("implement", "prompt")[0].model == "pricey"
+
+@pytest.mark.asyncio
+async def test_unavailable_and_failing_backends_fall_back():
+    missing = candidate("missing", FAST, latency=1.0, backend=ValueError("API key not set"))
+    failing = candidate("failing", FAST, latency=2.0, backend=FakeBackend("failing", ConnectionError("reset")))
+    router = BackendRouter([missing, failing, candidate("strong", STRONG)], use_cache=False)
+
+    assert await router.send_prompt("implement foo") == "strong: implement foo"
+    assert "missing" in BackendRouter._unavailable
+    assert router.rank("implement", "prompt")[0].model == "failing"
+
+@pytest.mark.asyncio
+async def test_open_circuit_is_skipped():
+    router = BackendRouter([candidate("fast", FAST), candidate("strong", STRONG)], use_cache=False)
+    breaker = BackendHealth.for_backend("FakeBackend", "fast").breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.on_failure()
+
+    chunks = [chunk async for chunk in router.stream_prompt("implement foo")]
+
+    assert chunks == ["strong: implement foo"]
+
+def test_variants_start_on_different_candidates():
+    router = BackendRouter([candidate("fast", FAST), candidate("other", FAST, latency=20.0),
+                            candidate("strong", STRONG)], use_cache=False)
+
+    assert [router.rank("debug", "prompt", variant=v)[0].model for v in range(4)] == ["fast", "other", "strong", "fast"]
+    assert route_hints(router, "debug", 1, variant=2) == {"kind": "debug", "attempt": 1, "variant": 2}
+
+def test_route_hints_only_apply_to_routers():
+    assert route_hints(BackendRouter([], use_cache=False), "debug", 2) == {"kind": "debug", "attempt": 2}
+    assert route_hints(FakeBackend("raw"), "debug", 2) == {}
+
+@pytest.mark.asyncio
+async def test_use_cache_false_bypasses_the_response_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(LLMResponseCache, "_default", LLMResponseCache(path=str(tmp_path / "llm_cache.db")))
+    backend = FakeBackend("fast")
+    router = BackendRouter([candidate("fast", FAST, backend=backend)])
+
+    await router.send_prompt("implement", kind="implement")
+    await router.send_prompt("implement", kind="implement")
+    assert backend.calls == 1
+
+    await router.send_prompt("implement", **route_hints(router, "implement", use_cache=False))
+    assert [chunk async for chunk in router.stream_prompt("implement", kind="implement", use_cache=False)]
+    assert backend.calls == 3
+    assert route_hints(router, "implement", use_cache=False)["use_cache"] is False
@@ -0,0 +1,59 @@
+"""
+Tests for the Agent Scheduler
+"""
+import asyncio
+import pytest
+from designbuilder.core.scheduler import AgentScheduler
+
+@pytest.mark.asyncio
+async def test_scheduler_caps_agents_in_flight():
+    scheduler = AgentScheduler(max_agents=3, max_tests=1)
+    in_flight = 0
+    peak = 0
+
+    async def job():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    for _ in range(10):
+        scheduler.submit(job)
+    await scheduler.run()
+
+    assert peak == 3
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_high_complexity_first():
+    scheduler = AgentScheduler(max_agents=1, max_tests=1)
+    order = []
+    components = [
+        {"name": "A", "plan": {"complexity": "Low"}},
+        {"name": "B", "plan": {"complexity": "High"}},
+        {"name": "C", "plan": "unparsed plan"},
+    ]
+    for component in components:
+        async def job(name=component["name"]):
+            order.append(name)
+        scheduler.submit(job, AgentScheduler.complexity_priority(component))
+    await scheduler.run()
+
+    assert order == ["B", "C", "A"]
+
+@pytest.mark.asyncio
+async def test_scheduler_survives_failing_job():
+    scheduler = AgentScheduler(max_agents=2, max_tests=1)
+    done = []
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def succeeding():
+        done.append(True)
+
+    scheduler.submit(failing)
+    scheduler.submit(succeeding)
+    await scheduler.run()
+
+    assert done == [True]
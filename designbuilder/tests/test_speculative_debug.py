@@ -0,0 +1,66 @@
+"""
+Tests for racing speculative debug candidates
+"""
+import asyncio
+import os
+import tempfile
+import time
+import pytest
+from designbuilder.coding_agents.python_agent import PythonAgent
+
+IMPLEMENTATION = "def double(value):\n    return value + 2\n"
+TESTS = "from double import double\n\ndef test_double():\n    assert double(3) == 6\n\ndef test_zero():\n    assert double(0) == 0\n"
+
+def fix(expression: str) -> str:
+    return f"```\n<<<<<<< SEARCH\n    return value + 2\n=======\n    return {expression}\n>>>>>>> REPLACE\n```"
+
+class CandidateBackend:
+    """Answers each speculative candidate differently; the first candidate is slow."""
+    model_name = "fake"
+
+    def __init__(self):
+        self.cancelled = []
+
+    async def stream_prompt(self, prompt: str, **kwargs):
+        if "candidate fix 2 of" in prompt:
+            yield fix("value * 2")
+        elif "candidate fix 3 of" in prompt:
+            yield fix("value - 2")
+        else:
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                self.cancelled.append("candidate 1")
+                raise
+            yield fix("value ** 2")
+
+@pytest.fixture
+def agent(tmp_path):
+    agent = PythonAgent({"name": "Double", "description": "Doubles numbers"}, speculative_candidates=3,
+                        output_dir=str(tmp_path))
+    agent.workspace.create()
+    with open(agent.class_file_path, "w") as f:
+        f.write(IMPLEMENTATION)
+    with open(agent.test_file_path, "w") as f:
+        f.write(TESTS)
+    agent._implementation = IMPLEMENTATION
+    agent.llm_backend = CandidateBackend()
+    return agent
+
+@pytest.mark.asyncio
+async def test_first_passing_candidate_wins_and_the_rest_are_cancelled(agent, tmp_path, monkeypatch):
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(scratch))
+    result, summary = await agent.test()
+    assert result == "FAILED"
+
+    started = time.monotonic()
+    result, summary = await agent.debug_and_test(summary)
+
+    assert result == "PASSED"
+    assert time.monotonic() - started < 20
+    assert agent.llm_backend.cancelled == ["candidate 1"]
+    with open(agent.class_file_path) as f:
+        assert "return value * 2" in f.read()
+    assert os.listdir(scratch) == []  # scratch copies removed
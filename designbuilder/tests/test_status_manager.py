@@ -0,0 +1,81 @@
+"""
+Tests for the Status Manager
+"""
+import os
+import threading
+import time
+import pytest
+from designbuilder.core.status_manager import StatusManager
+
+@pytest.fixture
+def status_manager(tmp_path):
+    manager = StatusManager(path=os.path.join(tmp_path, "status.db"), flush_interval=60)
+    yield manager
+    manager.close()
+
+def test_updates_are_buffered_and_visible_before_flush(status_manager, tmp_path):
+    status_manager.set_all_status({"agent-1": {"name": "Logger", "status": "initialized"}})
+    status_manager.set_agent_status("agent-1", "implementing")
+    status_manager.set_agent_status("agent-1", "testing")
+
+    assert status_manager.get_agent_status("agent-1")["status"] == "testing"
+
+    # Another reader only sees the update once it is flushed
+    reader = StatusManager(path=os.path.join(tmp_path, "status.db"))
+    assert reader.get_agent_status("agent-1")["status"] == "initialized"
+    status_manager.flush()
+    assert reader.get_agent_status("agent-1") == {
+        "name": "Logger",
+        "status": "testing",
+        "updated_at": reader.get_agent_status("agent-1")["updated_at"],
+    }
+    reader.close()
+
+def test_dict_updates_merge_into_the_agent_record(status_manager):
+    status_manager.set_agent_status("agent-2", {"status": "guided", "guidance": "use a dict"})
+    status_manager.flush()
+
+    record = status_manager.get_all_status()["agent-2"]
+    assert record["status"] == "guided"
+    assert record["guidance"] == "use a dict"
+
+def test_set_all_status_replaces_every_record(status_manager):
+    status_manager.set_agent_status("stale", "testing")
+    status_manager.set_all_status({"agent-1": {"status": "completed"}})
+
+    assert status_manager.get_all_status() == {"agent-1": {"status": "completed"}}
+
+def test_changes_since_returns_only_changed_records(status_manager, tmp_path):
+    status_manager.set_all_status({"agent-1": {"status": "testing"}, "agent-2": {"status": "testing"}})
+    version, records, reset = status_manager.changes_since(0)
+    assert reset and set(records) == {"agent-1", "agent-2"}
+
+    status_manager.set_agent_status("agent-2", {"status": "debugging", "debug_attempts": 1})
+    status_manager.flush()
+    version, records, reset = status_manager.changes_since(version)
+    assert not reset
+    assert list(records) == ["agent-2"] and records["agent-2"]["debug_attempts"] == 1
+    assert status_manager.changes_since(version) == (version, {}, False)
+
+    # Replacing every record tells watchers to start over
+    status_manager.set_all_status({"agent-3": {"status": "initialized"}})
+    _, records, reset = status_manager.changes_since(version)
+    assert reset and list(records) == ["agent-3"]
+
+def test_watch_wakes_on_writes_from_another_connection(status_manager, tmp_path):
+    status_manager.set_all_status({"agent-1": {"status": "testing"}})
+    watcher = StatusManager(path=os.path.join(tmp_path, "status.db"))
+    feed = watcher.watch(timeout=5)
+    assert next(feed) == ({"agent-1": {"status": "testing"}}, True)
+
+    writer = threading.Timer(0.05, lambda: (status_manager.set_agent_status("agent-1", "completed"),
+                                            status_manager.flush()))
+    writer.start()
+    started = time.monotonic()
+    records, reset = next(feed)
+    writer.join()
+
+    assert time.monotonic() - started < 4  # woken by the write, not the timeout
+    assert not reset and records["agent-1"]["status"] == "completed"
+    feed.close()
+    watcher.close()
@@ -0,0 +1,95 @@
+"""
+Tests for build telemetry and run profiles
+"""
+import asyncio
+import time
+import pytest
+from designbuilder.core import telemetry
+from designbuilder.core.scheduler import AgentScheduler
+from designbuilder.core.telemetry import Telemetry
+
+async def run_agent(name: str, depends_on: list, seconds: float):
+    with telemetry.span("agent", agent=name, depends_on=depends_on) as event:
+        with telemetry.span("implement", phase=True):
+            started = time.monotonic()
+            await asyncio.sleep(seconds)
+            telemetry.record_llm_call("fast-model", "implement", started, "x" * 400, "y" * 80)
+        telemetry.record_cache("llm", hit=False)
+        with telemetry.span("test", phase=True), telemetry.span("pytest", runner="pool", passed=2, failed=0):
+            await asyncio.sleep(0.01)
+        event["status"] = "completed"
+
+@pytest.fixture
+def recorded_run(tmp_path):
+    async def build():
+        run = Telemetry.start(run_id="test-run", run_dir=str(tmp_path), metrics_textfile=str(tmp_path / "db.prom"))
+        try:
+            with telemetry.span("plan_all"):
+                telemetry.record_cache("plan", hit=True)
+            await asyncio.gather(run_agent("Storage", [], 0.05), run_agent("Cache", [], 0.01))
+            await run_agent("Api", ["Storage", "Cache"], 0.02)
+        finally:
+            run.finish()
+    asyncio.run(build())
+    return tmp_path
+
+def test_no_run_records_nothing():
+    assert Telemetry.active() is None
+    with telemetry.span("plan_all") as event:
+        telemetry.annotate(components=3)
+    assert event == {}
+    telemetry.record_llm_call("model", "plan", time.monotonic(), "prompt")
+
+def test_run_file_has_spans_llm_calls_and_caches(recorded_run):
+    events = telemetry.load_run(telemetry.resolve_run(run_dir=str(recorded_run)))
+
+    assert events[0]["type"] == "run" and events[-1]["type"] == "end"
+    llm = [e for e in events if e["type"] == "llm"]
+    assert {e["agent"] for e in llm} == {"Storage", "Cache", "Api"}
+    assert llm[0]["prompt_tokens"] == 100 and llm[0]["output_tokens"] == 20 and llm[0]["response_bytes"] == 80
+    pytest_spans = [e for e in events if e["type"] == "span" and e["name"] == "pytest"]
+    test_spans = {e["id"]: e for e in events if e["type"] == "span" and e["name"] == "test"}
+    assert all(span["parent"] in test_spans for span in pytest_spans)
+
+    summary = telemetry.run_summary(events)
+    assert summary["run_id"] == "test-run"
+    assert (summary["llm_calls"], summary["cache_hits"], summary["cache_misses"]) == (3, 1, 3)
+
+def test_profile_reports(recorded_run):
+    events = telemetry.load_run(telemetry.resolve_run("test-run", run_dir=str(recorded_run)))
+
+    path = telemetry.critical_path(events)
+    assert [step.get("agent") or step["name"] for step in path] == ["plan_all", "Storage", "Api"]
+
+    breakdown = telemetry.agent_breakdown(events)
+    assert breakdown["Storage"]["phases"]["implement"] >= 0.05
+    assert breakdown["Storage"]["llm_calls"] == 1
+    assert set(breakdown["Api"]["phases"]) == {"implement", "test"}  # pytest spans are not phases
+
+    slowest = telemetry.slowest(events, limit=2)
+    assert [call["agent"] for call in slowest] == ["Storage", "Api"]
+
+def test_prometheus_textfile(recorded_run):
+    text = (recorded_run / "db.prom").read_text()
+
+    assert '# TYPE designbuilder_llm_calls_total counter' in text
+    assert 'designbuilder_llm_calls_total{model="fast-model",kind="implement"} 3' in text
+    assert 'designbuilder_llm_tokens_total{model="fast-model",kind="implement",direction="input"} 300' in text
+    assert 'designbuilder_cache_lookups_total{cache="plan",result="hit"} 1' in text
+    assert 'designbuilder_span_count_total{name="agent"} 3' in text
+
+@pytest.mark.asyncio
+async def test_slot_waits_are_recorded(tmp_path):
+    scheduler = AgentScheduler(max_agents=1, max_llm_calls=1, max_tests=1)
+    run = Telemetry.start(run_id="waits", run_dir=str(tmp_path))
+
+    async def call():
+        async with scheduler.llm_slot():
+            await asyncio.sleep(0.05)
+
+    await asyncio.gather(call(), call())
+    run.finish()
+
+    waits = [e for e in telemetry.load_run(run.path) if e["type"] == "wait"]
+    assert [e["resource"] for e in waits] == ["llm_slot", "llm_slot"]
+    assert max(e["duration"] for e in waits) >= 0.04  # the second call waited for the first
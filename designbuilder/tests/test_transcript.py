@@ -0,0 +1,117 @@
+"""
+Tests for LLM transcript recording and replay
+"""
+import time
+import pytest
+from designbuilder.llm_backends.fake import FakeBackend
+from designbuilder.llm_backends.rate_limiter import is_rate_limit_error
+from designbuilder.llm_backends.router import FAST, BackendRouter, RouteCandidate
+from designbuilder.llm_backends.transcript import (
+    ReplayBackend, TranscriptMissError, TranscriptRecorder, load_transcript, merge_transcripts, prompt_hash,
+)
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = TranscriptRecorder.start(str(tmp_path / "build.jsonl.gz"))
+    yield recorder
+    if TranscriptRecorder.active() is recorder:
+        recorder.finish()
+
+@pytest.mark.asyncio
+async def test_routed_calls_replay_in_order(recorder):
+    backend = FakeBackend(latency=0.01)
+    router = BackendRouter([RouteCandidate("fake", FAST, (0.0, 0.0), 0.1, "FakeBackend", lambda: backend)],
+                           use_cache=False)
+    first = await router.send_prompt("prompt a", kind="plan")
+    second = await router.send_prompt("prompt b", kind="implement")
+    streamed = "".join([chunk async for chunk in router.stream_prompt("prompt a", kind="debug")])
+    recorder.finish()
+
+    header, records = load_transcript(recorder.path)
+    assert header["version"] == 1
+    assert [(r["kind"], r["model"], r["backend"]) for r in records] == [
+        ("plan", "fake", "FakeBackend"), ("implement", "fake", "FakeBackend"), ("debug", "fake", "FakeBackend")]
+    assert "prompt a" not in open(recorder.path, "rb").read().decode(errors="ignore")
+
+    replay = ReplayBackend(recorder.path, speed=0)
+    assert replay.model_name == "fake"
+    assert await replay.send_prompt("prompt a") == first
+    assert await replay.send_prompt("prompt b") == second
+    assert "".join([chunk async for chunk in replay.stream_prompt("prompt a")]) == streamed
+
+@pytest.mark.asyncio
+async def test_fallbacks_and_errors_replay_as_recorded(recorder):
+    started = time.monotonic()
+    recorder.record(1, "GeminiBackend", "flash", "debug", started, "fix it", error=ConnectionError("reset"))
+    recorder.record(1, "GPT4TurboBackend", "gpt-4-turbo", "debug", started, "fix it", "fixed")
+    quota = type("ResourceExhausted", (Exception,), {})("429 quota exceeded")
+    recorder.record(2, "GeminiBackend", "flash", "plan", started, "plan it", error=quota)
+    recorder.finish()
+
+    replay = ReplayBackend(recorder.path, speed=0)
+    assert await replay.send_prompt("fix it") == "fixed"
+    assert replay.model_name == "gpt-4-turbo"
+    with pytest.raises(Exception) as raised:
+        await replay.send_prompt("plan it")
+    assert type(raised.value).__name__ == "ResourceExhausted"
+    assert is_rate_limit_error(raised.value)
+
+@pytest.mark.asyncio
+async def test_repeated_prompts_and_misses(recorder):
+    recorder.record(1, "FakeBackend", "fake", "debug", time.monotonic(), "same", "first")
+    recorder.record(2, "FakeBackend", "fake", "debug", time.monotonic(), "same", "second")
+    recorder.finish()
+
+    replay = ReplayBackend(recorder.path, speed=0)
+    assert [await replay.send_prompt("same") for _ in range(3)] == ["first", "second", "second"]
+    with pytest.raises(TranscriptMissError):
+        await replay.send_prompt("never recorded")
+    assert replay.misses == 1
+
+@pytest.mark.asyncio
+async def test_replay_speed_scales_recorded_latency(recorder):
+    recorder.record(1, "FakeBackend", "fake", "plan", time.monotonic() - 0.5, "slow", "done")
+    recorder.finish()
+
+    replay = ReplayBackend(recorder.path, speed=10)
+    started = time.monotonic()
+    assert await replay.send_prompt("slow") == "done"
+    assert 0.04 <= time.monotonic() - started < 0.3
+
+def test_truncated_transcript_is_readable(recorder):
+    for call in range(50):
+        recorder.record(call, "FakeBackend", "fake", "plan", time.monotonic(), f"prompt {call}", "x" * 200)
+    recorder.finish()
+    with open(recorder.path, "rb") as f:
+        data = f.read()
+    with open(recorder.path, "wb") as f:
+        f.write(data[:len(data) // 2])
+
+    _, records = load_transcript(recorder.path)
+    assert 0 < len(records) < 50
+
+def test_prompt_hash_ignores_memory_addresses():
+    assert (prompt_hash("where 5 = <function checksum at 0x7f035295f060>([1, 2, 3])")
+            == prompt_hash("where 5 = <function checksum at 0x7f2008517060>([1, 2, 3])"))
+    assert prompt_hash("assert 5 == 6") != prompt_hash("assert 4 == 6")
+
+@pytest.mark.asyncio
+async def test_worker_transcripts_are_merged_into_the_build_transcript(tmp_path):
+    build = TranscriptRecorder(str(tmp_path / "build.jsonl.gz"))
+    build.record(1, "FakeBackend", "fake", "plan", time.monotonic(), "plan it", "plan")
+    build.finish()
+    workers = []
+    for index in range(2):
+        worker = TranscriptRecorder(str(tmp_path / f"build.jsonl.gz.worker-{index}"))
+        worker.record(1, "FakeBackend", "fake", "implement", time.monotonic(), f"implement {index}", f"code {index}")
+        worker.finish()
+        workers.append(worker.path)
+
+    assert merge_transcripts(build.path, workers) == 2
+
+    _, records = load_transcript(build.path)
+    assert sorted(r["call"] for r in records) == [1, 2, 3]
+    assert not any((tmp_path / f"build.jsonl.gz.worker-{index}").exists() for index in range(2))
+    replay = ReplayBackend(build.path, speed=0)
+    assert await replay.send_prompt("implement 1") == "code 1"
+    assert await replay.send_prompt("plan it") == "plan"
@@ -0,0 +1,99 @@
+"""
+Tests for Agent Workspaces
+"""
+import os
+import subprocess
+import sys
+from designbuilder.coding_agents.workspace import AgentWorkspace
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+def test_workspace_sees_finished_modules_but_not_later_merges(tmp_path):
+    output_dir = str(tmp_path)
+    _write(os.path.join(output_dir, "classes", "adder.py"), "def add(a, b):\n    return a + b\n")
+    calculator = AgentWorkspace(output_dir, "calculator")
+    calculator.create()
+
+    # The finished dependency is importable from the workspace
+    _write(calculator.class_file, "from adder import add\n\ndef total(values):\n    return sum(values)\n")
+    _write(calculator.test_file, "from calculator import total\nfrom adder import add\n\n"
+                                 "def test_total():\n    assert total([1, 2]) == add(1, 2)\n")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(AgentWorkspace.pythonpath(calculator.root)))
+    result = subprocess.run([sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider",
+                             calculator.test_file_in(calculator.root)],
+                            cwd=calculator.root, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    # Another agent republishing the module does not change the snapshot
+    adder = AgentWorkspace(output_dir, "adder")
+    adder.create()
+    _write(adder.class_file, "def add(a, b):\n    raise NotImplementedError\n")
+    _write(adder.test_file, "")
+    adder.merge()
+    assert "raise NotImplementedError" in _read(adder.output_class_file)
+    assert "return a + b" in _read(os.path.join(calculator.root, "classes", "adder.py"))
+
+def test_create_keeps_the_component_and_drops_stale_modules(tmp_path):
+    output_dir = str(tmp_path)
+    _write(os.path.join(output_dir, "classes", "old.py"), "")
+    workspace = AgentWorkspace(output_dir, "widget")
+    workspace.create()
+    _write(workspace.class_file, "class Widget:\n    pass\n")
+    os.remove(os.path.join(output_dir, "classes", "old.py"))
+    _write(os.path.join(output_dir, "classes", "new.py"), "")
+
+    workspace.create()
+
+    assert sorted(os.listdir(os.path.dirname(workspace.class_file))) == ["new.py", "widget.py"]
+    assert _read(workspace.class_file) == "class Widget:\n    pass\n"
+
+def test_copy_to_leaves_the_workspace_unchanged(tmp_path):
+    workspace = AgentWorkspace(str(tmp_path / "output"), "widget")
+    workspace.create()
+    _write(workspace.class_file, "original\n")
+    _write(workspace.test_file, "tests\n")
+    scratch = str(tmp_path / "scratch")
+
+    workspace.copy_to(scratch, "candidate\n")
+
+    assert _read(os.path.join(scratch, "classes", "widget.py")) == "candidate\n"
+    assert _read(workspace.test_file_in(scratch)) == "tests\n"
+    assert _read(workspace.class_file) == "original\n"
+
+def test_merge_publishes_implementation_and_tests(tmp_path):
+    workspace = AgentWorkspace(str(tmp_path), "widget")
+    workspace.create()
+    _write(workspace.class_file, "class Widget:\n    pass\n")
+    _write(workspace.test_file, "def test_widget():\n    pass\n")
+
+    workspace.merge()
+
+    assert _read(workspace.output_class_file) == "class Widget:\n    pass\n"
+    assert _read(workspace.output_test_file) == "def test_widget():\n    pass\n"
+    assert os.listdir(os.path.dirname(workspace.output_class_file)) == ["widget.py"]  # no temp files left
+
+def test_snapshot_falls_back_to_copies_without_hard_links(tmp_path, monkeypatch):
+    def no_hard_links(source, target):
+        raise OSError("hard links not supported")
+    monkeypatch.setattr(os, "link", no_hard_links)
+    output_dir = str(tmp_path)
+    _write(os.path.join(output_dir, "classes", "adder.py"), "version = 1\n")
+    workspace = AgentWorkspace(output_dir, "calculator")
+    workspace.create()
+
+    adder = AgentWorkspace(output_dir, "adder")
+    adder.create()
+    _write(adder.class_file, "version = 2\n")
+    _write(adder.test_file, "")
+    adder.merge()
+
+    snapshot = os.path.join(workspace.root, "classes", "adder.py")
+    assert not os.path.islink(snapshot)
+    assert _read(snapshot) == "version = 1\n"